@@ -1,16 +1,23 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from typing import List, Dict, Iterator
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 
 from app.core.config import settings
+from app.core.registry import registry, get_chat_model
 from app.utils.document_parser import extract_clauses
+from app.utils.clause_alignment import align_clauses, align_clauses_many
+from app.utils.clause_diff import word_diff, classify_edit, TRIVIAL_KINDS
+from app.utils.embeddings import get_embedding_function
+from app.utils.prompt_budget import fit_prompt
 from .state import AgentState
 
-# --- Pydantic Models (No Change) ---
+# --- Pydantic Models ---
+class DiffHunk(BaseModel):
+    op: str = Field(description="The edit operation: 'replace', 'delete' or 'insert'.")
+    text_a: str = Field(description="The affected words in Document A.")
+    text_b: str = Field(description="The affected words in Document B.")
+
 class Change(BaseModel):
     type: str = Field(description="The type of change: 'added', 'removed', or 'modified'.")
     clause_number_a: str = Field(description="Clause number from Document A (if applicable).")
@@ -18,14 +25,15 @@ class Change(BaseModel):
     clause_number_b: str = Field(description="Clause number from Document B (if applicable).")
     text_b: str = Field(description="The text from Document B (if applicable).")
     explanation: str = Field(description="An LLM-generated explanation of the change's significance.")
+    change_kind: str = Field(default="substantive", description="'substantive', or the kind of trivial edit (e.g. 'punctuation', 'numbering').")
+    diff: List[DiffHunk] = Field(default_factory=list, description="Word-level diff hunks between the two versions.")
 
 class ComparisonOutput(BaseModel):
     changes: List[Change]
+    stats: Dict = Field(default_factory=dict, description="Alignment statistics for the comparison.")
 
 
-# --- Utilities and Chains (No Change) ---
-embedding_model = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY)
-llm = ChatOpenAI(model="gpt-4", temperature=0, api_key=settings.OPENAI_API_KEY)
+# --- Utilities and Chains (built on first use) ---
 explanation_prompt = ChatPromptTemplate.from_template(
     """You are a legal analyst. Explain the key difference and legal significance between these two versions of a contract clause.
 
@@ -34,7 +42,7 @@ explanation_prompt = ChatPromptTemplate.from_template(
 
     Explanation:"""
 )
-explanation_chain = explanation_prompt | llm | StrOutputParser()
+registry.register("explanation_chain", lambda: explanation_prompt | get_chat_model("gpt-4") | StrOutputParser())
 
 
 # --- AGENT LOGIC (OPTIMIZED VERSION) ---
@@ -46,52 +54,93 @@ class ComparisonAgent:
         clauses_a = extract_clauses(doc_a_text)
         clauses_b = extract_clauses(doc_b_text)
         
-        # **OPTIMIZATION 1: Batch embed all clauses at once**
-        print("   Embedding all clauses in two batch API calls...")
-        texts_a = [c["content"] for c in clauses_a]
-        texts_b = [c["content"] for c in clauses_b]
-        embeddings_a = embedding_model.embed_documents(texts_a)
-        embeddings_b = embedding_model.embed_documents(texts_b)
-
-        # **OPTIMIZATION 2: Calculate all similarities at once**
-        print("   Calculating similarity matrix...")
-        # This creates a matrix where similarity_matrix[i][j] is the similarity
-        # between clause i from doc A and clause j from doc B.
-        similarity_matrix = cosine_similarity(embeddings_a, embeddings_b)
-        
+        # Hash duplicates are paired first, so only the remaining clauses are embedded
+        # (in one batch API call), then the rest is solved as a global alignment.
+        print(f"   Aligning clauses ({settings.COMPARISON_ALIGNMENT})...")
+        alignment = align_clauses(
+            clauses_a, clauses_b,
+            embed_fn=get_embedding_function().embed_documents,
+            method=settings.COMPARISON_ALIGNMENT,
+            modified_threshold=settings.COMPARISON_MODIFIED_THRESHOLD
+        )
+        print(f"   Alignment stats: {alignment['stats']}")
+        print(f"   Embedding cache: {get_embedding_function().stats()}")
+        return self._build_changes(clauses_a, clauses_b, alignment)
+
+    def compare_many(self, base_text: str, version_texts: List[str]) -> Iterator[ComparisonOutput]:
+        """
+        Compares one base document against many versions of it. Base clauses are
+        embedded once and all versions share one similarity pass; results are yielded
+        per version, in order, as soon as each version's explanations are ready.
+        """
+        base_clauses = extract_clauses(base_text)
+        versions = [extract_clauses(text) for text in version_texts]
+        print(f"   Aligning {len(base_clauses)} base clauses against {len(versions)} versions...")
+        alignments = align_clauses_many(
+            base_clauses, versions,
+            embed_fn=get_embedding_function().embed_documents,
+            method=settings.COMPARISON_ALIGNMENT,
+            modified_threshold=settings.COMPARISON_MODIFIED_THRESHOLD
+        )
+        for clauses, alignment in zip(versions, alignments):
+            yield self._build_changes(base_clauses, clauses, alignment)
+
+    def _explanation_inputs(self, change: Change) -> Dict[str, str]:
+        """Both versions of the clause, each shortened alike if together they exceed the budget."""
+        inputs, _ = fit_prompt("explanation", "gpt-4", explanation_prompt, [
+            {"name": "text_a", "items": [change.text_a], "compress_to": settings.PROMPT_BUDGETS["explanation"] // 3, "required": True},
+            {"name": "text_b", "items": [change.text_b], "compress_to": settings.PROMPT_BUDGETS["explanation"] // 3, "required": True},
+        ])
+        return inputs
+
+    def _build_changes(self, clauses_a: List[Dict], clauses_b: List[Dict], alignment: Dict) -> ComparisonOutput:
+        """Turns an alignment into the list of changes, explaining substantive edits."""
         changes = []
-        matched_b_indices = set()
+        pairs_by_a = {p["index_a"]: p for p in alignment["pairs"]}
+        needs_explanation = []
 
-        # Find matches for clauses in Document A
-        print("   Aligning clauses and identifying changes...")
+        # Walk Document A in order, reporting modified and removed clauses
         for i, clause_a in enumerate(clauses_a):
-            # **OPTIMIZATION 3: Find best match instantly using the matrix**
-            best_match_idx = np.argmax(similarity_matrix[i])
-            best_match_score = similarity_matrix[i][best_match_idx]
-            
-            # Categorize the change
-            if best_match_score > 0.98: # Stricter threshold for "identical"
-                matched_b_indices.add(best_match_idx)
-            elif best_match_score > 0.75: # Threshold for "modified"
-                if best_match_idx in matched_b_indices: continue # Already matched to a better candidate
-                matched_b_indices.add(best_match_idx)
-                clause_b = clauses_b[best_match_idx]
-                explanation = explanation_chain.invoke({"text_a": clause_a["content"], "text_b": clause_b["content"]})
-                changes.append(Change(
+            pair = pairs_by_a.get(i)
+            if pair is None:
+                changes.append(Change(type="removed", clause_number_a=clause_a["clause_number"], text_a=clause_a["content"], clause_number_b="", text_b="", explanation="This clause from Document A was not found in Document B."))
+            elif pair["status"] == "modified":
+                clause_b = clauses_b[pair["index_b"]]
+                # Classify the edit locally; trivial edits never reach the LLM
+                change_kind = classify_edit(clause_a["content"], clause_b["content"])
+                change = Change(
                     type="modified",
                     clause_number_a=clause_a["clause_number"], text_a=clause_a["content"],
                     clause_number_b=clause_b["clause_number"], text_b=clause_b["content"],
-                    explanation=explanation
-                ))
-            else: # No good match found
-                changes.append(Change(type="removed", clause_number_a=clause_a["clause_number"], text_a=clause_a["content"], clause_number_b="", text_b="", explanation="This clause from Document A was not found in Document B."))
+                    explanation=f"Trivial {change_kind} edit with no change in legal meaning." if change_kind in TRIVIAL_KINDS else "",
+                    change_kind=change_kind,
+                    diff=[DiffHunk(**h) for h in word_diff(clause_a["content"], clause_b["content"])]
+                )
+                changes.append(change)
+                if change_kind not in TRIVIAL_KINDS:
+                    needs_explanation.append(change)
+
+        # Explain only the substantive edits, concurrently under a limit
+        if needs_explanation:
+            print(f"   Explaining {len(needs_explanation)} substantive edits "
+                  f"(max {settings.COMPARISON_EXPLANATION_CONCURRENCY} concurrent calls)...")
+            explanations = registry.get("explanation_chain").batch(
+                [self._explanation_inputs(c) for c in needs_explanation],
+                config={"max_concurrency": settings.COMPARISON_EXPLANATION_CONCURRENCY},
+                return_exceptions=True
+            )
+            for change, explanation in zip(needs_explanation, explanations):
+                if isinstance(explanation, Exception):
+                    change.explanation = f"An explanation could not be generated: {explanation}"
+                else:
+                    change.explanation = explanation
 
         # Identify added clauses from Document B
-        for j, clause_b in enumerate(clauses_b):
-            if j not in matched_b_indices:
-                changes.append(Change(type="added", clause_number_a="", text_a="", clause_number_b=clause_b["clause_number"], text_b=clause_b["content"], explanation="This clause was newly added in Document B."))
+        for j in alignment["added"]:
+            clause_b = clauses_b[j]
+            changes.append(Change(type="added", clause_number_a="", text_a="", clause_number_b=clause_b["clause_number"], text_b=clause_b["content"], explanation="This clause was newly added in Document B."))
         
-        return ComparisonOutput(changes=changes)
+        return ComparisonOutput(changes=changes, stats=alignment["stats"])
 
 # --- LANGGRAPH NODE (No Change) ---
 def comparison_node(state: AgentState) -> AgentState:
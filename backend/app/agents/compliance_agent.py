@@ -1,11 +1,13 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 import re
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
 
 from app.core.config import settings
+from app.core.registry import registry, get_chat_model
+from app.utils.prompt_budget import fit_prompt
+from app.utils.streaming_json import stream_json, record_retry
 from .state import AgentState
 # --- 1. DEFINE RULE SETS AND OUTPUT MODELS ---
 
@@ -41,7 +43,6 @@ class ComplianceOutput(BaseModel):
 
 # --- 2. BUILD THE COMPLIANCE VERIFICATION CHAIN ---
 
-llm = ChatOpenAI(model="gpt-4-turbo", temperature=0, api_key=settings.OPENAI_API_KEY)
 parser = PydanticOutputParser(pydantic_object=ComplianceResult)
 
 compliance_prompt = ChatPromptTemplate.from_messages(
@@ -73,7 +74,8 @@ compliance_prompt = ChatPromptTemplate.from_messages(
     ]
 ).partial(format_instructions=parser.get_format_instructions())
 
-compliance_chain = compliance_prompt | llm | parser
+# Built on first use. The completion is parsed as it streams (see app.utils.streaming_json)
+registry.register("compliance_chain", lambda: compliance_prompt | get_chat_model("gpt-4-turbo") | StrOutputParser())
 
 # --- 3. CREATE THE AGENT'S CORE LOGIC ---
 
@@ -90,6 +92,46 @@ class ComplianceAgent:
             print(f"   - Requirement '{rule['requirement']}': Keywords {'FOUND' if found else 'NOT FOUND'}")
         return results
 
+    def _contract_section(self, text: str, rule: Dict) -> Dict:
+        """
+        The contract's paragraphs, ranked by how many of the rule's keywords they contain,
+        so a long contract is cut down to the parts relevant to the rule. Paragraphs that
+        fit the budget are sent in their original order.
+        """
+        paragraphs = [p for p in text.splitlines() if p.strip()]
+        patterns = [re.compile(r'\b' + keyword + r'\b', re.IGNORECASE) for keyword in rule['keywords']]
+        hits = [sum(len(p.findall(paragraph)) for p in patterns) for paragraph in paragraphs]
+        ranked = sorted(range(len(paragraphs)), key=lambda i: (-hits[i], i))
+        return {
+            "name": "full_text",
+            "items": [paragraphs[i] for i in ranked],
+            "positions": ranked,
+            "compress_to": 200
+        }
+
+    def _llm_check(self, inputs: Dict, rule: Dict, retry: bool = True) -> ComplianceResult:
+        """
+        Runs the compliance chain. If its output is cut off or malformed after the verdict
+        and assessment are complete, the result is kept from those; otherwise asked again, once.
+        """
+        streamed = stream_json("compliance", registry.get("compliance_chain"), inputs)
+        fields = streamed["parser"]
+        if streamed["complete"]:
+            return parser.parse(fields.text)
+        if fields.field("is_compliant") is not None and fields.field("assessment"):
+            return ComplianceResult(
+                requirement=fields.field("requirement") or rule['requirement'],
+                is_compliant=fields.field("is_compliant"),
+                clause_text=fields.field("clause_text"),
+                assessment=fields.field("assessment"),
+                severity=rule['severity']
+            )
+        if not retry:
+            raise ValueError("The compliance check's output was cut off before its assessment.")
+        print(f"   Compliance output incomplete; asking again for '{rule['requirement']}'.")
+        record_retry("compliance")
+        return self._llm_check(inputs, rule, retry=False)
+
     def run(self, document_text: str) -> ComplianceOutput:
         """Runs the full hybrid compliance check."""
         keyword_results = self._keyword_check(document_text, GDPR_RULES)
@@ -111,11 +153,13 @@ class ComplianceAgent:
             else:
                 # Keywords were found, so run the more expensive LLM check
                 try:
-                    result = compliance_chain.invoke({
-                        "requirement": requirement,
-                        "description": rule['description'],
-                        "full_text": document_text
-                    })
+                    inputs, _ = fit_prompt(
+                        "compliance", "gpt-4-turbo", compliance_prompt,
+                        [self._contract_section(document_text, rule)],
+                        requirement=requirement,
+                        description=rule['description']
+                    )
+                    result = self._llm_check(inputs, rule)
                     # Add the severity from our rule definition to the LLM's result
                     result.severity = rule['severity']
                 except Exception as e:
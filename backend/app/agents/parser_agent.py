@@ -1,12 +1,16 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
 
 from app.core.config import settings
+from app.core.registry import registry, get_chat_model
 from app.utils.document_parser import extract_clauses
-from .state import AgentState
+from app.core.cascade import run_cascade, confidence_too_low
+from app.utils.clause_categories import categorize_clause, CLAUSE_CATEGORIES
+from app.utils.prompt_budget import fit_prompt, truncate_to_tokens
+from app.utils.streaming_json import stream_json, record_retry
+from .state import AgentState, stream_writer
 import json
 
 # --- 1. DEFINE A MORE COMPLEX STRUCTURED OUTPUT ---
@@ -14,14 +18,13 @@ import json
 class ClauseClassification(BaseModel):
     clause_number: str = Field(description="The number of the clause, e.g., '1.1' or 'a'.")
     category: str = Field(description="The classification category for this clause.")
+    confidence: float = Field(default=1.0, ge=0.0, le=1.0, description="How confident you are in this category, from 0.0 to 1.0.")
 
 class ClassificationOutput(BaseModel):
     classifications: List[ClauseClassification] = Field(description="A list of all classified clauses.")
 
 # --- 2. UPDATE THE CLASSIFICATION CHAIN ---
 
-llm = ChatOpenAI(model="gpt-4-turbo", temperature=0, api_key=settings.OPENAI_API_KEY)
-
 # Create a Pydantic parser for our new, more complex output
 pydantic_parser = PydanticOutputParser(pydantic_object=ClassificationOutput)
 
@@ -59,8 +62,19 @@ classification_prompt = ChatPromptTemplate.from_messages(
     ]
 ).partial(format_instructions=pydantic_parser.get_format_instructions())
 
-# Create the chain with the new Pydantic parser
-classification_chain = classification_prompt | llm | pydantic_parser
+CLASSIFICATION_MODEL = "gpt-4-turbo"
+CATEGORY_NAMES = {entry["category"] for entry in CLAUSE_CATEGORIES} | {"Other"}
+
+
+def _classification_chain(model: str):
+    # The completion is parsed as it streams (see app.utils.streaming_json)
+    return lambda: classification_prompt | get_chat_model(model) | StrOutputParser()
+
+
+# Create the chain (built on first use), on the default model and on each model of the
+# cascade's tiers. The Pydantic parser's schema is in the prompt
+for _model in dict.fromkeys([CLASSIFICATION_MODEL, *settings.CASCADE_TIERS["classification"]]):
+    registry.register(f"classification_chain:{_model}", _classification_chain(_model))
 
 
 # --- 3. REFACTOR THE AGENT'S CORE LOGIC ---
@@ -71,26 +85,121 @@ class DocumentParserAgent:
     def run(self, document_text: str) -> Dict:
         print("   Running clause extraction from Phase 1...")
         clauses = extract_clauses(document_text)
+        if settings.CASCADE_ENABLED:
+            print(f"   Found {len(clauses)} clauses. Now classifying with the model cascade...")
+            return {"parsed_clauses": self._classify_cascade(clauses)}
         print(f"   Found {len(clauses)} clauses. Now classifying with a single LLM call...")
         
-        # Convert clauses to a JSON string to pass to the prompt
-        clauses_json = json.dumps(clauses)
-        
-        # Invoke the chain ONCE for all clauses
-        result = classification_chain.invoke({"clauses_json": clauses_json})
+        # Invoke the chain ONCE for all clauses, emitting each classification as it arrives
+        write = stream_writer()
+        clause_map = {c["clause_number"]: c["content"] for c in clauses}
+        classifications, sent = self._classify(clauses, CLASSIFICATION_MODEL, on_item=lambda c: write({"clause": {
+            "clause_number": c.clause_number, "text": clause_map.get(c.clause_number, ""), "category": c.category
+        }}))
         
         # Combine original text with the new categories
-        clause_map = {c["clause_number"]: c["content"] for c in clauses}
         classified_clauses = []
-        for classification in result.classifications:
+        for classification in classifications:
             classified_clauses.append({
                 "clause_number": classification.clause_number,
                 "text": clause_map.get(classification.clause_number, ""),
                 "category": classification.category
             })
+        answered = {c.clause_number for c in classifications}
+        unanswered = [c for c in clauses[:sent] if c["clause_number"] not in answered]
+        if unanswered:
+            print(f"   {len(unanswered)} clauses missing from the model's output, classified by keywords.")
+        if sent < len(clauses):
+            print(f"   {len(clauses) - sent} clauses over the prompt budget, classified by keywords.")
+        classified_clauses.extend(
+            {"clause_number": c["clause_number"], "text": c["content"], "category": categorize_clause(c["content"])}
+            for c in unanswered + clauses[sent:]
+        )
         
         return {"parsed_clauses": classified_clauses}
 
+    def _classify(self, clauses: List[Dict], model: str, on_item=None, retry: bool = True):
+        """
+        Classifies clauses in one call on `model`; returns the classifications and how many
+        clauses were sent. Classifications are passed to `on_item` as they stream. If the
+        output is cut off or malformed, the complete ones are kept and only the clauses
+        still missing are asked again, once.
+        """
+        # One JSON object per clause. Over budget, long clauses are shortened (the opening
+        # is enough to classify them) and clauses beyond the budget are left out.
+        inputs, prompt_report = fit_prompt("classification", model, classification_prompt, [{
+            "name": "clauses_json",
+            "items": [json.dumps(c) for c in clauses],
+            "compress_to": 80,
+            "compress": self._shorten_clause,
+            "separator": ",\n"
+        }])
+        sent = prompt_report["kept"]["clauses_json"]
+        chain = registry.get(f"classification_chain:{model}", _classification_chain(model))
+        streamed = stream_json("classification", chain, {"clauses_json": f"[{inputs['clauses_json']}]"},
+                               ClauseClassification, "classifications", on_item, model)
+        classifications = streamed["items"]
+        if retry and (not streamed["complete"] or streamed["invalid"]):
+            answered = {c.clause_number for c in classifications}
+            missing = [c for c in clauses[:sent] if c["clause_number"] not in answered]
+            if missing:
+                print(f"   Classification output incomplete; asking again for the {len(missing)} missing clauses.")
+                record_retry("classification")
+                more, _ = self._classify(missing, model, on_item, retry=False)
+                classifications = classifications + more
+        return classifications, sent
+
+    def _classify_cascade(self, clauses: List[Dict]) -> List[Dict]:
+        """
+        Classifies on the cascade's cheapest model first; clauses it leaves out, puts in
+        an unknown category or is unsure of go up a tier (see app.core.cascade). Each
+        classification is emitted once its tier accepts it.
+        """
+        by_number = {}
+        for c in clauses:
+            by_number.setdefault(c["clause_number"], c)
+
+        def ask(model: str, numbers: List[str]) -> Dict[str, ClauseClassification]:
+            classifications, _ = self._classify([by_number[n] for n in numbers], model)
+            wanted = set(numbers)
+            return {c.clause_number: c for c in classifications if c.clause_number in wanted}
+
+        def escalate(number: str, classification: ClauseClassification):
+            if classification.category not in CATEGORY_NAMES:
+                return "invalid"
+            if confidence_too_low(classification.confidence):
+                return "low_confidence"
+            return None
+
+        write = stream_writer()
+        answers, report = run_cascade("classification", list(by_number), ask, escalate,
+                                      lambda a, b: a.category == b.category,
+                                      on_accept=lambda n, c: write({"clause": {
+                                          "clause_number": n, "text": by_number[n]["content"], "category": c.category
+                                      }}))
+        print("   Cascade: " + ", ".join(
+            f"{t['model']} classified {t['items'] - sum(t['escalated'].values()) - t['unanswered']}/{t['items']} in {t['seconds']:.1f}s"
+            for t in report["tiers"]
+        ))
+        unanswered = [n for n in by_number if n not in answers]
+        if unanswered:
+            print(f"   {len(unanswered)} clauses left unclassified by the models, classified by keywords.")
+        return [
+            {
+                "clause_number": c["clause_number"],
+                "text": c["content"],
+                "category": answers[c["clause_number"]].category if c["clause_number"] in answers
+                else categorize_clause(c["content"])
+            }
+            for c in clauses
+        ]
+
+    @staticmethod
+    def _shorten_clause(item: str, max_tokens: int, model: str) -> str:
+        clause = json.loads(item)
+        clause["content"] = truncate_to_tokens(clause["content"], max(8, max_tokens - 12), model)
+        return json.dumps(clause)
+
 # --- 4. THE LANGGRAPH NODE (No changes needed) ---
 def document_parser_node(state: AgentState) -> AgentState:
     print("---NODE: Document Parser---")
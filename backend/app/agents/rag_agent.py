@@ -1,19 +1,93 @@
 # in app/agents/rag_agent.py
+import re
 import logging
-from langchain_openai import ChatOpenAI
+from typing import List, Dict, Any
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from .state import AgentState
 from app.core.config import settings
+from app.core.registry import registry, get_chat_model
+from app.utils.text_index import get_text_index, extract_citations, DocumentTextIndex
+from app.utils.embeddings import index_document, is_indexed, search_documents, get_embedding_function
+from app.utils.answer_cache import answer_cache, content_hash
+from app.utils.conversation_memory import format_history
+from app.utils.prompt_budget import fit_prompt, count_tokens
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, api_key=settings.OPENAI_API_KEY)
+CHUNK_REFERENCE = re.compile(r'\[Chunk (\d+)\]')
+
+summary_prompt = ChatPromptTemplate.from_template(
+    """Update the running summary of a Q&A conversation about a contract.
+Keep the facts that were established (parties, clauses, numbers, dates) and the topics asked about.
+Write at most 120 words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:"""
+)
+registry.register("summary_chain", lambda: summary_prompt | get_chat_model("gpt-3.5-turbo") | StrOutputParser())
+
+
+def summarize_turns(summary: str, turns: List[Dict[str, str]]) -> str:
+    """Folds turns that left the history window into the rolling summary."""
+    inputs, _ = fit_prompt("summary", "gpt-3.5-turbo", summary_prompt, [
+        {"name": "turns", "items": [format_history("", [t]) for t in turns], "compress_to": 200, "required": True}
+    ], summary=summary or "(none)")
+    return registry.get("summary_chain").invoke(inputs)
+
+
+def retrieve_chunks(document_id: str, document_text: str, question: str, k: int = settings.QA_TOP_K) -> List[Dict]:
+    """
+    Retrieves the k chunks of the document most relevant to the question.
+    Documents that were never indexed are indexed first.
+    """
+    if not is_indexed(document_id):
+        index_document(doc_id=document_id, text=document_text, metadata={})
+    chunks = search_documents(question, n_results=k, doc_id=document_id)
+    # Present the excerpts in document order so the LLM reads them in context; 'rank'
+    # keeps the relevance order
+    for rank, chunk in enumerate(chunks):
+        chunk["rank"] = rank
+    return sorted(chunks, key=lambda c: c["metadata"].get("chunk_id", 0))
+
+
+def build_citations(answer: str, chunks: List[Dict], index: DocumentTextIndex) -> List[Dict[str, Any]]:
+    """
+    Citations for an answer: each quoted passage, plus each chunk the answer refers to
+    as [Chunk N] without quoting it. Every citation carries its chunk id and location.
+    """
+    chunk_spans = []
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        location = index.locate(chunk["content"], start_hint=metadata.get("start_index"))
+        chunk_spans.append((metadata.get("chunk_id"), location))
+
+    def containing_chunk(location: Dict) -> Any:
+        for chunk_id, span in chunk_spans:
+            if span and span["start"] <= location["start"] and location["end"] <= span["end"]:
+                return chunk_id
+        return None
+
+    citations = [{**location, "chunk_id": containing_chunk(location)} for location in extract_citations(answer, index)]
+    cited_chunks = {c["chunk_id"] for c in citations}
+    referenced = {int(n) for n in CHUNK_REFERENCE.findall(answer)}
+    for chunk_id, span in chunk_spans:
+        if span and chunk_id in referenced and chunk_id not in cited_chunks:
+            citations.append({**span, "chunk_id": chunk_id})
+    return citations
+
 
 def rag_node(state: AgentState) -> AgentState:
     """
     RAG node for Q&A functionality.
-    Answers questions based on the document text.
+    Answers questions from the document chunks most relevant to the question, so the
+    prompt size stays constant whatever the length of the contract.
     """
     logger.info("---NODE: RAG Q&A---")
     
@@ -44,43 +118,108 @@ def rag_node(state: AgentState) -> AgentState:
         return state
     
     logger.info(f"Processing question: {question[:100]}...")
+
+    # Earlier turns of the session (already bounded by the conversation memory)
+    summary = state.get("conversation_summary", "")
+    previous_turns = [m for m in qa_messages[:-1] if m.get("role") in ("user", "assistant")]
+    history = format_history(summary, previous_turns)
+
+    # Serve rephrasings of earlier questions about the same text from the answer cache.
+    # Follow-ups depend on the conversation, so only first questions use it.
+    question_vector = None
+    if settings.QA_CACHE_ENABLED and not history:
+        text_hash = content_hash(document_text)
+        question_vector = get_embedding_function().embed_query(question)
+        cached = answer_cache.lookup(state["document_id"], text_hash, question, question_vector)
+        if cached:
+            logger.info(f"Answer cache hit (similarity {cached['similarity']}): {cached['question'][:100]}")
+            state["qa_messages"].append({
+                "role": "assistant",
+                "content": cached["answer"],
+                "citations": cached["citations"],
+                "cached": True
+            })
+            state["current_step"] = "qa_complete"
+            return state
     
     # Create Q&A prompt
     qa_prompt = ChatPromptTemplate.from_template(
         """You are a legal assistant helping to analyze a contract. 
         
-Based on the following contract text, answer the user's question accurately and concisely.
+Based on the following excerpts from the contract, answer the user's question accurately and concisely.
+
+Contract Excerpts:
+{excerpts}
 
-Contract Text:
-{document_text}
+Conversation So Far:
+{history}
 
 Question: {question}
 
 Instructions:
-1. Provide a clear, direct answer based only on the contract text
-2. Quote relevant sections when possible
-3. If the answer isn't in the contract, say so clearly
-4. Keep your answer focused and professional
+1. Provide a clear, direct answer based only on the contract excerpts
+2. Quote relevant sections when possible, and name the excerpt you rely on as [Chunk N]
+3. If the answer isn't in the excerpts, say so clearly
+4. Use the conversation only to understand what the question refers to
+5. Keep your answer focused and professional
 
 Answer:"""
     )
     
     try:
+        # Retrieve the relevant chunks instead of sending the whole contract
+        # A follow-up ("and the other party?") is searched together with the previous question
+        previous_questions = [m["content"] for m in previous_turns if m["role"] == "user"]
+        search_query = f"{previous_questions[-1]}\n{question}" if previous_questions else question
+        chunks = retrieve_chunks(state["document_id"], document_text, search_query)
+        state["context"] = chunks
+        logger.info(f"Retrieved {len(chunks)} chunks: {[c['metadata'].get('chunk_id') for c in chunks]}")
+        # Over the prompt budget, the lowest-ranked excerpts go first, then the oldest history
+        by_rank = sorted(range(len(chunks)), key=lambda i: chunks[i].get("rank", i))
+        history_items = ([format_history(summary, [])] if summary else []) + [format_history("", [t]) for t in previous_turns]
+        prompt_inputs, prompt_report = fit_prompt("qa", "gpt-3.5-turbo", qa_prompt, [
+            {
+                "name": "excerpts",
+                "items": [f"[Chunk {chunks[i]['metadata'].get('chunk_id')}]\n{chunks[i]['content']}" for i in by_rank],
+                "positions": by_rank,
+                "separator": "\n\n",
+                "required": True
+            },
+            {
+                "name": "history",
+                "items": history_items[::-1],
+                "positions": list(range(len(history_items)))[::-1],
+                "compress_to": 100,
+                "empty": "(none)"
+            }
+        ], question=question)
+        prompt_tokens = {
+            "excerpts": prompt_report["sections"]["excerpts"],
+            "history": prompt_report["sections"]["history"],
+            "question": count_tokens(question, "gpt-3.5-turbo"),
+            "total": prompt_report["total"]
+        }
+        logger.info(f"Prompt tokens: {prompt_tokens}")
+
         # Get answer from LLM
-        response = (qa_prompt | llm).invoke({
-            "document_text": document_text[:4000],  # Limit to avoid token limits
-            "question": question
-        })
+        response = (qa_prompt | get_chat_model("gpt-3.5-turbo")).invoke(prompt_inputs)
         
         answer = response.content
+
+        # Resolve quoted passages and referenced chunks to their location in the document
+        citations = build_citations(answer, chunks, get_text_index(document_text))
         
         # Add assistant response to messages
         state["qa_messages"].append({
             "role": "assistant",
             "content": answer,
-            "citations": []  # Can be enhanced to extract citations
+            "citations": citations,
+            "prompt_tokens": prompt_tokens
         })
         
+        if question_vector is not None:
+            answer_cache.store(state["document_id"], text_hash, question, question_vector, answer, citations)
+
         logger.info("Q&A response generated successfully")
         state["current_step"] = "qa_complete"
         
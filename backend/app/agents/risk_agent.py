@@ -1,19 +1,25 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
 from pydantic import BaseModel, Field
 from typing import List, Dict
 from app.core.config import settings
-from .state import AgentState
+from app.core.registry import registry, get_chat_model
+from app.core.cascade import run_cascade, confidence_too_low
+from app.utils.risk_patterns import prescreen_clauses, provisional_risks, SEVERITY_ORDER
+from app.utils.prompt_budget import fit_prompt
+from app.utils.streaming_json import stream_json, record_retry
+from .state import AgentState, stream_writer
 
 # --- 1. DEFINE THE STRUCTURED OUTPUT MODELS ---
 
 class Risk(BaseModel):
     """A single identified legal risk."""
+    clause_number: str = Field(default="", description="The number of the clause that contains the risk, as given.")
     clause_text: str = Field(description="The specific text of the clause that contains the risk.")
     risk_level: str = Field(description="The severity of the risk (low, medium, high, or critical).")
     description: str = Field(description="A detailed explanation of why this clause is a risk.")
     mitigation: str = Field(description="A suggestion on how to modify the clause to reduce the risk.")
+    confidence: float = Field(default=1.0, ge=0.0, le=1.0, description="How confident you are in this assessment, from 0.0 to 1.0.")
 
 class RiskAnalysisOutput(BaseModel):
     """The complete risk analysis for a set of clauses."""
@@ -22,9 +28,6 @@ class RiskAnalysisOutput(BaseModel):
 
 
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-4-turbo", temperature=0, api_key=settings.OPENAI_API_KEY)
-
 # Create an instance of our Pydantic Output Parser
 parser = PydanticOutputParser(pydantic_object=RiskAnalysisOutput)
 
@@ -59,8 +62,18 @@ risk_prompt = ChatPromptTemplate.from_messages(
     ]
 ).partial(format_instructions=parser.get_format_instructions())
 
-# Create the full LCEL chain
-risk_assessment_chain = risk_prompt | llm | parser
+RISK_MODEL = "gpt-4-turbo"
+
+
+def _risk_chain(model: str):
+    # The completion is parsed as it streams (see app.utils.streaming_json)
+    return lambda: risk_prompt | get_chat_model(model) | StrOutputParser()
+
+
+# Create the full LCEL chain (built on first use), on the default model and on each
+# model of the cascade's tiers. The Pydantic parser's schema is in the prompt
+for _model in dict.fromkeys([RISK_MODEL, *settings.CASCADE_TIERS["risk"]]):
+    registry.register(f"risk_assessment_chain:{_model}", _risk_chain(_model))
 
 
 
@@ -68,27 +81,183 @@ risk_assessment_chain = risk_prompt | llm | parser
 
 class RiskAssessmentAgent:
     """This agent analyzes parsed clauses to identify legal risks."""
-    
+
+    def __init__(self):
+        self.prescreen_report: Dict = {}
+
+    def _format_clause(self, clause: Dict) -> str:
+        """Formats a clause for the prompt, including any pattern-library hints."""
+        line = f"Clause {clause.get('clause_number', 'N/A')}: {clause.get('text', '')}"
+        flags = clause.get('pattern_flags')
+        if flags:
+            hints = ", ".join(f"{f['risk_type']} ({f['severity']})" for f in flags)
+            line += f"\n[Pre-flagged as: {hints}]"
+        return line
+
+    def _flag_severity(self, clause: Dict) -> int:
+        """The most severe pattern flag of a clause; -1 if it has none."""
+        return max((SEVERITY_ORDER.get(f['severity'], 0) for f in clause.get('pattern_flags') or []), default=-1)
+
     def run(self, parsed_clauses: List[Dict]) -> RiskAnalysisOutput:
         """
         Processes the clauses and returns a structured risk analysis.
+        Clauses the pattern library marks as benign are never sent to the LLM.
         """
-        print(f"   Analyzing {len(parsed_clauses)} clauses for risks...")
+        screened = prescreen_clauses(parsed_clauses)
+        self.prescreen_report = screened["report"]
+        clauses_for_llm = screened["to_llm"]
+        print(f"   Pattern pre-screen: {len(screened['benign'])} benign clauses skipped, "
+              f"{self.prescreen_report['flagged_clauses']} pre-flagged "
+              f"({self.prescreen_report['diverted_token_fraction']:.0%} of tokens diverted).")
+
+        if not clauses_for_llm:
+            return RiskAnalysisOutput(risks=[], overall_risk_score="low")
 
-        # Format the clauses into a single string for the prompt
-        clauses_text = "\n\n".join(
-            [f"Clause {c.get('clause_number', 'N/A')}: {c.get('text', '')}" for c in parsed_clauses]
-        )
+        print(f"   Analyzing {len(clauses_for_llm)} clauses for risks...")
+        if settings.CASCADE_ENABLED:
+            # A failing tier is handled in the cascade (its clauses get provisional risks);
+            # this only guards against anything else going wrong
+            try:
+                return self._analyze_cascade(clauses_for_llm)
+            except Exception as e:
+                print(f"   An error occurred during risk analysis: {e}")
+                return self._provisional_analysis(clauses_for_llm)
 
-        # Invoke the chain
-        # The Pydantic parser will automatically handle validation and conversion
+        # Invoke the chain, emitting each risk as soon as its JSON is complete
+        # The Pydantic model validates each risk as it arrives
+        write = stream_writer()
         try:
-            analysis_result = risk_assessment_chain.invoke({"clauses_text": clauses_text})
+            analysis_result, left_out = self._analyze(clauses_for_llm, RISK_MODEL,
+                                                      on_item=lambda r: write({"risk": r.model_dump()}))
+            analysis_result.risks.extend(Risk(**r) for r in provisional_risks(left_out))
             return analysis_result
         except Exception as e:
             print(f"   An error occurred during risk analysis: {e}")
-            # Return an empty result in case of an error
-            return RiskAnalysisOutput(risks=[], overall_risk_score="unknown")
+            return self._provisional_analysis(clauses_for_llm)
+
+    def _analyze(self, clauses: List[Dict], model: str, on_item=None, retry: bool = True):
+        """
+        Analyzes clauses in one call on `model`; returns the analysis and the clauses left
+        out of the prompt. Risks are passed to `on_item` as they stream. If the output is
+        cut off or malformed, the complete risks are kept and only the clauses after the
+        last one reached are asked again, once.
+        """
+        # Format the clauses into a single string for the prompt. Over budget, clauses are
+        # shortened, then dropped, starting with those the pattern library flagged least.
+        ranked = sorted(range(len(clauses)), key=lambda i: (-self._flag_severity(clauses[i]), i))
+        inputs, prompt_report = fit_prompt("risk", model, risk_prompt, [{
+            "name": "clauses_text",
+            "items": [self._format_clause(clauses[i]) for i in ranked],
+            "positions": ranked,
+            "compress_to": 150,
+            "separator": "\n\n",
+            "required": True
+        }])
+        kept = prompt_report["kept"]["clauses_text"]
+        # Clauses left out keep the pattern library's provisional risks
+        left_out = [clauses[i] for i in ranked[kept:]]
+        if left_out:
+            print(f"   {len(left_out)} least flagged clauses left out to stay within "
+                  f"{prompt_report['budget']} prompt tokens.")
+        chain = registry.get(f"risk_assessment_chain:{model}", _risk_chain(model))
+        streamed = stream_json("risk", chain, inputs, Risk, "risks", on_item, model)
+        risks = streamed["items"]
+
+        if retry and not streamed["complete"]:
+            # The clauses were listed, and are answered, in their original order
+            sent = [clauses[i] for i in sorted(ranked[:kept])]
+            numbers = [str(c.get("clause_number", "N/A")) for c in sent]
+            candidates = {n: [] for n in numbers}
+            by_number = dict(zip(numbers, sent))
+            matched = {self._match_clause(r, candidates, by_number) for r in risks}
+            reached = max((i for i, n in enumerate(numbers) if n in matched), default=-1)
+            rest = sent[reached + 1:]
+            if rest:
+                print(f"   Risk output incomplete; asking again for the {len(rest)} clauses not reached.")
+                record_retry("risk")
+                more, _ = self._analyze(rest, model, on_item, retry=False)
+                risks = risks + more.risks
+
+        overall = streamed["parser"].field("overall_risk_score") or self._highest_level(risks) or "low"
+        return RiskAnalysisOutput(risks=risks, overall_risk_score=overall), left_out
+
+    def _provisional_analysis(self, clauses: List[Dict]) -> RiskAnalysisOutput:
+        # Fall back to the provisional risks from the pattern library
+        risks = [Risk(**r) for r in provisional_risks(clauses)]
+        overall = max((r.risk_level for r in risks), key=SEVERITY_ORDER.get, default="unknown")
+        return RiskAnalysisOutput(risks=risks, overall_risk_score=overall)
+
+    def _analyze_cascade(self, clauses: List[Dict]) -> RiskAnalysisOutput:
+        """
+        Analyzes on the cascade's cheapest model first (see app.core.cascade). A clause
+        goes up a tier if it was left out, if any of its risks has an unknown level, low
+        confidence or a level in CASCADE_ESCALATE_LEVELS, or if the pattern library
+        flagged it and no risk was found. A clause's risks are emitted once its tier
+        accepts them.
+        """
+        by_number = {}
+        for c in clauses:
+            by_number.setdefault(str(c.get("clause_number", "N/A")), c)
+
+        def ask(model: str, numbers: List[str]) -> Dict[str, List[Risk]]:
+            analysis, left_out = self._analyze([by_number[n] for n in numbers], model)
+            skipped = {id(c) for c in left_out}
+            found = {n: [] for n in numbers if id(by_number[n]) not in skipped}
+            for risk in analysis.risks:
+                number = self._match_clause(risk, found, by_number)
+                if number is not None:
+                    found[number].append(risk)
+                else:
+                    unmatched.append(risk)
+            return found
+
+        def escalate(number: str, risks: List[Risk]):
+            if any(r.risk_level not in SEVERITY_ORDER for r in risks):
+                return "invalid"
+            if any(confidence_too_low(r.confidence) for r in risks):
+                return "low_confidence"
+            if any(r.risk_level in settings.CASCADE_ESCALATE_LEVELS for r in risks):
+                return "severity"
+            if not risks and self._flag_severity(by_number[number]) >= 0:
+                return "flagged"
+            return None
+
+        write = stream_writer()
+
+        def emit(number: str, risks: List[Risk]):
+            for risk in risks:
+                write({"risk": risk.model_dump()})
+
+        unmatched: List[Risk] = []
+        answers, report = run_cascade("risk", list(by_number), ask, escalate,
+                                      lambda a, b: self._highest_level(a) == self._highest_level(b),
+                                      on_accept=emit)
+        # Risks that could not be matched to a clause are kept in the result, so emit them too
+        emit(None, unmatched)
+        print("   Cascade: " + ", ".join(
+            f"{t['model']} settled {t['items'] - sum(t['escalated'].values()) - t['unanswered']}/{t['items']} clauses in {t['seconds']:.1f}s"
+            for t in report["tiers"]
+        ))
+        risks = [risk for number in by_number if number in answers for risk in answers[number]] + unmatched
+        risks.extend(Risk(**r) for r in provisional_risks([c for n, c in by_number.items() if n not in answers]))
+        return RiskAnalysisOutput(risks=risks, overall_risk_score=self._highest_level(risks) or "low")
+
+    @staticmethod
+    def _match_clause(risk: Risk, candidates: Dict[str, List[Risk]], by_number: Dict[str, Dict]):
+        """The number of the clause (among `candidates`) a risk is about, or None."""
+        number = risk.clause_number.strip()
+        if number in candidates:
+            return number
+        snippet = " ".join(risk.clause_text.split())[:80]
+        for number in candidates:
+            if snippet and snippet in " ".join(by_number[number].get("text", "").split()):
+                return number
+        return None
+
+    @staticmethod
+    def _highest_level(risks: List[Risk]):
+        levels = [r.risk_level for r in risks if r.risk_level in SEVERITY_ORDER]
+        return max(levels, key=SEVERITY_ORDER.get, default=None)
 
 # --- 4. DEFINE THE LANGGRAPH NODE ---
 
@@ -108,6 +277,7 @@ def risk_assessment_node(state: AgentState) -> AgentState:
     
     # Update the shared state with the results
     state['identified_risks'] = analysis_result.risks
+    state['risk_prescreen'] = agent.prescreen_report
     state['current_step'] = "Risk Assessment Complete"
     
     print("---RISK ASSESSMENT COMPLETE---")
@@ -17,15 +17,29 @@ class AgentState(TypedDict):
 
     # Data added by the Risk Agent
     identified_risks: List[Dict]
+    risk_prescreen: Dict  # Pattern-library diversion report
 
     # Data for other agents we will build later
     missing_clauses: List[str]
     comparison_result: Dict
     compliance_results: List[Dict] 
     qa_messages: List[Dict] # For conversational Q&A
+    conversation_summary: str  # Rolling summary of turns that left the history window
     context: List[Any]
     final_report: str
 
     # Workflow management
     current_step: str
-    error: str
\ No newline at end of file
+    error: str
+
+
+def stream_writer():
+    """
+    LangGraph's custom stream writer for the running node (its chunks reach callers of
+    `graph.stream(..., stream_mode="custom")`), or a no-op outside a graph run.
+    """
+    from langgraph.config import get_stream_writer
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda chunk: None
@@ -1,12 +1,12 @@
 # in app/agents/supervisor.py
 import logging
-from langchain_openai import ChatOpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from langgraph.graph import StateGraph, END
 
-from .state import AgentState
+from .state import AgentState, stream_writer
 from .parser_agent import document_parser_node
 from .risk_agent import risk_assessment_node
 from .comparison_agent import comparison_node
@@ -14,60 +14,150 @@ from .rag_agent import rag_node
 from .compliance_agent import compliance_node
 
 from app.core.config import settings
+from app.core.registry import registry, get_chat_model
+from app.utils.prompt_budget import fit_prompt
+from app.utils.risk_patterns import SEVERITY_ORDER
 
 # --- 1. SET UP PROFESSIONAL LOGGING ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# --- 2. BUILD THE FINAL REPORT AGGREGATION CHAIN ---
+# --- 2. BUILD THE REPORT SECTION CHAINS ---
+# The report's sections are written concurrently, each from only the data it needs,
+# so the report takes about as long as its longest section rather than all three.
 
-llm = ChatOpenAI(model="gpt-4-turbo", temperature=0, api_key=settings.OPENAI_API_KEY)
+REPORT_DATA_TAGS = {
+    "identified_risks": "RISKS",
+    "compliance_results": "COMPLIANCE_RESULTS",
+    "parsed_clauses": "CLAUSES",
+}
 
-aggregator_prompt = ChatPromptTemplate.from_template(
-    """You are a senior legal counsel. Your task is to synthesize the findings from your team of junior analysts into a single, comprehensive executive summary.
+REPORT_SECTIONS = [
+    {
+        "name": "executive_summary",
+        "title": "Executive Summary",
+        "instructions": "A high-level overview of the contract's purpose, key risks, and overall compliance status.",
+        "data": ["identified_risks", "compliance_results", "parsed_clauses"],
+        "budget": "report_summary"
+    },
+    {
+        "name": "key_risks",
+        "title": "Key Risk Analysis",
+        "instructions": "Detail the most critical risks found, explaining their potential impact and suggested mitigations.",
+        "data": ["identified_risks"],
+        "budget": "report_risks"
+    },
+    {
+        "name": "compliance_assessment",
+        "title": "Compliance Assessment",
+        "instructions": "Summarize the findings of the compliance checks.",
+        "data": ["compliance_results"],
+        "budget": "report_compliance"
+    },
+]
 
-    You have been provided with the following data:
-    - A list of parsed contract clauses.
-    - A list of identified legal risks.
-    - A list of compliance check results.
 
-    Please generate a final report in Markdown format with the following sections:
-    1.  **Executive Summary:** A high-level overview of the contract's purpose, key risks, and overall compliance status.
-    2.  **Key Risk Analysis:** Detail the most critical risks found, explaining their potential impact and suggested mitigations.
-    3.  **Compliance Assessment:** Summarize the findings of the compliance checks.
+def _section_prompt(section: dict) -> ChatPromptTemplate:
+    data = "\n\n    ".join(
+        f"<{REPORT_DATA_TAGS[name]}>\n    {{{name}}}\n    </{REPORT_DATA_TAGS[name]}>" for name in section["data"]
+    )
+    return ChatPromptTemplate.from_template(
+        """You are a senior legal counsel. Your team of junior analysts has reviewed a contract, and you are writing one section of the final report from their findings.
 
-    Here is the data from your team:
+    Section: """ + section["title"] + """
+    """ + section["instructions"] + """
 
-    <RISKS>
-    {identified_risks}
-    </RISKS>
+    Write only the body of this section in Markdown, without the section heading.
 
-    <COMPLIANCE_RESULTS>
-    {compliance_results}
-    </COMPLIANCE_RESULTS>
+    Here is the data from your team:
 
-    <CLAUSES>
-    {parsed_clauses}
-    </CLAUSES>
+    """ + data + """
     """
-)
+    )
+
 
-aggregation_chain = aggregator_prompt | llm | StrOutputParser()
+for _section in REPORT_SECTIONS:
+    _section["prompt"] = _section_prompt(_section)
+    # Chains are built on first use (see app.core.registry), not at import
+    registry.register(
+        f"report_chain:{_section['name']}",
+        lambda prompt=_section["prompt"]: prompt | get_chat_model("gpt-4-turbo") | StrOutputParser()
+    )
 
 
 # --- 3. DEFINE THE NEW AGGREGATOR AND ERROR HANDLER NODES ---
 
+def _field(item, name: str, default=""):
+    """Reads a field from a pydantic result or a plain dict."""
+    value = item.get(name, default) if isinstance(item, dict) else getattr(item, name, default)
+    return default if value is None else value
+
+
+def report_data(state: AgentState) -> dict:
+    """
+    The report's inputs as compact lines instead of Python reprs, as prompt sections
+    (see app.utils.prompt_budget): risks most severe first, compliance failures first.
+    Sections that need several are given them in this order of importance.
+    """
+    risks = sorted(state.get("identified_risks") or [],
+                   key=lambda r: -SEVERITY_ORDER.get(str(_field(r, "risk_level")).lower(), -1))
+    compliance = sorted(state.get("compliance_results") or [], key=lambda c: bool(_field(c, "is_compliant", False)))
+    return {
+        "identified_risks": {"name": "identified_risks", "compress_to": 120, "empty": "(none)", "items": [
+            f"- [{str(_field(r, 'risk_level')).upper()}] {_field(r, 'clause_text')}\n"
+            f"  Risk: {_field(r, 'description')}\n  Mitigation: {_field(r, 'mitigation')}"
+            for r in risks
+        ]},
+        "compliance_results": {"name": "compliance_results", "compress_to": 120, "empty": "(none)", "items": [
+            f"- {_field(c, 'requirement')}: {'compliant' if _field(c, 'is_compliant', False) else 'NOT compliant'} "
+            f"({_field(c, 'severity')}). {_field(c, 'assessment')}"
+            for c in compliance
+        ]},
+        "parsed_clauses": {"name": "parsed_clauses", "compress_to": 40, "empty": "(none)", "items": [
+            f"- {_field(c, 'clause_number')} [{_field(c, 'category')}] {_field(c, 'text')}"
+            for c in state.get("parsed_clauses") or []
+        ]},
+    }
+
+
+def write_report_section(section: dict, data: dict) -> str:
+    inputs, prompt_report = fit_prompt(section["budget"], "gpt-4-turbo", section["prompt"],
+                                       [data[name] for name in section["data"]])
+    logging.info(f"Report section '{section['name']}': {prompt_report['total']} prompt tokens")
+    return registry.get(f"report_chain:{section['name']}").invoke(inputs)
+
+
 def aggregator_node(state: AgentState) -> AgentState:
-    """The final node that synthesizes all findings into a report."""
+    """
+    The final node that synthesizes all findings into a report. Sections are generated
+    concurrently and each is emitted on the graph's "custom" stream as soon as it is
+    ready; the report assembles them in order.
+    """
     logging.info("---NODE: Aggregating Final Report---")
     
-    # You can add more context here if needed
-    report = aggregation_chain.invoke({
-        "identified_risks": state["identified_risks"],
-        "compliance_results": state["compliance_results"],
-        "parsed_clauses": state["parsed_clauses"]
-    })
+    data = report_data(state)
+    write = stream_writer()
+    bodies = {}
+    with ThreadPoolExecutor(max_workers=len(REPORT_SECTIONS)) as pool:
+        futures = {pool.submit(write_report_section, section, data): index for index, section in enumerate(REPORT_SECTIONS)}
+        for future in as_completed(futures):
+            index = futures[future]
+            section = REPORT_SECTIONS[index]
+            try:
+                bodies[section["name"]] = future.result()
+            except Exception as e:
+                logging.error(f"Report section '{section['name']}' failed: {e}")
+                bodies[section["name"]] = f"_This section could not be generated: {e}_"
+            write({"report_section": {
+                "index": index,
+                "name": section["name"],
+                "title": section["title"],
+                "content": bodies[section["name"]]
+            }})
     
-    state["final_report"] = report
+    state["final_report"] = "\n\n".join(
+        f"## {index + 1}. {section['title']}\n\n{bodies[section['name']]}"
+        for index, section in enumerate(REPORT_SECTIONS)
+    )
     state["current_step"] = "Report Generated"
     logging.info("---FINAL REPORT GENERATED---")
     return state
@@ -101,44 +191,46 @@ def route_task(state: AgentState):
 
 # --- 5. BUILD THE FINAL, ROBUST GRAPH ---
 
-workflow = StateGraph(AgentState)
-
-# Add all nodes to the graph
-workflow.add_node("parser", document_parser_node)
-workflow.add_node("risk_assessor", risk_assessment_node)
-workflow.add_node("compliance_checker", compliance_node)
-workflow.add_node("aggregator", aggregator_node)
-workflow.add_node("error", error_node)
-workflow.add_node("comparison", comparison_node)
-workflow.add_node("rag", rag_node)
-
-# Set the entry point and routing
-workflow.set_conditional_entry_point(
-    route_task,
-    {
-        "parser": "parser",
-        "comparison": "comparison",
-        "rag": "rag",
-        "error": "error",
-        END: END
-    }
-)
-
-# Define all the connections
-# Analysis workflow: parser -> risk_assessor -> compliance_checker -> aggregator -> END
-workflow.add_edge("parser", "risk_assessor")
-workflow.add_edge("risk_assessor", "compliance_checker")
-workflow.add_edge("compliance_checker", "aggregator")
-workflow.add_edge("aggregator", END)
-
-# Comparison workflow: comparison -> END
-workflow.add_edge("comparison", END)
-
-# Q&A workflow: rag -> END
-workflow.add_edge("rag", END)
-
-# Error workflow: error -> END
-workflow.add_edge("error", END)
-
-# Compile the final graph
-graph_app = workflow.compile()
\ No newline at end of file
+def build_graph():
+    """Builds and compiles the workflow graph. Use `app.core.registry.get_graph_app()` to share one."""
+    workflow = StateGraph(AgentState)
+
+    # Add all nodes to the graph
+    workflow.add_node("parser", document_parser_node)
+    workflow.add_node("risk_assessor", risk_assessment_node)
+    workflow.add_node("compliance_checker", compliance_node)
+    workflow.add_node("aggregator", aggregator_node)
+    workflow.add_node("error", error_node)
+    workflow.add_node("comparison", comparison_node)
+    workflow.add_node("rag", rag_node)
+
+    # Set the entry point and routing
+    workflow.set_conditional_entry_point(
+        route_task,
+        {
+            "parser": "parser",
+            "comparison": "comparison",
+            "rag": "rag",
+            "error": "error",
+            END: END
+        }
+    )
+
+    # Define all the connections
+    # Analysis workflow: parser -> risk_assessor -> compliance_checker -> aggregator -> END
+    workflow.add_edge("parser", "risk_assessor")
+    workflow.add_edge("risk_assessor", "compliance_checker")
+    workflow.add_edge("compliance_checker", "aggregator")
+    workflow.add_edge("aggregator", END)
+
+    # Comparison workflow: comparison -> END
+    workflow.add_edge("comparison", END)
+
+    # Q&A workflow: rag -> END
+    workflow.add_edge("rag", END)
+
+    # Error workflow: error -> END
+    workflow.add_edge("error", END)
+
+    # Compile the final graph
+    return workflow.compile()
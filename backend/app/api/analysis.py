@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import asyncio
+import json
 import logging
 
-from app.agents.supervisor import graph_app
+from app.core.database import AsyncSessionLocal, get_async_db, write_transaction
+from app.core.portfolio import record_analysis
+from app.models.document import Document
+from app.core.registry import get_graph_app, run_graph
 from app.agents.state import AgentState
+from app.utils.text_index import get_text_index, attach_locations
+from app.api.sessions import session_text
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,54 +26,155 @@ router = APIRouter(
 
 # Define the data model for the incoming request
 class AnalysisRequest(BaseModel):
-    document_text: str
+    document_text: str = ""
+    document_id: Optional[int] = None  # Optional: an uploaded document to store the analysis for
+    # Instead of document_text: a document session kept in sync by paragraph edits (see
+    # app.api.sessions), optionally checked to be at document_version
+    document_session_id: Optional[str] = None
+    document_version: Optional[int] = None
+
+
+def _request_text(request: AnalysisRequest) -> str:
+    if request.document_session_id:
+        return session_text(request.document_session_id, request.document_version)
+    if not request.document_text:
+        raise HTTPException(status_code=400, detail="Provide document_text or a document_session_id.")
+    return request.document_text
+
+def _initial_state(document_text: str) -> AgentState:
+    """The initial state of an analysis run of the LangGraph workflow."""
+    return {
+        "task_type": "analyze",
+        "document_id": "doc_from_word", # A simple identifier
+        "document_text": document_text,
+        "document_text_2": "",
+        "parsed_clauses": [],
+        "clause_categories": {},
+        "identified_risks": [],
+        "risk_prescreen": {},
+        "missing_clauses": [],
+        "comparison_result": {},
+        "compliance_results": [],
+        "qa_messages": [],
+        "final_report": "",
+
+        "current_step": "start",
+        "error": ""
+    }
+
+
+def _analysis_response(final_state: dict, document_text: str) -> dict:
+    # We also return the identified risks for the highlighting feature,
+    # resolved to character offsets and paragraph indexes in the submitted text
+    text_index = get_text_index(document_text)
+    return {
+        "report": final_state["final_report"],
+        "risks": attach_locations(final_state["identified_risks"], text_index),
+        "compliance": attach_locations(final_state["compliance_results"], text_index),
+        "risk_prescreen": final_state.get("risk_prescreen", {})
+    }
+
 
 @router.post("/")
-async def run_analysis(request: AnalysisRequest):
+async def run_analysis(request: AnalysisRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Receives document text, runs the full analysis workflow, 
-    and returns the final aggregated report.
+    and returns the final aggregated report. With a document_id, the analysis is
+    stored and counted in the portfolio summaries.
     """
     try:
         logging.info("Received request for analysis.")
+        document_text = _request_text(request)
+        if request.document_id is not None and await db.get(Document, request.document_id) is None:
+            raise HTTPException(status_code=404, detail=f"Document {request.document_id} not found.")
         
         # 1. Set up the initial state for the LangGraph workflow
-        initial_state: AgentState = {
-            "task_type": "analyze",
-            "document_id": "doc_from_word", # A simple identifier
-            "document_text": request.document_text,
-            "document_text_2": "",
-            "parsed_clauses": [],
-            "clause_categories": {},
-            "identified_risks": [],
-            "missing_clauses": [],
-            "comparison_result": {},
-            "compliance_results": [],
-            "qa_messages": [],
-            "final_report": "",
-
-            "current_step": "start",
-            "error": ""
-        }
+        initial_state = _initial_state(document_text)
         
-        # 2. Run the graph and stream the results
-        final_state = None
-        for step in graph_app.stream(initial_state):
-            # The last step will contain the final state
-            final_state = list(step.values())[0]
+        # 2. Run the graph in a worker thread, so LLM calls waiting on rate limits or
+        # retry backoff don't block the event loop (and the other requests on it)
+        final_state = await run_in_threadpool(run_graph, initial_state)
 
         # 3. Extract and return the final report
         if final_state and final_state.get("final_report"):
             logging.info("Analysis complete. Returning final report.")
-            # We also return the identified risks for the highlighting feature
-            return {
-                "report": final_state["final_report"],
-                "risks": final_state["identified_risks"]
-            }
+            response = _analysis_response(final_state, document_text)
+            if request.document_id is not None:
+                async with write_transaction(db):
+                    response["analysis_id"] = await record_analysis(db, request.document_id, response)
+            return response
         else:
             logging.error("Analysis failed to generate a report.")
             raise HTTPException(status_code=500, detail="Analysis failed to generate a report.")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"An error occurred during analysis: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/stream")
+async def stream_analysis(request: AnalysisRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Runs the same analysis as POST /, streaming its progress as JSON lines: a "step"
+    event as each agent finishes, a "clause" event as each clause is classified and a
+    "risk" event as each risk is found (while the models are still writing), a
+    "report_section" event as each section of the report is written (in the order they
+    finish; "index" is their place in the report), then a "result" event with the same
+    body POST / returns, or an "error" event.
+    """
+    logging.info("Received request for streamed analysis.")
+    document_text = _request_text(request)
+    if request.document_id is not None and await db.get(Document, request.document_id) is None:
+        raise HTTPException(status_code=404, detail=f"Document {request.document_id} not found.")
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def run_graph():
+        # The graph runs in a worker thread and hands its events to the response
+        try:
+            stream = get_graph_app().stream(_initial_state(document_text), stream_mode=["updates", "custom"])
+            for mode, chunk in stream:
+                loop.call_soon_threadsafe(queue.put_nowait, (mode, chunk))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+    async def stream_events():
+        worker = loop.run_in_executor(None, run_graph)
+        final_state = None
+        try:
+            while True:
+                mode, chunk = await queue.get()
+                if mode is done:
+                    break
+                if mode == "error":
+                    raise chunk
+                if mode == "custom":
+                    # {"clause": ...}, {"risk": ...} or {"report_section": ...} from the agents
+                    event, payload = next(iter(chunk.items()))
+                    yield json.dumps({"event": event, **payload}, default=str) + "\n"
+                else:
+                    node, final_state = next(iter(chunk.items()))
+                    yield json.dumps({"event": "step", "node": node, "step": final_state.get("current_step", "")}) + "\n"
+
+            if not (final_state and final_state.get("final_report")):
+                raise RuntimeError((final_state or {}).get("error") or "Analysis failed to generate a report.")
+            response = _analysis_response(final_state, document_text)
+            if request.document_id is not None:
+                # The request's session is closed once the response starts; record with a new one
+                async with AsyncSessionLocal() as session, write_transaction(session):
+                    response["analysis_id"] = await record_analysis(session, request.document_id, response)
+            logging.info("Streamed analysis complete.")
+            yield json.dumps({"event": "result", **response}, default=str) + "\n"
+        except Exception as e:
+            logging.error(f"An error occurred during streamed analysis: {e}")
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+        finally:
+            await worker
+
+    return StreamingResponse(stream_events(), media_type="application/x-ndjson")
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import json
+import logging
+
+from app.agents.state import AgentState
+from app.core.registry import run_graph
+from app.core.database import get_db
+from app.models.document import Document
+from app.utils.document_parser import load_document_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/comparison",
+    tags=["Comparison"]
+)
+
+class ComparisonRequest(BaseModel):
+    document_text_a: str
+    document_text_b: str
+
+class VersionInput(BaseModel):
+    label: str
+    document_text: str = ""  # Provide either the text...
+    document_id: Optional[int] = None  # ...or the id of an uploaded document
+
+class VersionsComparisonRequest(BaseModel):
+    base_document_id: Optional[int] = None
+    base_text: str = ""  # Used when no base_document_id is given
+    versions: List[VersionInput]
+
+
+def _document_text(db: Session, document_id: int) -> str:
+    """Loads the text of an uploaded document."""
+    document = db.get(Document, document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found.")
+    try:
+        return load_document_text(document.file_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/")
+async def compare_documents(request: ComparisonRequest):
+    """
+    Compares two contract texts clause by clause.
+    """
+    try:
+        logger.info("Received request for comparison.")
+
+        initial_state: AgentState = {
+            "task_type": "compare",
+            "document_id": "comparison",
+            "document_text": request.document_text_a,
+            "document_text_2": request.document_text_b,
+            "parsed_clauses": [],
+            "clause_categories": {},
+            "identified_risks": [],
+            "missing_clauses": [],
+            "comparison_result": {},
+            "compliance_results": [],
+            "qa_messages": [],
+            "final_report": "",
+            "current_step": "start",
+            "error": ""
+        }
+
+        final_state = await run_in_threadpool(run_graph, initial_state)
+
+        if not final_state or not final_state.get("comparison_result"):
+            raise HTTPException(status_code=500, detail="Comparison failed to produce a result.")
+
+        result = final_state["comparison_result"]
+        logger.info(f"Comparison complete with {len(result.changes)} changes.")
+        return result.model_dump()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Comparison error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/versions")
+def compare_versions(request: VersionsComparisonRequest, db: Session = Depends(get_db)):
+    """
+    Compares one base document (by id or text) against many versions, e.g. a template
+    against each counterparty's redline. Streams one JSON line per version as each
+    comparison completes.
+    """
+    if request.base_document_id is not None:
+        base_text = _document_text(db, request.base_document_id)
+    else:
+        base_text = request.base_text
+    if not base_text:
+        raise HTTPException(status_code=400, detail="Provide a base_document_id or base_text.")
+    if not request.versions:
+        raise HTTPException(status_code=400, detail="Provide at least one version to compare.")
+
+    version_texts = [
+        _document_text(db, v.document_id) if v.document_id is not None else v.document_text
+        for v in request.versions
+    ]
+    logger.info(f"Comparing base document against {len(version_texts)} versions.")
+
+    # The agents load LangChain on first use, so they are imported here rather than at startup
+    from app.agents.comparison_agent import ComparisonAgent
+
+    def stream_results():
+        try:
+            results = ComparisonAgent().compare_many(base_text, version_texts)
+            for index, (version, result) in enumerate(zip(request.versions, results)):
+                yield json.dumps({"index": index, "label": version.label, **result.model_dump()}) + "\n"
+        except Exception as e:
+            logger.error(f"Version comparison error: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
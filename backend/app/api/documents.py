@@ -1,23 +1,71 @@
 import os
 import shutil
+import logging
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_async_db, write_transaction
+from app.core.bulk import replace_clauses
 from app.models.document import Document
 from app.schemas.document import DocumentResponse
 from app.core.config import settings
+from app.utils.document_parser import load_document_text, extract_searchable_clauses
+from app.utils.clause_categories import detect_document_type
+from app.utils.embeddings import index_clauses
+from app.api.search import search_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/documents",
     tags=["Documents"]
 )
 
+
+def _extract_searchable_clauses(file_path: str) -> tuple:
+    text = load_document_text(file_path)
+    return text, extract_searchable_clauses(text)
+
+
+async def index_document_clauses(db: AsyncSession, document: Document) -> dict:
+    """
+    Extracts and categorizes a document's clauses, stores them as Clause rows and
+    indexes them for corpus-wide clause search.
+    """
+    # Parsing and embedding are CPU/network bound, so they run off the event loop
+    text, clauses = await run_in_threadpool(_extract_searchable_clauses, document.file_path)
+
+    async with write_transaction(db):
+        clause_ids = await replace_clauses(db, document.id, [
+            {"clause_type": c["category"], "content": c["content"], "position": n}
+            for n, c in enumerate(clauses)
+        ])
+
+    # Cached search results may point at the replaced clauses
+    search_cache.clear()
+    return await run_in_threadpool(
+        index_clauses,
+        document.id,
+        [
+            {"clause_id": clause_id, "content": c["content"], "clause_number": c["clause_number"], "category": c["category"]}
+            for clause_id, c in zip(clause_ids, clauses)
+        ],
+        {
+            # The contract type detected from the text (the MIME type is on the Document row)
+            "document_type": detect_document_type(text),
+            "upload_date": int(document.upload_date.timestamp()),
+            "filename": document.filename
+        }
+    )
+
+
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Uploads a contract document (.docx or .pdf) for analysis.
@@ -37,12 +85,15 @@ async def upload_document(
     # 3. Create a secure file path
     file_path = os.path.join(upload_path, file.filename)
 
-    # 4. Save the file to the server
-    try:
+    # 4. Save the file to the server (in a worker thread, so the event loop keeps serving)
+    def save_file():
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+
+    try:
+        await run_in_threadpool(save_file)
     finally:
-        file.file.close()
+        await file.close()
 
     # 5. Create a record in the database
     db_document = Document(
@@ -52,8 +103,27 @@ async def upload_document(
         upload_date=datetime.now()
         # user_id will be added later when we have auth
     )
-    db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    async with write_transaction(db):
+        db.add(db_document)
+
+    # 6. Index its clauses for search; the upload itself succeeds even if this fails
+    try:
+        await index_document_clauses(db, db_document)
+    except Exception as e:
+        logger.error(f"Clause indexing failed for document {db_document.id}: {e}")
     
-    return db_document
\ No newline at end of file
+    return db_document
+
+
+@router.post("/{document_id}/index")
+async def reindex_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    (Re)indexes the clauses of an uploaded document for clause search.
+    """
+    document = await db.get(Document, document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found.")
+    try:
+        return await index_document_clauses(db, document)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,48 @@
+from fastapi import APIRouter
+
+from app.core.cascade import cascade_stats
+from app.core.llm_pool import llm_stats
+from app.utils.prompt_budget import prompt_stats
+from app.utils.streaming_json import structured_output_stats
+
+router = APIRouter(
+    prefix="/llm",
+    tags=["LLM"]
+)
+
+
+@router.get("/stats")
+def get_llm_stats():
+    """
+    Per model: limits, calls, retries, 429s, tokens used, calls queued and in flight,
+    and queue wait percentiles over the last 1000 calls.
+    """
+    return llm_stats()
+
+
+@router.get("/prompts")
+def get_prompt_stats():
+    """
+    Per agent: its prompt token budget, how many prompts were sent and how many had to
+    be reduced to fit, and the median and largest prompt in tokens.
+    """
+    return prompt_stats()
+
+
+@router.get("/cascade")
+def get_cascade_stats():
+    """
+    With CASCADE_ENABLED, per agent and tier model: clauses answered, escalations to the
+    next tier by reason, how often the next tier agreed, and call latency percentiles.
+    """
+    return cascade_stats()
+
+
+@router.get("/structured")
+def get_structured_output_stats():
+    """
+    Per agent: structured outputs parsed as they streamed, how many were cut off or
+    malformed, the items salvaged from those, retries for the missing items, tokens lost
+    after the last complete item, and the time to the first item.
+    """
+    return structured_output_stats()
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import time
+
+from app.core.database import get_async_db, write_transaction
+from app.core.portfolio import risk_distribution, top_risk_documents, compliance_overview, rebuild_summaries
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/portfolio",
+    tags=["Portfolio"]
+)
+
+
+@router.get("/risk-distribution")
+async def get_risk_distribution(db: AsyncSession = Depends(get_async_db)):
+    """
+    Risk counts per clause category and risk level across all analyzed documents.
+    """
+    start = time.perf_counter()
+    result = await risk_distribution(db)
+    return {**result, "query_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+@router.get("/top-risks")
+async def get_top_risk_documents(limit: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_async_db)):
+    """
+    The contracts with the most critical risks, then the most high risks.
+    """
+    start = time.perf_counter()
+    documents = await top_risk_documents(db, limit)
+    return {"documents": documents, "query_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+@router.get("/compliance")
+async def get_compliance_overview(db: AsyncSession = Depends(get_async_db)):
+    """
+    For each compliance requirement, how many documents meet and fail it.
+    """
+    start = time.perf_counter()
+    requirements = await compliance_overview(db)
+    return {"requirements": requirements, "query_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+@router.post("/rebuild")
+async def rebuild_portfolio_summaries(db: AsyncSession = Depends(get_async_db)):
+    """
+    Recomputes the portfolio summary tables from the stored findings.
+    """
+    start = time.perf_counter()
+    async with write_transaction(db):
+        counts = await rebuild_summaries(db)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Rebuilt portfolio summaries in {elapsed_ms:.0f}ms: {counts}")
+    return {**counts, "rebuild_ms": round(elapsed_ms, 2)}
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 
-from app.agents.supervisor import graph_app
 from app.agents.state import AgentState
+from app.api.sessions import session_text
+from app.core.registry import run_graph
+from app.utils.embeddings import index_document
+from app.utils.answer_cache import answer_cache
+from app.utils.conversation_memory import conversation_memory
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +26,11 @@ class QuestionRequest(BaseModel):
     document_id: str
     question: str
     document_text: str = ""  # Optional: provide if not stored
+    session_id: str = ""  # Optional: keeps a multi-turn conversation about the document
+    # Optional, instead of document_text: a document session kept in sync by paragraph
+    # edits (see app.api.sessions), optionally checked to be at document_version
+    document_session_id: str = ""
+    document_version: Optional[int] = None
 
 @router.post("/ask")
 async def ask_question(request: QuestionRequest):
@@ -30,11 +40,15 @@ async def ask_question(request: QuestionRequest):
     try:
         logger.info(f"Received Q&A request for document: {request.document_id}")
         
-        # Get or store document text
-        if request.document_text:
-            document_store[request.document_id] = request.document_text
+        # Get or store document text, re-indexing the changed chunks when it is edited
+        document_text = request.document_text
+        if request.document_session_id:
+            document_text = session_text(request.document_session_id, request.document_version)
+        if document_text and document_store.get(request.document_id) != document_text:
+            await run_in_threadpool(index_document, doc_id=request.document_id, text=document_text, metadata={})
+            document_store[request.document_id] = document_text
         
-        doc_text = document_store.get(request.document_id, request.document_text)
+        doc_text = document_store.get(request.document_id, document_text)
         
         if not doc_text:
             raise HTTPException(
@@ -42,6 +56,11 @@ async def ask_question(request: QuestionRequest):
                 detail="Document text not found. Please analyze the document first."
             )
         
+        # Load the bounded history of the conversation, if any
+        history = {"summary": "", "turns": []}
+        if request.session_id:
+            history = conversation_memory.history(request.document_id, request.session_id)
+
         # Set up state for Q&A
         initial_state: AgentState = {
             "task_type": "qa",
@@ -54,18 +73,17 @@ async def ask_question(request: QuestionRequest):
             "missing_clauses": [],
             "comparison_result": {},
             "compliance_results": [],
-            "qa_messages": [
+            "qa_messages": history["turns"] + [
                 {"role": "user", "content": request.question}
             ],
+            "conversation_summary": history["summary"],
             "final_report": "",
             "current_step": "start",
             "error": ""
         }
         
-        # Run the Q&A workflow
-        final_state = None
-        for step in graph_app.stream(initial_state):
-            final_state = list(step.values())[0]
+        # Run the Q&A workflow off the event loop; its LLM calls may wait on rate limits
+        final_state = await run_in_threadpool(run_graph, initial_state)
         
         if not final_state:
             raise HTTPException(status_code=500, detail="Q&A processing failed")
@@ -76,27 +94,49 @@ async def ask_question(request: QuestionRequest):
         # The last message should be the assistant's response
         answer = None
         citations = []
+        cached = False
+        prompt_tokens = None
         
         if qa_messages:
             for msg in reversed(qa_messages):
                 if msg.get("role") == "assistant":
                     answer = msg.get("content")
                     citations = msg.get("citations", [])
+                    cached = msg.get("cached", False)
+                    prompt_tokens = msg.get("prompt_tokens")
                     break
         
         if not answer:
             raise HTTPException(status_code=500, detail="No answer generated")
         
+        if request.session_id and not final_state.get("error"):
+            # Loaded with the graph above, so this import is free
+            from app.agents.rag_agent import summarize_turns
+            conversation_memory.add_turn(
+                request.document_id, request.session_id, request.question, answer, summarize=summarize_turns
+            )
+
         logger.info("Q&A complete. Returning answer.")
         
         return {
             "answer": answer,
             "citations": citations,
-            "document_id": request.document_id
+            "cached": cached,
+            "prompt_tokens": prompt_tokens,
+            "document_id": request.document_id,
+            "session_id": request.session_id
         }
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Q&A error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/stats")
+async def answer_cache_stats():
+    """
+    Hit rate and size of the semantic answer cache.
+    """
+    return answer_cache.stats()
@@ -0,0 +1,157 @@
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from typing import List, Dict, Optional
+from datetime import datetime
+import base64
+import hashlib
+import json
+import logging
+import time
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.document import Clause
+from app.utils.embeddings import search_clauses
+from app.utils.query_cache import QueryCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+# Ranked result lists of recent queries; pages of the same query are served from here
+search_cache = QueryCache(settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL)
+
+
+class ClauseSearchRequest(BaseModel):
+    text: str = ""  # Free-text query
+    clause_id: Optional[int] = None  # Or: find clauses similar to this one
+    document_type: Optional[str] = None  # e.g. "nda", "employment", "saas"
+    category: Optional[str] = None  # e.g. "Termination", "Liability"
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+    limit: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None  # The next_cursor of the previous page
+
+
+class ClauseSearchResult(BaseModel):
+    clause_id: int
+    document_id: int
+    filename: str
+    document_type: str
+    category: str
+    clause_number: str
+    upload_date: datetime
+    content: str
+    score: float
+
+
+class ClauseSearchResponse(BaseModel):
+    results: List[ClauseSearchResult]
+    next_cursor: Optional[str]
+    total: int  # Matches available to page through (at most SEARCH_MAX_RESULTS)
+    timing: Dict
+
+
+def build_filter(request: ClauseSearchRequest) -> Optional[Dict]:
+    """Translates the request's filters into a vector store metadata filter."""
+    conditions = []
+    if request.document_type:
+        conditions.append({"document_type": request.document_type})
+    if request.category:
+        conditions.append({"category": request.category})
+    if request.uploaded_after:
+        conditions.append({"upload_date": {"$gte": int(request.uploaded_after.timestamp())}})
+    if request.uploaded_before:
+        conditions.append({"upload_date": {"$lte": int(request.uploaded_before.timestamp())}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def encode_cursor(query_key: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"q": query_key, "o": offset}).encode()).decode()
+
+
+def decode_cursor(cursor: str, query_key: str) -> int:
+    """Returns the offset a cursor points at; it must come from the same query."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset = int(data["o"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if data.get("q") != query_key or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this query.")
+    return offset
+
+
+@router.post("/clauses", response_model=ClauseSearchResponse)
+def search_clause_corpus(request: ClauseSearchRequest, db: Session = Depends(get_db)):
+    """
+    Searches the clauses of all uploaded documents by text or by similarity to a given
+    clause, optionally filtered by document type, clause category and upload date.
+    """
+    start = time.perf_counter()
+
+    # 1. Resolve the query text
+    query = request.text.strip()
+    if request.clause_id is not None:
+        clause = db.get(Clause, request.clause_id)
+        if clause is None:
+            raise HTTPException(status_code=404, detail=f"Clause {request.clause_id} not found.")
+        query = clause.content
+    if not query:
+        raise HTTPException(status_code=400, detail="Provide either 'text' or 'clause_id'.")
+
+    where = build_filter(request)
+    query_key = hashlib.sha1(json.dumps([query, request.clause_id, where], sort_keys=True).encode()).hexdigest()
+    offset = decode_cursor(request.cursor, query_key) if request.cursor else 0
+
+    # 2. Rank once per query (up to SEARCH_MAX_RESULTS), then page through the cached list
+    ranked = search_cache.get(query_key)
+    cached = ranked is not None
+    search_start = time.perf_counter()
+    if ranked is None:
+        ranked = search_clauses(query, n_results=settings.SEARCH_MAX_RESULTS, where=where)
+        if request.clause_id is not None:
+            ranked = [r for r in ranked if r["metadata"].get("clause_id") != request.clause_id]
+        search_cache.put(query_key, ranked)
+    search_ms = (time.perf_counter() - search_start) * 1000
+
+    page = ranked[offset:offset + request.limit]
+    next_offset = offset + len(page)
+    results = [
+        ClauseSearchResult(
+            clause_id=r["metadata"]["clause_id"],
+            document_id=r["metadata"]["document_id"],
+            filename=r["metadata"].get("filename", ""),
+            document_type=r["metadata"].get("document_type", "other"),
+            category=r["metadata"].get("category", "Other"),
+            clause_number=str(r["metadata"].get("clause_number", "")),
+            upload_date=datetime.fromtimestamp(r["metadata"].get("upload_date", 0)),
+            content=r["content"],
+            score=r["score"]
+        )
+        for r in page
+    ]
+    total_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Clause search: {len(ranked)} matches, {total_ms:.1f}ms (cached: {cached})")
+
+    return ClauseSearchResponse(
+        results=results,
+        next_cursor=encode_cursor(query_key, next_offset) if next_offset < len(ranked) else None,
+        total=len(ranked),
+        timing={"search_ms": round(search_ms, 2), "total_ms": round(total_ms, 2), "cached": cached}
+    )
+
+
+@router.get("/stats")
+def get_search_stats():
+    """
+    Hit rate and size of the clause search query cache.
+    """
+    return search_cache.stats()
@@ -0,0 +1,91 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
+import logging
+
+from app.utils.document_sessions import document_sessions, VersionConflict
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/sessions",
+    tags=["Document Sessions"]
+)
+
+
+class SessionCreateRequest(BaseModel):
+    paragraphs: List[str]
+
+
+class ParagraphOperation(BaseModel):
+    op: Literal["insert", "update", "delete"]
+    index: int = Field(ge=0)
+    text: Optional[str] = None  # update
+    paragraphs: Optional[List[str]] = None  # insert
+    count: int = Field(default=1, ge=1)  # delete
+
+
+class SessionUpdateRequest(BaseModel):
+    base_version: int
+    operations: List[ParagraphOperation]
+
+
+def session_text(session_id: str, version: Optional[int] = None) -> str:
+    """
+    The text of a document session, for endpoints that accept one in place of
+    `document_text`. 404 if the session is gone, 409 if it is not at `version`.
+    """
+    try:
+        text = document_sessions.text(session_id, version)
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "version": e.current_version})
+    if text is None:
+        raise HTTPException(status_code=404, detail=f"Document session {session_id} not found.")
+    return text
+
+
+@router.post("/")
+def create_session(request: SessionCreateRequest):
+    """
+    Starts a document session with the document's full paragraph list. Later requests
+    send only paragraph edits (PATCH) and refer to the document by `session_id`.
+    """
+    session = document_sessions.create(request.paragraphs)
+    logger.info(f"Document session {session['session_id']} started with {session['paragraphs']} paragraphs.")
+    return session
+
+
+@router.patch("/{session_id}")
+def update_session(session_id: str, request: SessionUpdateRequest):
+    """
+    Applies paragraph inserts, updates and deletes, in order, made against `base_version`.
+    Returns the new version. 409 (with the current version) if the session has moved
+    on and 404 if it expired: the client then starts a new session.
+    """
+    try:
+        session = document_sessions.apply(
+            session_id, request.base_version, [o.model_dump(exclude_none=True) for o in request.operations]
+        )
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "version": e.current_version})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Document session {session_id} not found.")
+    return session
+
+
+@router.get("/{session_id}")
+def get_session(session_id: str):
+    """The session's version, paragraph count and length."""
+    session = document_sessions.describe(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Document session {session_id} not found.")
+    return session
+
+
+@router.delete("/{session_id}")
+def delete_session(session_id: str):
+    if not document_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Document session {session_id} not found.")
+    return {"deleted": session_id}
@@ -0,0 +1,231 @@
+"""
+Bulk ingestion of a directory of contracts (.docx and .pdf, searched recursively).
+
+Each file goes through the same steps as an upload: parse, extract and categorize its
+clauses, embed them and index them for clause search, with a Document and Clause rows
+in the database. Parsing and clause extraction run in a pool of worker processes;
+embedding and indexing run in this process, several files at a time, because the
+embedding cache and the vector store expect a single writer.
+
+Progress is recorded per file in the `ingested_files` table, keyed by the SHA-256 of
+the file's content: an interrupted run resumes where it stopped, files already ingested
+(under any path) are skipped, and files that failed are retried.
+
+Usage (from the `backend` directory):
+    python -m app.cli.ingest ../data/contracts
+    python -m app.cli.ingest /mnt/legacy-contracts --workers 8
+"""
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any
+
+# Only the standard library is imported at module level: worker processes are spawned
+# and re-import this module, and must not open the database or vector stores.
+
+CONTENT_TYPES = {
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".pdf": "application/pdf",
+}
+
+
+def find_files(directory: str) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in CONTENT_TYPES and not name.startswith("~$"):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_file(path: str) -> Dict[str, Any]:
+    """Runs in a worker process: parses the file and extracts its categorized clauses."""
+    from app.utils.document_parser import load_document_text, extract_searchable_clauses
+    from app.utils.clause_categories import detect_document_type
+
+    start = time.perf_counter()
+    text = load_document_text(path)
+    parsed = time.perf_counter()
+    if not text or not text.strip():
+        raise ValueError("No text could be extracted.")
+    clauses = extract_searchable_clauses(text)
+    return {
+        "clauses": clauses,
+        "document_type": detect_document_type(text),
+        "timings": {"parse": parsed - start, "extract": time.perf_counter() - parsed}
+    }
+
+
+class IngestStats:
+    """Counts and cumulative per-stage seconds."""
+
+    STAGES = ("hash", "parse", "extract", "database", "embed", "index")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.ingested = self.skipped = self.failed = self.clauses = 0
+        self.seconds = defaultdict(float)
+
+    def line(self, total: int) -> str:
+        elapsed = time.perf_counter() - self.start
+        done = self.ingested + self.failed
+        return (f"[{done}/{total}] {done / elapsed:.1f} files/s, {self.clauses / elapsed:.0f} clauses/s, "
+                f"{self.failed} failed")
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        lines = [
+            f"Ingested {self.ingested} files ({self.clauses} clauses) in {elapsed:.1f}s: "
+            f"{self.ingested / elapsed:.2f} files/s, {self.clauses / elapsed:.1f} clauses/s",
+            f"Skipped {self.skipped} already ingested or duplicate files; {self.failed} failed.",
+            "Stage time (parse and extract are summed over the worker processes):",
+        ]
+        per_file = max(1, self.ingested + self.failed)
+        for stage in self.STAGES:
+            lines.append(f"   {stage:<10}{self.seconds[stage]:>9.2f}s total {self.seconds[stage] / per_file * 1000:>9.1f}ms per file")
+        return "\n".join(lines)
+
+
+async def ingest(directory: str, workers: int, report_every: int = 100) -> IngestStats:
+    from sqlalchemy import select
+    import app.models  # noqa: F401 (registers every table)
+    from app.core.config import settings
+    from app.core.database import Base, engine, create_indexes, AsyncSessionLocal, write_transaction
+    from app.core.bulk import replace_clauses
+    from app.models.document import Document, IngestedFile
+    from app.utils.embeddings import embed_texts, index_clauses
+
+    Base.metadata.create_all(bind=engine)
+    create_indexes(engine)
+    stats = IngestStats()
+
+    # 1. Hash every file; skip contents already ingested and duplicates within the run
+    async with AsyncSessionLocal() as db:
+        done = set(await db.scalars(select(IngestedFile.sha256).where(IngestedFile.status == "done")))
+    pending, seen = [], set()
+    for path in find_files(directory):
+        start = time.perf_counter()
+        digest = file_sha256(path)
+        stats.seconds["hash"] += time.perf_counter() - start
+        if digest in done or digest in seen:
+            stats.skipped += 1
+            continue
+        seen.add(digest)
+        pending.append((os.path.abspath(path), digest))
+    print(f"{len(pending)} files to ingest, {stats.skipped} skipped.")
+
+    async def record(db, path: str, digest: str, **fields):
+        async with write_transaction(db):
+            await db.merge(IngestedFile(sha256=digest, path=path, **fields))
+
+    async def store(path: str, digest: str, parsed: Dict[str, Any]):
+        clauses = parsed["clauses"]
+        async with AsyncSessionLocal() as db:
+            # 2. Document and Clause rows; a file interrupted earlier keeps its document
+            start = time.perf_counter()
+            async with write_transaction(db):
+                previous = await db.get(IngestedFile, digest)
+                document = await db.get(Document, previous.document_id) if previous and previous.document_id else None
+                if document is None:
+                    document = Document(
+                        filename=os.path.basename(path),
+                        file_path=path,
+                        document_type=CONTENT_TYPES[os.path.splitext(path)[1].lower()],
+                        upload_date=datetime.now()
+                    )
+                    db.add(document)
+                    await db.flush()
+                clause_ids = await replace_clauses(db, document.id, [
+                    {"clause_type": c["category"], "content": c["content"], "position": n}
+                    for n, c in enumerate(clauses)
+                ])
+                await db.merge(IngestedFile(sha256=digest, path=path, document_id=document.id,
+                                            status="indexing", clauses=len(clauses), error=None))
+            stats.seconds["database"] += time.perf_counter() - start
+
+            # 3. Embed and index the clauses
+            start = time.perf_counter()
+            vectors = await asyncio.to_thread(embed_texts, [c["content"] for c in clauses])
+            embedded = time.perf_counter()
+            await asyncio.to_thread(
+                index_clauses,
+                document.id,
+                [
+                    {"clause_id": clause_id, "content": c["content"], "clause_number": c["clause_number"], "category": c["category"]}
+                    for clause_id, c in zip(clause_ids, clauses)
+                ],
+                {
+                    "document_type": parsed["document_type"],
+                    "upload_date": int(document.upload_date.timestamp()),
+                    "filename": document.filename
+                },
+                vectors
+            )
+            stats.seconds["embed"] += embedded - start
+            stats.seconds["index"] += time.perf_counter() - embedded
+
+            await record(db, path, digest, document_id=document.id, status="done",
+                         clauses=len(clauses), error=None, ingested_at=datetime.now())
+        stats.ingested += 1
+        stats.clauses += len(clauses)
+
+    async def process(pool, path: str, digest: str, slots: asyncio.Semaphore):
+        loop = asyncio.get_running_loop()
+        try:
+            parsed = await loop.run_in_executor(pool, parse_file, path)
+            for stage, seconds in parsed["timings"].items():
+                stats.seconds[stage] += seconds
+            async with slots:
+                await store(path, digest, parsed)
+        except Exception as e:
+            stats.failed += 1
+            print(f"Failed to ingest {path}: {e}")
+            async with AsyncSessionLocal() as db:
+                await record(db, path, digest, status="failed", error=str(e))
+        if (stats.ingested + stats.failed) % report_every == 0:
+            print(stats.line(len(pending)))
+
+    # 4. Parse in the process pool while earlier files are embedded and indexed. At most
+    # two files per worker are in flight, so memory stays flat however many files there are.
+    slots = asyncio.Semaphore(settings.INDEX_CONCURRENCY)
+    window = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = set()
+        for path, digest in pending:
+            if len(in_flight) >= window:
+                _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.add(asyncio.create_task(process(pool, path, digest, slots)))
+        if in_flight:
+            await asyncio.wait(in_flight)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a directory of contracts for clause search.")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes (default: one per CPU)")
+    parser.add_argument("--report-every", type=int, default=100, help="print progress every N files")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+    stats = asyncio.run(ingest(args.directory, args.workers, args.report_every))
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import List, Dict, Any
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Clause
+from app.models.analysis import AnalysisResult
+
+# Bulk writes: one multi-row INSERT per call instead of one statement (and one
+# round trip through the ORM unit of work) per row. Callers commit.
+#
+# The new ids are returned in input order. SQLAlchemy's `sort_by_parameter_order`
+# would guarantee that, but on SQLite it falls back to one INSERT per row (several
+# times slower); instead we rely on the rows of one statement receiving ascending
+# rowids, which holds for INTEGER PRIMARY KEY tables within a transaction.
+
+
+async def replace_clauses(db: AsyncSession, document_id: int, clauses: List[Dict[str, Any]]) -> List[int]:
+    """
+    Replaces a document's Clause rows. Each clause dict may carry clause_type, content,
+    risk_level and position.
+
+    Returns:
+        The ids of the new rows, in the order of `clauses`.
+    """
+    await db.execute(delete(Clause).where(Clause.document_id == document_id))
+    if not clauses:
+        return []
+    rows = [{**clause, "document_id": document_id} for clause in clauses]
+    return sorted(await db.scalars(insert(Clause).returning(Clause.id), rows))
+
+
+async def insert_analysis_results(db: AsyncSession, document_id: int, results: List[Dict[str, Any]]) -> List[int]:
+    """
+    Inserts AnalysisResult rows for a document. Each result dict carries analysis_type
+    and results (any JSON-serializable value).
+
+    Returns:
+        The ids of the new rows, in the order of `results`.
+    """
+    if not results:
+        return []
+    now = datetime.now()
+    rows = [{"created_at": now, **result, "document_id": document_id} for result in results]
+    return sorted(await db.scalars(insert(AnalysisResult).returning(AnalysisResult.id), rows))
@@ -0,0 +1,191 @@
+"""
+Model cascade for the batch agents (clause classification and risk analysis). With
+CASCADE_ENABLED, an agent sends its items (clauses) to the first, cheapest model of its
+tier list (Settings.CASCADE_TIERS). Items whose answer is missing, schema-invalid or
+flagged by the agent's escalation rule (e.g. below CASCADE_MIN_CONFIDENCE) are sent
+again, as a smaller batch, to the next tier; the last tier's answers are final.
+
+Routine items are thus served at the cheap model's latency and cost. Whenever an item
+is answered by two tiers, whether they agree is recorded; CASCADE_AUDIT_RATE also sends
+that fraction of accepted items up a tier, for an unbiased agreement rate. Per agent and
+tier: items, escalations by reason, call latency and agreement (`cascade_stats`, served
+at GET /api/llm/cascade).
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _TierStats:
+    def __init__(self):
+        self.items = self.calls = 0
+        self.escalated = defaultdict(int)
+        self.audited = 0
+        self.unanswered = 0  # last tier only: items no tier answered
+        self.agreement = {"escalated": [0, 0], "audited": [0, 0]}  # [compared, agreed]
+        self.seconds = deque(maxlen=1000)
+
+    def compared(self, kind: str, agreed: bool) -> None:
+        self.agreement[kind][0] += 1
+        self.agreement[kind][1] += int(agreed)
+
+    def summary(self) -> Dict[str, Any]:
+        seconds = sorted(self.seconds)
+        escalated = sum(self.escalated.values())
+        return {
+            "items": self.items,
+            "calls": self.calls,
+            "escalated": dict(self.escalated),
+            "escalation_rate": round(escalated / self.items, 3) if self.items else None,
+            "audited": self.audited,
+            "unanswered": self.unanswered,
+            "agreement": {
+                kind: {"compared": compared, "rate": round(agreed / compared, 3) if compared else None}
+                for kind, (compared, agreed) in self.agreement.items()
+            },
+            "latency_ms": {
+                "p50": round(seconds[len(seconds) // 2] * 1000, 1),
+                "p95": round(seconds[int(len(seconds) * 0.95)] * 1000, 1),
+            } if seconds else None,
+        }
+
+
+class _CascadeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = defaultdict(_TierStats)
+
+    def record(self, agent: str, model: str, update: Callable[[_TierStats], None]) -> None:
+        with self._lock:
+            update(self._tiers[(agent, model)])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result = defaultdict(dict)
+            for (agent, model), tier in self._tiers.items():
+                result[agent][model] = tier.summary()
+            return dict(result)
+
+
+_stats = _CascadeStats()
+
+
+def cascade_stats() -> Dict[str, Any]:
+    """Per agent and tier model: items answered, escalations, agreement with the next tier and call latency."""
+    return _stats.stats()
+
+
+def run_cascade(agent: str, keys: List[str],
+                ask: Callable[[str, List[str]], Dict[str, Any]],
+                escalate: Callable[[str, Any], Optional[str]],
+                agree: Callable[[Any, Any], bool],
+                on_accept: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Answers `keys` through the agent's model tiers.
+
+    Args:
+        ask: (model, keys) -> {key: answer} in one call; keys it has no answer for are
+             escalated as "missing". An exception escalates every key ("invalid" for an
+             output that fails the schema, "error" otherwise); on the last tier, it
+             leaves them unanswered, and the answers earlier tiers accepted stand.
+        escalate: (key, answer) -> the reason to escalate it, or None to accept it.
+        agree: whether two tiers' answers to a key agree.
+        on_accept: (key, answer), called once per key as soon as its answer is final:
+             when a tier accepts it (and doesn't send it up for an audit) or the last
+             tier answers it.
+
+    Returns:
+        ({key: final answer}, leaving out escalated keys the last tier had no answer for
+         (callers fall back for those); a report of each tier's items, escalations,
+         failure and seconds)
+    """
+    from langchain_core.exceptions import OutputParserException
+
+    tiers = settings.CASCADE_TIERS[agent]
+    answers: Dict[str, Any] = {}
+    previous: Dict[str, Tuple[str, str, Any]] = {}  # key -> (model, "escalated"/"audited", answer)
+    pending = list(keys)
+    report = {"agent": agent, "tiers": []}
+    accepted = set()
+
+    def accept(key: str) -> None:
+        if on_accept and key not in accepted:
+            accepted.add(key)
+            on_accept(key, answers[key])
+
+    for level, model in enumerate(tiers):
+        if not pending:
+            break
+        last = level == len(tiers) - 1
+        start = time.perf_counter()
+        try:
+            got, failure = ask(model, pending), None
+        except OutputParserException as e:
+            got, failure = {}, "invalid"
+            logger.warning(f"Cascade '{agent}': {model} output failed the schema ({e}); "
+                           f"{'leaving' if last else 'escalating'} {len(pending)} items{' unanswered' if last else ''}.")
+        except Exception as e:
+            got, failure = {}, "error"
+            logger.warning(f"Cascade '{agent}': {model} call failed ({type(e).__name__}); "
+                           f"{'leaving' if last else 'escalating'} {len(pending)} items{' unanswered' if last else ''}.")
+        seconds = time.perf_counter() - start
+
+        # Agreement of the tier below with this one, on the items both answered
+        for key in pending:
+            if key in previous and key in got:
+                lower, kind, answer = previous[key]
+                _stats.record(agent, lower, lambda t, kind=kind, agreed=agree(answer, got[key]): t.compared(kind, agreed))
+
+        reasons = defaultdict(int)
+        escalated, audited, unanswered = [], [], 0
+        for key in pending:
+            if last:
+                if key in got:
+                    answers[key] = got[key]
+                    accept(key)
+                else:
+                    unanswered += 1
+                continue
+            reason = failure or ("missing" if key not in got else escalate(key, got[key]))
+            if reason:
+                reasons[reason] += 1
+                escalated.append(key)
+                if key in got:
+                    previous[key] = (model, "escalated", got[key])
+                continue
+            answers[key] = got[key]
+            if settings.CASCADE_AUDIT_RATE > 0 and random.random() < settings.CASCADE_AUDIT_RATE:
+                # Checked by the next tier too, whose answer is then used
+                audited.append(key)
+                previous[key] = (model, "audited", got[key])
+            else:
+                accept(key)
+
+        def update(t: _TierStats, items=len(pending), reasons=reasons, audits=len(audited), unanswered=unanswered):
+            t.items += items
+            t.calls += 1
+            t.audited += audits
+            t.unanswered += unanswered
+            t.seconds.append(seconds)
+            for reason, count in reasons.items():
+                t.escalated[reason] += count
+        _stats.record(agent, model, update)
+        report["tiers"].append({"model": model, "items": len(pending), "escalated": dict(reasons),
+                                "audited": len(audited), "unanswered": unanswered, "failure": failure,
+                                "seconds": round(seconds, 3)})
+        pending = escalated + audited
+    # Audited answers no higher tier replaced
+    for key in answers:
+        accept(key)
+    return answers, report
+
+
+def confidence_too_low(confidence: Optional[float]) -> bool:
+    return confidence is not None and confidence < settings.CASCADE_MIN_CONFIDENCE
@@ -1,12 +1,148 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables from the .env file in the `backend` directory
 load_dotenv()
 
+# The `backend` directory, so data paths don't depend on the working directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _merge_limits(limits: dict, overrides: dict, defaults: dict) -> dict:
+    for model, values in overrides.items():
+        limits[model] = {**limits.get(model, defaults), **values}
+    return limits
+
+
 class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
+    # "openai", or "fake" for the offline stand-in in app.core.fake_llm (benchmarks,
+    # development without an API key). "fake" also makes the local embeddings the default
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai")
     UPLOAD_DIR: str = "data/uploads" 
+    # Startup: "background" builds the LLM clients, embedding model, vector stores and
+    # agent graph in a background thread after the server starts (GET /ready reports when
+    # it is done); "lazy" builds each on first use only
+    WARM_UP: str = os.getenv("WARM_UP", "background")
+    # SQLite database, relative to the working directory (the `backend` folder). Connections
+    # are pooled per engine: DB_POOL_SIZE kept open, up to DB_MAX_OVERFLOW more under load
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./legal_ai.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    # How long a writer waits for SQLite's write lock before failing with "database is locked"
+    DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    # Clause alignment for document comparison: "assignment" (global) or "monotone" (order-preserving)
+    COMPARISON_ALIGNMENT: str = os.getenv("COMPARISON_ALIGNMENT", "assignment")
+    # Maximum number of concurrent LLM explanation calls for substantively modified clauses
+    COMPARISON_EXPLANATION_CONCURRENCY: int = int(os.getenv("COMPARISON_EXPLANATION_CONCURRENCY", "8"))
+    # Embedding provider for comparison and indexing: "openai" (remote) or "local" (CPU)
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "local" if LLM_PROVIDER == "fake" else "openai")
+    LOCAL_EMBEDDING_DIM: int = int(os.getenv("LOCAL_EMBEDDING_DIM", "384"))
+    # Similarity above which two clauses count as versions of each other. Local hashing
+    # embeddings score paraphrases lower than OpenAI's, so they get a lower default.
+    MODIFIED_THRESHOLDS = {"openai": 0.75, "local": 0.5}
+    COMPARISON_MODIFIED_THRESHOLD: float = float(os.getenv(
+        "COMPARISON_MODIFIED_THRESHOLD", MODIFIED_THRESHOLDS.get(EMBEDDING_PROVIDER, 0.75)
+    ))
+    # Persistent embedding cache shared by comparison and indexing
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(BACKEND_DIR, "data", "embedding_cache"))
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+    # Vector store for document chunks: "chroma", or "flat" (memory-mapped NumPy matrix
+    # with a SQLite metadata sidecar; "int8" quantization stores a quarter of the bytes)
+    VECTOR_STORE_BACKEND: str = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+    CHROMA_DIR: str = os.getenv("CHROMA_DIR", os.path.join(BACKEND_DIR, "data", "chroma"))
+    FLAT_VECTOR_STORE_DIR: str = os.getenv("FLAT_VECTOR_STORE_DIR", os.path.join(BACKEND_DIR, "data", "vector_store"))
+    FLAT_VECTOR_DTYPE: str = os.getenv("FLAT_VECTOR_DTYPE", "float32")
+    # Vector indexing: chunks per embedding request, and embedding requests in flight at once
+    INDEX_BATCH_SIZE: int = int(os.getenv("INDEX_BATCH_SIZE", "64"))
+    INDEX_CONCURRENCY: int = int(os.getenv("INDEX_CONCURRENCY", "4"))
+    # Chunk retrieval: "hybrid" (BM25 + dense, fused by reciprocal rank), "dense" or "lexical"
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")
+    # Candidates each ranking contributes to hybrid fusion, as a multiple of the results wanted
+    RETRIEVAL_CANDIDATES: int = int(os.getenv("RETRIEVAL_CANDIDATES", "4"))
+    # Corpus-wide clause search: ranked results kept per query (the pagination depth),
+    # and an LRU cache of recent queries whose entries expire after SEARCH_CACHE_TTL seconds
+    SEARCH_MAX_RESULTS: int = int(os.getenv("SEARCH_MAX_RESULTS", "200"))
+    SEARCH_CACHE_SIZE: int = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+    SEARCH_CACHE_TTL: float = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+    # Number of indexed chunks retrieved as context for each Q&A question
+    QA_TOP_K: int = int(os.getenv("QA_TOP_K", "4"))
+    # Semantic answer cache: a question this similar to an earlier one about the same,
+    # unchanged document (and naming the same parties and numbers) reuses its answer.
+    # Off by default with local embeddings: they only measure word overlap, so questions
+    # about different things score as high as paraphrases (benchmarks/bench_answer_cache.py).
+    QA_CACHE_ENABLED: bool = os.getenv(
+        "QA_CACHE_ENABLED", "false" if EMBEDDING_PROVIDER == "local" else "true"
+    ).lower() == "true"
+    QA_CACHE_THRESHOLDS = {"openai": 0.95, "local": 0.9}
+    QA_CACHE_THRESHOLD: float = float(os.getenv(
+        "QA_CACHE_THRESHOLD", QA_CACHE_THRESHOLDS.get(EMBEDDING_PROVIDER, 0.95)
+    ))
+    QA_CACHE_MAX_ENTRIES: int = int(os.getenv("QA_CACHE_MAX_ENTRIES", "256"))
+    QA_CACHE_MAX_DOCUMENTS: int = int(os.getenv("QA_CACHE_MAX_DOCUMENTS", "500"))
+    # Multi-turn Q&A: recent turns kept verbatim up to QA_HISTORY_TOKENS, older ones
+    # folded into a summary of at most QA_SUMMARY_TOKENS
+    QA_HISTORY_TOKENS: int = int(os.getenv("QA_HISTORY_TOKENS", "600"))
+    QA_SUMMARY_TOKENS: int = int(os.getenv("QA_SUMMARY_TOKENS", "200"))
+    QA_MAX_SESSIONS: int = int(os.getenv("QA_MAX_SESSIONS", "1000"))
+    # Documents the Word add-in syncs by paragraph edits (see app.utils.document_sessions);
+    # the least recently used beyond this many are dropped
+    DOCUMENT_SESSIONS_MAX: int = int(os.getenv("DOCUMENT_SESSIONS_MAX", "200"))
+    # LLM calls (see app.core.llm_pool). All clients share one HTTP connection pool of
+    # LLM_MAX_CONNECTIONS. Per model, at most `concurrency` calls are in flight and calls
+    # queue for the `rpm` (requests) and `tpm` (tokens) per-minute budgets instead of
+    # running into 429s. LLM_MODEL_LIMITS (JSON) overrides them, e.g. '{"gpt-4": {"tpm": 40000}}'
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+    LLM_DEFAULT_LIMITS = {"concurrency": 8, "rpm": 500, "tpm": 30000}
+    LLM_MODEL_LIMITS = _merge_limits({
+        "gpt-4": {"concurrency": 4, "rpm": 500, "tpm": 10000},
+        "gpt-4-turbo": {"concurrency": 8, "rpm": 500, "tpm": 30000},
+        "gpt-3.5-turbo": {"concurrency": 16, "rpm": 3500, "tpm": 200000},
+    }, json.loads(os.getenv("LLM_MODEL_LIMITS", "{}")), LLM_DEFAULT_LIMITS)
+    # Tokens reserved for each call's completion until the response reports actual usage
+    LLM_COMPLETION_TOKENS: int = int(os.getenv("LLM_COMPLETION_TOKENS", "1000"))
+    # Retries of rate-limited, timed-out and 5xx calls, with jittered exponential backoff
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "30.0"))
+    # Token budget of each agent's prompt (see app.utils.prompt_budget): content beyond it
+    # is compressed, then dropped, least relevant first. PROMPT_BUDGETS (JSON) overrides them
+    PROMPT_BUDGETS = {
+        "classification": 12000, "risk": 12000, "compliance": 6000, "explanation": 2000,
+        "qa": 3000, "summary": 1500,
+        # The report's sections (written concurrently, see the supervisor's aggregator)
+        "report_summary": 4000, "report_risks": 8000, "report_compliance": 3000,
+        **json.loads(os.getenv("PROMPT_BUDGETS", "{}"))
+    }
+    # Model cascade (see app.core.cascade): with CASCADE_ENABLED, clause classification and
+    # risk analysis first run on the cheapest model of their tiers, and only clauses whose
+    # answer is missing, schema-invalid or below CASCADE_MIN_CONFIDENCE go up a tier. Risks
+    # rated at one of CASCADE_ESCALATE_LEVELS, and pre-flagged clauses the cheap model found
+    # no risk in, are always confirmed by the next tier. CASCADE_AUDIT_RATE of accepted
+    # clauses go up a tier too, to measure agreement. CASCADE_TIERS (JSON) overrides the tiers
+    CASCADE_ENABLED: bool = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+    CASCADE_TIERS = {
+        "classification": ["gpt-3.5-turbo", "gpt-4-turbo"],
+        "risk": ["gpt-3.5-turbo", "gpt-4-turbo"],
+        **json.loads(os.getenv("CASCADE_TIERS", "{}"))
+    }
+    CASCADE_MIN_CONFIDENCE: float = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+    CASCADE_ESCALATE_LEVELS = [
+        level.strip() for level in os.getenv("CASCADE_ESCALATE_LEVELS", "critical").split(",") if level.strip()
+    ]
+    CASCADE_AUDIT_RATE: float = float(os.getenv("CASCADE_AUDIT_RATE", "0"))
+    # The fake provider: latency per call and per completion token, the fraction of calls
+    # failing with a provider error or returning truncated JSON, the RNG seed for those,
+    # and the most list items (e.g. one per clause) a structured reply holds
+    FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+    FAKE_LLM_MS_PER_TOKEN: float = float(os.getenv("FAKE_LLM_MS_PER_TOKEN", "0"))
+    FAKE_LLM_FAILURE_RATE: float = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+    FAKE_LLM_MALFORMED_RATE: float = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+    FAKE_LLM_SEED: int = int(os.getenv("FAKE_LLM_SEED", "0"))
+    FAKE_LLM_MAX_ITEMS: int = int(os.getenv("FAKE_LLM_MAX_ITEMS", "500"))
+    # Per-model overrides of the latency settings, e.g. '{"gpt-3.5-turbo": {"latency_ms": 150, "ms_per_token": 2}}'
+    FAKE_LLM_MODEL_LATENCY = json.loads(os.getenv("FAKE_LLM_MODEL_LATENCY", "{}"))
 
 settings = Settings()
 
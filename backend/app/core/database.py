@@ -1,35 +1,130 @@
-from sqlalchemy import create_engine
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
+from app.core.config import settings
+
 # 1. Define the database URL.
 # "sqlite:///./legal_ai.db" means we will use SQLite, and the database file
 # will be named "legal_ai.db" in the current directory (which will be the `backend` folder).
-SQLALCHEMY_DATABASE_URL = "sqlite:///./legal_ai.db"
+# The async engine reaches the same file through the aiosqlite driver.
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+# 2. Tune every new SQLite connection.
+# WAL lets readers proceed while a write is in progress and turns each commit into an
+# append to the log instead of a rewrite of the rollback journal; synchronous=NORMAL is
+# safe with WAL (a power loss can only drop the last commits, never corrupt the file).
+# busy_timeout makes concurrent writers wait for the lock instead of failing at once.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": settings.DB_BUSY_TIMEOUT_MS,
+    "cache_size": -64000,  # 64 MB page cache per connection
+    "temp_store": "MEMORY",
+}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL, tuned: bool = True) -> Engine:
+    """A sync engine; `tuned=False` leaves SQLite's defaults (used by the benchmarks)."""
+    # `check_same_thread` is needed only for SQLite to allow it to be used by multiple
+    # threads, which is something FastAPI does.
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW
+    )
+    if tuned and url.startswith("sqlite"):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def make_async_engine(url: str = ASYNC_DATABASE_URL) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW
+    )
+    if url.startswith("sqlite"):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
 
-# 2. Create the SQLAlchemy "engine".
+# 3. Create the SQLAlchemy engines.
 # The engine is the main entry point for SQLAlchemy to communicate with the database.
-# The `connect_args` is needed only for SQLite to allow it to be used by multiple threads,
-# which is something FastAPI does.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-
-# 3. Create a SessionLocal class.
-# Each instance of SessionLocal will be a new database session. A session is the
-# "conversation" you have with your database to perform operations (query, insert, etc.).
+# Sync handlers (which FastAPI runs in a thread pool) use `engine`; async handlers use
+# `async_engine` so their queries don't block the event loop.
+engine = make_engine()
+async_engine = make_async_engine()
+
+# 4. Create the session factories.
+# Each session is a new "conversation" with the database (query, insert, etc.).
+# Async sessions keep loaded attributes after commit, since lazy-loading them again
+# would need an await.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
-# 4. Create a Base class.
+# 5. Create a Base class.
 # Our ORM models will inherit from this class. It helps SQLAlchemy discover our
 # models and map them to the database tables.
 class Base(DeclarativeBase):
     pass
 
 
+def create_indexes(bind: Engine = engine):
+    """
+    Creates the models' indexes that are missing. `create_all` skips existing tables
+    entirely, so indexes added to a model later would otherwise never reach an existing
+    database.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
 # Dependency to get a DB session for each request
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Dependency to get an async DB session for each request (for `async def` handlers)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# SQLite allows one writer at a time. Writers that find the database locked poll with
+# growing sleeps (up to busy_timeout), so under contention some uploads wait far longer
+# than others; queueing this process's write transactions on a lock instead serves
+# them in order and keeps tail latency close to the average.
+_write_lock = asyncio.Lock()
+
+
+@asynccontextmanager
+async def write_transaction(db: AsyncSession):
+    """Runs the block's writes as one transaction, committed at the end, one writer at a time."""
+    async with _write_lock:
+        try:
+            yield db
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
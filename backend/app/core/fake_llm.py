@@ -0,0 +1,206 @@
+"""
+An offline, deterministic stand-in for the OpenAI chat models, selected with
+LLM_PROVIDER=fake. Every agent gets it through `build_chat_model`, behind the same
+pool and limiter as the real client, so the whole pipeline runs without network or cost.
+
+Replies are built from the prompt:
+  - if the prompt carries a PydanticOutputParser schema, the reply is a JSON instance of
+    it. Lists of objects with clause fields get one item per clause found in the prompt,
+    categories come from the keyword categorizer, and fields whose description lists
+    options ("(low, medium, high, or critical)") pick one and numbers stay within their
+    minimum and maximum (mostly near the maximum), all seeded by the content;
+  - otherwise a fixed-length prose reply.
+
+FAKE_LLM_LATENCY_MS and FAKE_LLM_MS_PER_TOKEN simulate response time (overridden per model
+by FAKE_LLM_MODEL_LATENCY), FAKE_LLM_FAILURE_RATE raises provider errors (HTTP 500, retried
+by the pool) and FAKE_LLM_MALFORMED_RATE returns truncated JSON, so error handling can be
+exercised too.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from app.core.config import settings
+from app.utils.clause_categories import categorize_clause
+from app.utils.prompt_budget import count_tokens
+
+SCHEMA_PATTERN = re.compile(r"Here is the output schema:\s*```\s*(\{.*?\})\s*```", re.DOTALL)
+# Clauses as the agents put them in prompts: JSON from extract_clauses, or "Clause 3.: text" lines
+JSON_CLAUSE_PATTERN = re.compile(r'"clause_number":\s*"((?:[^"\\]|\\.)*)",\s*"content":\s*"((?:[^"\\]|\\.)*)"')
+LINE_CLAUSE_PATTERN = re.compile(r"^\s*Clause (\S+): (.+)$", re.MULTILINE)
+OPTIONS_PATTERN = re.compile(r"\(([a-z]+(?:, [a-z]+)*,? (?:or )?[a-z]+)\)")
+
+PROSE = (
+    "The contract sets out the obligations of both parties, with payment due within thirty days "
+    "of invoice, a mutual confidentiality undertaking and termination rights on written notice. "
+    "Liability is capped at the fees paid in the preceding twelve months, excluding fraud and "
+    "wilful misconduct. Key items to review are the indemnity scope, the renewal mechanics and "
+    "the governing law and dispute resolution provisions."
+)
+
+
+def _seed(*parts: str) -> int:
+    return int.from_bytes(hashlib.sha256("\x1f".join(parts).encode()).digest()[:8], "big")
+
+
+def _clauses_in(prompt: str) -> List[Tuple[str, str]]:
+    clauses = [(json.loads(f'"{n}"'), json.loads(f'"{t}"')) for n, t in JSON_CLAUSE_PATTERN.findall(prompt)]
+    return clauses or LINE_CLAUSE_PATTERN.findall(prompt)
+
+
+class _InstanceBuilder:
+    """Builds a JSON instance of a (pydantic-generated) JSON schema."""
+
+    def __init__(self, schema: Dict, prompt: str):
+        self.defs = schema.get("$defs", {})
+        self.prompt = prompt
+        self.clauses = _clauses_in(prompt)[:settings.FAKE_LLM_MAX_ITEMS]
+
+    def resolve(self, schema: Dict) -> Dict:
+        if "$ref" in schema:
+            return self.defs[schema["$ref"].split("/")[-1]]
+        for key in ("anyOf", "oneOf"):
+            if key in schema:
+                options = [s for s in schema[key] if s.get("type") != "null"]
+                return self.resolve(options[0]) if options else {"type": "null"}
+        return schema
+
+    def build(self, schema: Dict, name: str = "", clause: Optional[Tuple[str, str]] = None) -> Any:
+        schema = self.resolve(schema)
+        kind = schema.get("type")
+        if kind == "object" or "properties" in schema:
+            return {key: self.build(sub, key, clause) for key, sub in schema.get("properties", {}).items()}
+        if kind == "array":
+            items = self.resolve(schema.get("items", {}))
+            fields = set(items.get("properties", {}))
+            if self.clauses and fields & {"clause_number", "clause_text"}:
+                return [self.build(items, name, c) for c in self.clauses]
+            return [self.build(items, name, clause) for _ in range(2)]
+        seed = _seed(name, clause[1] if clause else self.prompt)
+        if kind == "boolean":
+            return seed % 2 == 0
+        if kind in ("integer", "number"):
+            if "minimum" in schema and "maximum" in schema:
+                low, high = schema["minimum"], schema["maximum"]
+                # Skewed towards the maximum, like a model's confidence: a quarter below 70%
+                value = high - (high - low) * ((seed % 101) / 100) ** 4
+                return round(value, 2) if kind == "number" else int(value)
+            return seed % 100
+        if kind == "null":
+            return None
+        return self.string(schema, name, clause, seed)
+
+    def string(self, schema: Dict, name: str, clause: Optional[Tuple[str, str]], seed: int) -> str:
+        number, text = clause if clause else ("", "")
+        if name == "clause_number":
+            return number
+        if name in ("clause_text", "text", "content"):
+            return text
+        if name == "category":
+            return categorize_clause(text)
+        # A field the prompt states outright ("Requirement: ...") is echoed back
+        title = schema.get("title") or name.replace("_", " ").title()
+        stated = re.search(rf"^\s*{re.escape(title)}:\s*(.+)$", self.prompt, re.MULTILINE | re.IGNORECASE)
+        if stated:
+            return stated.group(1).strip()
+        options = OPTIONS_PATTERN.search(schema.get("description", ""))
+        if options:
+            choices = [o.strip() for o in re.split(r",|\bor\b", options.group(1)) if o.strip()]
+            return choices[seed % len(choices)]
+        words = PROSE.split()
+        start = seed % (len(words) - 12)
+        return " ".join(words[start:start + 12])
+
+
+class FakeChatModel(BaseChatModel):
+    """A chat model that answers from the prompt alone; see the module docstring."""
+
+    model_name: str = "fake"
+    latency_ms: float = 0.0
+    ms_per_token: float = 0.0
+    failure_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def _compose(self, messages: List[BaseMessage]) -> Tuple[str, Dict[str, int]]:
+        """Returns the reply text and its token usage (raising the simulated failures)."""
+        prompt = "\n".join(str(m.content) for m in messages)
+        if self._roll(self.failure_rate):
+            import httpx
+            import openai
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            raise openai.InternalServerError("Simulated provider error", response=httpx.Response(500, request=request), body=None)
+
+        match = SCHEMA_PATTERN.search(prompt)
+        if match:
+            schema = json.loads(match.group(1))
+            text = json.dumps(_InstanceBuilder(schema, prompt).build(schema))
+            if self._roll(self.malformed_rate):
+                text = text[:len(text) // 2]
+        else:
+            text = PROSE
+        usage = {"input_tokens": count_tokens(prompt, self.model_name), "output_tokens": count_tokens(text, self.model_name)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return text, usage
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text, usage = self._compose(messages)
+        delay = self.latency_ms + self.ms_per_token * usage["output_tokens"]
+        if delay > 0:
+            time.sleep(delay / 1000)
+        message = AIMessage(content=text, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        """FAKE_LLM_LATENCY_MS before the first chunk, then one chunk per ~token."""
+        text, usage = self._compose(messages)
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+        for n, piece in enumerate(pieces):
+            if self.ms_per_token > 0:
+                time.sleep(self.ms_per_token / 1000)
+            last = n == len(pieces) - 1
+            chunk = AIMessageChunk(content=piece, usage_metadata=usage if last else None)
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+def build_fake_chat_model(model: str) -> FakeChatModel:
+    latency = settings.FAKE_LLM_MODEL_LATENCY.get(model, {})
+    return FakeChatModel(
+        model_name=model,
+        latency_ms=latency.get("latency_ms", settings.FAKE_LLM_LATENCY_MS),
+        ms_per_token=latency.get("ms_per_token", settings.FAKE_LLM_MS_PER_TOKEN),
+        failure_rate=settings.FAKE_LLM_FAILURE_RATE,
+        malformed_rate=settings.FAKE_LLM_MALFORMED_RATE,
+        seed=settings.FAKE_LLM_SEED
+    )
@@ -0,0 +1,292 @@
+"""
+The LLM client pool. Every chat model the agents use comes from `build_chat_model`,
+which wraps the provider client in a `PooledChatModel`:
+
+  - all clients share one HTTP connection pool (`get_http_client`), so calls reuse
+    keep-alive connections instead of each client opening its own;
+  - each model has a concurrency cap and request/token per-minute budgets (token
+    buckets), and calls wait their turn instead of being sent into a 429;
+  - rate-limited, timed-out and 5xx calls are retried with jittered exponential
+    backoff, honouring the provider's Retry-After header;
+  - queue waits, retries and token usage are recorded per model (`llm_stats`,
+    served at GET /api/llm/stats).
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.utils.prompt_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    `capacity` units per minute, refilled continuously. `acquire` reserves units
+    immediately (the balance may go negative) and returns how long the caller must wait
+    for them, so callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float) -> float:
+        amount = min(amount, self.capacity)  # a single oversized call must still get through
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charges (or, if negative, refunds) units once the actual usage is known."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class ModelLimiter:
+    """The concurrency cap, rate budgets and metrics of one model."""
+
+    def __init__(self, model: str, concurrency: int, rpm: float, tpm: float):
+        self.model = model
+        self.limits = {"concurrency": concurrency, "rpm": rpm, "tpm": tpm}
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=1000)
+        self.calls = self.retries = self.rate_limited = self.failures = 0
+        self.tokens_used = 0
+        self.queued = self.in_flight = 0
+
+    def acquire(self, tokens: int) -> float:
+        """Waits for a request, `tokens` of budget and a free slot; returns the seconds waited."""
+        start = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+        try:
+            delay = max(self.requests.acquire(1), self.tokens.acquire(tokens))
+            if delay > 0:
+                time.sleep(delay)
+            self.slots.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.in_flight += 1
+            self._waits.append(waited)
+        return waited
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self.slots.release()
+
+    def record(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                "limits": self.limits,
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failures": self.failures,
+                "tokens_used": self.tokens_used,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+            }
+        if waits:
+            stats["queue_wait_ms"] = {
+                "p50": round(waits[len(waits) // 2] * 1000, 1),
+                "p95": round(waits[int(len(waits) * 0.95)] * 1000, 1),
+                "max": round(waits[-1] * 1000, 1),
+            }
+        return stats
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    with _limiters_lock:
+        if model not in _limiters:
+            limits = settings.LLM_MODEL_LIMITS.get(model, settings.LLM_DEFAULT_LIMITS)
+            _limiters[model] = ModelLimiter(model, **limits)
+        return _limiters[model]
+
+
+def llm_stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.model: limiter.stats() for limiter in limiters}
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """The HTTP connection pool shared by every OpenAI client (chat and embeddings)."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            import httpx
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0)
+            )
+        return _http_client
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying `error`, or None if it shouldn't be retried."""
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after) + random.uniform(0, settings.LLM_RETRY_BASE_DELAY)
+            except ValueError:
+                pass
+    elif not isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return None
+    # Full jitter, so calls that failed together don't retry together
+    return random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _count_input_tokens(input: Any, model: str) -> int:
+    if hasattr(input, "to_messages"):
+        input = input.to_messages()
+    if isinstance(input, list):
+        return sum(count_tokens(str(getattr(m, "content", m)), model) for m in input)
+    return count_tokens(str(input), model)
+
+
+class PooledChatModel(Runnable):
+    """
+    A chat model whose calls go through its model's limiter. Used in chains exactly
+    like the model it wraps (`prompt | model | parser`, invoke, batch, stream).
+    """
+
+    def __init__(self, model: Runnable, limiter: ModelLimiter):
+        self.model = model
+        self.limiter = limiter
+
+    def _reconcile(self, estimate: int, usage: Optional[dict]) -> None:
+        if usage and usage.get("total_tokens"):
+            self.limiter.tokens.adjust(usage["total_tokens"] - estimate)
+            self.limiter.record(tokens_used=usage["total_tokens"])
+
+    def _with_retries(self, estimate: int, call):
+        import openai
+
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            self.limiter.acquire(estimate)
+            try:
+                result = call()
+            except Exception as e:
+                # A failed call used no completion tokens; give its reservation back
+                self.limiter.tokens.adjust(-estimate)
+                delay = _retry_delay(e, attempt)
+                if isinstance(e, openai.RateLimitError):
+                    self.limiter.record(rate_limited=1)
+                if delay is None or attempt == settings.LLM_MAX_RETRIES:
+                    self.limiter.record(failures=1)
+                    raise
+                self.limiter.record(retries=1)
+                logger.warning(f"{self.limiter.model} call failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+            else:
+                self.limiter.record(calls=1)
+                return result
+            finally:
+                self.limiter.release()
+            time.sleep(delay)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        estimate = _count_input_tokens(input, self.limiter.model) + settings.LLM_COMPLETION_TOKENS
+        result = self._with_retries(estimate, lambda: self.model.invoke(input, config, **kwargs))
+        self._reconcile(estimate, getattr(result, "usage_metadata", None))
+        return result
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        """
+        Holds a slot until the stream ends. Retried like `invoke` until the first chunk
+        arrives, not after: its chunks may already have been used.
+        """
+        import openai
+
+        estimate = _count_input_tokens(input, self.limiter.model) + settings.LLM_COMPLETION_TOKENS
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            self.limiter.acquire(estimate)
+            usage, started = None, False
+            try:
+                for chunk in self.model.stream(input, config, **kwargs):
+                    started = True
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    yield chunk
+                self.limiter.record(calls=1)
+                return
+            except Exception as e:
+                delay = None if started else _retry_delay(e, attempt)
+                if not started:
+                    self.limiter.tokens.adjust(-estimate)
+                if isinstance(e, openai.RateLimitError):
+                    self.limiter.record(rate_limited=1)
+                if delay is None or attempt == settings.LLM_MAX_RETRIES:
+                    self.limiter.record(failures=1)
+                    raise
+                self.limiter.record(retries=1)
+                logger.warning(f"{self.limiter.model} stream failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+            finally:
+                self.limiter.release()
+                self._reconcile(estimate, usage)
+            time.sleep(delay)
+
+
+def build_chat_model(model: str) -> PooledChatModel:
+    """
+    A ChatOpenAI client on the shared connection pool, behind its model's limiter
+    (with LLM_PROVIDER=fake, the offline fake model behind the same limiter).
+    """
+    if settings.LLM_PROVIDER == "fake":
+        from app.core.fake_llm import build_fake_chat_model
+        return PooledChatModel(build_fake_chat_model(model), get_limiter(model))
+    if settings.LLM_PROVIDER != "openai":
+        raise ValueError(f"Unknown LLM provider '{settings.LLM_PROVIDER}'. Use 'openai' or 'fake'.")
+    from langchain_openai import ChatOpenAI
+
+    client = ChatOpenAI(
+        model=model,
+        temperature=0,
+        api_key=settings.OPENAI_API_KEY,
+        http_client=get_http_client(),
+        max_retries=0,  # retried here, where retries also wait for the rate budgets
+        stream_usage=True  # streams end with their token usage, reconciled like invoke's
+    )
+    return PooledChatModel(client, get_limiter(model))
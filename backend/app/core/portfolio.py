@@ -0,0 +1,243 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Any
+
+from sqlalchemy import select, delete, insert, func, case, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.bulk import insert_analysis_results
+from app.models.document import Document
+from app.models.analysis import (
+    AnalysisResult, RiskFinding, ComplianceFinding,
+    RiskSummary, ComplianceSummary, DocumentRiskSummary
+)
+from app.utils.clause_categories import categorize_clause
+
+# Portfolio analytics. Each document's latest analysis is normalized into
+# RiskFinding / ComplianceFinding rows, and the summary tables are adjusted by the
+# difference from the document's previous analysis, so aggregate queries read a
+# few hundred summary rows instead of every analysis. `rebuild_summaries`
+# recomputes them from the findings if they ever drift.
+
+RISK_LEVELS = ("critical", "high", "medium", "low")
+
+
+def _risk_level(value: Any) -> str:
+    level = str(value or "").strip().lower()
+    return level if level in RISK_LEVELS else "unknown"
+
+
+def _upsert_add(table, keys: List[str], rows: List[Dict], counters: List[str]):
+    """INSERT ... ON CONFLICT DO UPDATE that adds `counters` to existing rows."""
+    statement = sqlite_insert(table).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={c: getattr(table.c, c) + getattr(statement.excluded, c) for c in counters}
+    )
+
+
+# --- 1. WRITING ---
+
+async def record_analysis(db: AsyncSession, document_id: int, results: Dict[str, Any]) -> int:
+    """
+    Stores an analysis of a document (the /analysis response: report, risks,
+    compliance, ...) and updates the portfolio summaries. Run it inside a write
+    transaction.
+
+    Returns:
+        The id of the new AnalysisResult row.
+    """
+    # 1. The previous analysis' findings, to take back out of the summaries
+    old_risks = (await db.execute(
+        select(RiskFinding.category, RiskFinding.risk_level, func.count())
+        .where(RiskFinding.document_id == document_id)
+        .group_by(RiskFinding.category, RiskFinding.risk_level)
+    )).all()
+    old_compliance = (await db.execute(
+        select(ComplianceFinding.requirement, ComplianceFinding.is_compliant, func.count())
+        .where(ComplianceFinding.document_id == document_id)
+        .group_by(ComplianceFinding.requirement, ComplianceFinding.is_compliant)
+    )).all()
+    await db.execute(delete(RiskFinding).where(RiskFinding.document_id == document_id))
+    await db.execute(delete(ComplianceFinding).where(ComplianceFinding.document_id == document_id))
+
+    # 2. The analysis itself and its normalized findings
+    [analysis_id] = await insert_analysis_results(db, document_id, [{"analysis_type": "full", "results": results}])
+    risk_rows = [
+        {
+            "analysis_id": analysis_id,
+            "document_id": document_id,
+            "category": categorize_clause(risk.get("clause_text") or ""),
+            "risk_level": _risk_level(risk.get("risk_level")),
+            "clause_text": risk.get("clause_text"),
+            "description": risk.get("description")
+        }
+        for risk in results.get("risks", [])
+    ]
+    compliance_rows = [
+        {
+            "analysis_id": analysis_id,
+            "document_id": document_id,
+            "requirement": check.get("requirement"),
+            "is_compliant": bool(check.get("is_compliant")),
+            "severity": check.get("severity")
+        }
+        for check in results.get("compliance", [])
+    ]
+    if risk_rows:
+        await db.execute(insert(RiskFinding), risk_rows)
+    if compliance_rows:
+        await db.execute(insert(ComplianceFinding), compliance_rows)
+
+    # 3. Apply the difference to the portfolio summaries
+    risk_delta = defaultdict(int)
+    for category, level, count in old_risks:
+        risk_delta[(category, level)] -= count
+    for row in risk_rows:
+        risk_delta[(row["category"], row["risk_level"])] += 1
+    risk_delta = {key: n for key, n in risk_delta.items() if n}
+    if risk_delta:
+        await db.execute(_upsert_add(
+            RiskSummary.__table__, ["category", "risk_level"],
+            [{"category": c, "risk_level": l, "count": n} for (c, l), n in risk_delta.items()],
+            ["count"]
+        ))
+        await db.execute(delete(RiskSummary).where(RiskSummary.count <= 0))
+
+    compliance_delta = defaultdict(lambda: [0, 0])
+    for requirement, is_compliant, count in old_compliance:
+        compliance_delta[requirement][0 if is_compliant else 1] -= count
+    for row in compliance_rows:
+        compliance_delta[row["requirement"]][0 if row["is_compliant"] else 1] += 1
+    compliance_delta = {key: n for key, n in compliance_delta.items() if any(n)}
+    if compliance_delta:
+        await db.execute(_upsert_add(
+            ComplianceSummary.__table__, ["requirement"],
+            [{"requirement": r, "compliant": n[0], "non_compliant": n[1]} for r, n in compliance_delta.items()],
+            ["compliant", "non_compliant"]
+        ))
+        await db.execute(delete(ComplianceSummary).where(ComplianceSummary.compliant + ComplianceSummary.non_compliant <= 0))
+
+    levels = defaultdict(int)
+    for row in risk_rows:
+        levels[row["risk_level"]] += 1
+    document_summary = {
+        "document_id": document_id,
+        "analysis_id": analysis_id,
+        **{level: levels[level] for level in RISK_LEVELS},
+        "total": len(risk_rows),
+        "compliance_failures": sum(not row["is_compliant"] for row in compliance_rows),
+        "updated_at": datetime.now()
+    }
+    statement = sqlite_insert(DocumentRiskSummary).values(document_summary)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=["document_id"],
+        set_={k: v for k, v in document_summary.items() if k != "document_id"}
+    ))
+    return analysis_id
+
+
+async def rebuild_summaries(db: AsyncSession) -> Dict[str, int]:
+    """
+    Recomputes every summary table from the findings. Run it inside a write transaction.
+    """
+    for table in (RiskSummary, ComplianceSummary, DocumentRiskSummary):
+        await db.execute(delete(table))
+
+    await db.execute(insert(RiskSummary).from_select(
+        ["category", "risk_level", "count"],
+        select(RiskFinding.category, RiskFinding.risk_level, func.count())
+        .group_by(RiskFinding.category, RiskFinding.risk_level)
+    ))
+    await db.execute(insert(ComplianceSummary).from_select(
+        ["requirement", "compliant", "non_compliant"],
+        select(
+            ComplianceFinding.requirement,
+            func.sum(case((ComplianceFinding.is_compliant, 1), else_=0)),
+            func.sum(case((ComplianceFinding.is_compliant, 0), else_=1))
+        ).group_by(ComplianceFinding.requirement)
+    ))
+
+    # One row per analyzed document, from its latest analysis
+    latest = (
+        select(AnalysisResult.document_id, func.max(AnalysisResult.id).label("analysis_id"))
+        .where(AnalysisResult.analysis_type == "full")
+        .group_by(AnalysisResult.document_id)
+        .subquery()
+    )
+    risks = (
+        select(
+            RiskFinding.document_id,
+            *(func.sum(case((RiskFinding.risk_level == level, 1), else_=0)).label(level) for level in RISK_LEVELS),
+            func.count().label("total")
+        ).group_by(RiskFinding.document_id).subquery()
+    )
+    failures = (
+        select(ComplianceFinding.document_id, func.count().label("failures"))
+        .where(ComplianceFinding.is_compliant.is_(False))
+        .group_by(ComplianceFinding.document_id).subquery()
+    )
+    await db.execute(insert(DocumentRiskSummary).from_select(
+        ["document_id", "analysis_id", *RISK_LEVELS, "total", "compliance_failures", "updated_at"],
+        select(
+            latest.c.document_id,
+            latest.c.analysis_id,
+            *(func.coalesce(risks.c[level], 0) for level in RISK_LEVELS),
+            func.coalesce(risks.c.total, 0),
+            func.coalesce(failures.c.failures, 0),
+            literal(datetime.now())
+        )
+        .outerjoin(risks, risks.c.document_id == latest.c.document_id)
+        .outerjoin(failures, failures.c.document_id == latest.c.document_id)
+    ))
+
+    return {
+        "risk_summary_rows": await db.scalar(select(func.count()).select_from(RiskSummary)),
+        "compliance_summary_rows": await db.scalar(select(func.count()).select_from(ComplianceSummary)),
+        "documents": await db.scalar(select(func.count()).select_from(DocumentRiskSummary))
+    }
+
+
+# --- 2. READING ---
+
+async def risk_distribution(db: AsyncSession) -> Dict[str, Any]:
+    """Risk counts per clause category and level, plus totals per level."""
+    categories = defaultdict(dict)
+    totals = defaultdict(int)
+    for category, level, count in (await db.execute(select(RiskSummary.category, RiskSummary.risk_level, RiskSummary.count))).all():
+        categories[category][level] = count
+        totals[level] += count
+    documents = await db.scalar(select(func.count()).select_from(DocumentRiskSummary))
+    return {"documents": documents, "totals": dict(totals), "categories": dict(categories)}
+
+
+async def top_risk_documents(db: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
+    """The documents with the most critical (then high) risks in their latest analysis."""
+    rows = (await db.execute(
+        select(DocumentRiskSummary, Document.filename)
+        .outerjoin(Document, Document.id == DocumentRiskSummary.document_id)
+        .order_by(DocumentRiskSummary.critical.desc(), DocumentRiskSummary.high.desc())
+        .limit(limit)
+    )).all()
+    return [
+        {
+            "document_id": summary.document_id,
+            "filename": filename,
+            "analysis_id": summary.analysis_id,
+            **{level: getattr(summary, level) for level in RISK_LEVELS},
+            "total": summary.total,
+            "compliance_failures": summary.compliance_failures,
+            "updated_at": summary.updated_at
+        }
+        for summary, filename in rows
+    ]
+
+
+async def compliance_overview(db: AsyncSession) -> List[Dict[str, Any]]:
+    """Documents meeting and failing each compliance requirement."""
+    rows = (await db.execute(select(ComplianceSummary).order_by(ComplianceSummary.non_compliant.desc()))).scalars()
+    return [
+        {"requirement": row.requirement, "compliant": row.compliant, "non_compliant": row.non_compliant}
+        for row in rows
+    ]
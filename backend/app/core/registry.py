@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Registry:
+    """
+    Heavy shared objects (LLM clients, chains, the embedding model, vector stores, the
+    spaCy pipeline, the compiled agent graph), built on first use instead of at import,
+    so the application starts serving immediately. `warm_up` builds them all ahead of
+    traffic. Each object is built once; concurrent first users wait for that build.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._build_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.warm_up_started = False
+        self.warm_up_finished = False
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str, factory: Optional[Callable[[], Any]] = None) -> Any:
+        """Returns the object, building it on first use. `factory` registers `name` if it is new."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._factories:
+                if factory is None:
+                    raise KeyError(f"Nothing registered under '{name}'.")
+                self._factories[name] = factory
+                self._locks[name] = threading.Lock()
+            lock = self._locks[name]
+        with lock:
+            if name not in self._instances:
+                start = time.perf_counter()
+                try:
+                    self._instances[name] = self._factories[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._errors.pop(name, None)
+                self._build_seconds[name] = time.perf_counter() - start
+            return self._instances[name]
+
+    def override(self, name: str, instance: Any) -> None:
+        """Replaces an object (e.g. with a stand-in for benchmarks)."""
+        with self._lock:
+            self._factories.setdefault(name, lambda: instance)
+            self._locks.setdefault(name, threading.Lock())
+            self._instances[name] = instance
+
+    def reset(self, name: str) -> None:
+        """Drops a built object; the next `get` builds it again."""
+        with self._lock:
+            self._instances.pop(name, None)
+
+    def warm_up(self, first: List[str] = ("graph_app",)) -> Dict[str, Any]:
+        """
+        Builds every registered object, `first` first. Building the graph imports the
+        agents, which register their own chains, so this repeats until nothing new
+        appears. Failures are recorded in `status`, not raised.
+        """
+        self.warm_up_started = True
+        built = set()
+        while True:
+            with self._lock:
+                pending = [n for n in list(first) + list(self._factories) if n in self._factories and n not in built]
+            if not pending:
+                break
+            for name in dict.fromkeys(pending):
+                built.add(name)
+                try:
+                    self.get(name)
+                except Exception:
+                    pass
+        self.warm_up_finished = True
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {
+                    "built": name in self._instances,
+                    "seconds": round(self._build_seconds[name], 3) if name in self._build_seconds else None,
+                    "error": self._errors.get(name)
+                }
+                for name in self._factories
+            }
+
+
+registry = Registry()
+
+
+def get_chat_model(model: str):
+    """One shared chat client per model name, rate-limited by app.core.llm_pool."""
+    def build():
+        from app.core.llm_pool import build_chat_model
+        return build_chat_model(model)
+    return registry.get(f"chat_model:{model}", build)
+
+
+def _build_graph_app():
+    from app.agents.supervisor import build_graph
+    return build_graph()
+
+
+registry.register("graph_app", _build_graph_app)
+
+
+def get_graph_app():
+    """The compiled LangGraph workflow (importing the agents on first use)."""
+    return registry.get("graph_app")
+
+
+def run_graph(initial_state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Runs the workflow to completion and returns the state the last node produced. It
+    blocks (LLM calls, rate-limit waits, retry backoff), so async endpoints call it
+    through run_in_threadpool.
+    """
+    final_state = None
+    for step in get_graph_app().stream(initial_state):
+        final_state = list(step.values())[0]
+    return final_state
@@ -1,13 +1,33 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.core.database import engine, Base
+from app.core.config import settings
+from app.core.database import engine, Base, create_indexes
+from app.core.registry import registry
 import app.models # Import the models package
 
-from app.api import documents, analysis, qa
+from app.api import documents, analysis, qa, comparison, search, portfolio, llm, sessions
 Base.metadata.create_all(bind=engine)
+create_indexes(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy objects (LLM clients, embedding model, vector stores, agent graph) are built
+    # on first use, so the server starts serving at once. In "background" mode they are
+    # built in a worker thread right after startup; GET /ready reports when that is done.
+    if settings.WARM_UP == "background":
+        warm_up = asyncio.get_running_loop().run_in_executor(None, registry.warm_up)
+        warm_up.add_done_callback(lambda f: logging.info(f"Warm-up finished: {f.result()}"))
+    yield
 
-app = FastAPI(title="Agentic AI Legal Assistant")
+
+app = FastAPI(title="Agentic AI Legal Assistant", lifespan=lifespan)
 
 # --- CORS Configuration ---
 # Define the list of allowed origins (your frontend's URL)
@@ -29,9 +49,27 @@ app.add_middleware(
 # --- End CORS Configuration ---
 app.include_router(analysis.router, prefix="/api")
 app.include_router(qa.router, prefix="/api")
+app.include_router(comparison.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(portfolio.router, prefix="/api")
+app.include_router(llm.router, prefix="/api")
+app.include_router(sessions.router, prefix="/api")
 
 app.include_router(documents.router)
 app.include_router(analysis.router)
 @app.get("/", tags=["Health Check"])
 def read_root():
-    return {"status": "ok", "message": "Welcome to the AI Legal Assistant API!"}
\ No newline at end of file
+    return {"status": "ok", "message": "Welcome to the AI Legal Assistant API!"}
+
+@app.get("/ready", tags=["Health Check"])
+def read_readiness():
+    """
+    Readiness probe: 200 once the background warm-up has built every resource (always,
+    in lazy mode), otherwise 503. Lists each resource with its build time or error.
+    """
+    resources = registry.status()
+    if settings.WARM_UP == "background":
+        ready = registry.warm_up_finished and not any(r["error"] for r in resources.values())
+    else:
+        ready = True
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "resources": resources})
\ No newline at end of file
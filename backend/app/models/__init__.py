@@ -1,5 +1,8 @@
 # In app/models/__init__.py
 
 from .user import User
-from .document import Document, Clause
-from .analysis import AnalysisResult
\ No newline at end of file
+from .document import Document, Clause, IngestedFile
+from .analysis import (
+    AnalysisResult, RiskFinding, ComplianceFinding,
+    RiskSummary, ComplianceSummary, DocumentRiskSummary
+)
\ No newline at end of file
@@ -1,11 +1,70 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, JSON, Boolean, Index
 from app.core.database import Base
 
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
 
     id = Column(Integer, primary_key=True)
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
     analysis_type = Column(Text)
     results = Column(JSON) # JSON type is great for storing flexible data
-    created_at = Column(TIMESTAMP)
\ No newline at end of file
+    created_at = Column(TIMESTAMP)
+
+
+# --- Normalized findings of each document's latest analysis ---
+
+class RiskFinding(Base):
+    __tablename__ = "risk_findings"
+
+    id = Column(Integer, primary_key=True)
+    analysis_id = Column(Integer, ForeignKey("analysis_results.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    category = Column(Text)  # Clause category of the risky clause (see clause_categories)
+    risk_level = Column(Text)
+    clause_text = Column(Text)
+    description = Column(Text)
+
+class ComplianceFinding(Base):
+    __tablename__ = "compliance_findings"
+
+    id = Column(Integer, primary_key=True)
+    analysis_id = Column(Integer, ForeignKey("analysis_results.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    requirement = Column(Text)
+    is_compliant = Column(Boolean)
+    severity = Column(Text)
+
+
+# --- Portfolio summaries, updated incrementally as each analysis is written ---
+
+class RiskSummary(Base):
+    """Number of risks per clause category and risk level across the portfolio."""
+    __tablename__ = "risk_summary"
+
+    category = Column(Text, primary_key=True)
+    risk_level = Column(Text, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class ComplianceSummary(Base):
+    """Number of documents meeting or failing each compliance requirement."""
+    __tablename__ = "compliance_summary"
+
+    requirement = Column(Text, primary_key=True)
+    compliant = Column(Integer, nullable=False, default=0)
+    non_compliant = Column(Integer, nullable=False, default=0)
+
+class DocumentRiskSummary(Base):
+    """Per-document risk counts, indexed for "most critical contracts" rankings."""
+    __tablename__ = "document_risk_summary"
+
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    analysis_id = Column(Integer, ForeignKey("analysis_results.id"))
+    critical = Column(Integer, nullable=False, default=0)
+    high = Column(Integer, nullable=False, default=0)
+    medium = Column(Integer, nullable=False, default=0)
+    low = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    compliance_failures = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP)
+
+    __table_args__ = (Index("ix_document_risk_summary_ranking", "critical", "high"),)
@@ -16,8 +16,20 @@ class Clause(Base):
     __tablename__ = "clauses"
     
     id = Column(Integer, primary_key=True)
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
     clause_type = Column(Text)
     content = Column(Text)
     risk_level = Column(Text)
-    position = Column(Integer)
\ No newline at end of file
+    position = Column(Integer)
+
+class IngestedFile(Base):
+    """Progress of the bulk ingestion CLI, one row per distinct file content."""
+    __tablename__ = "ingested_files"
+
+    sha256 = Column(Text, primary_key=True)
+    path = Column(Text)
+    document_id = Column(Integer, ForeignKey("documents.id"))
+    status = Column(Text)  # "indexing", "done" or "failed"
+    clauses = Column(Integer)
+    error = Column(Text)
+    ingested_at = Column(TIMESTAMP)
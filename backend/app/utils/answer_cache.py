@@ -0,0 +1,148 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, FrozenSet
+
+import numpy as np
+
+from app.core.config import settings
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Words that change which answer is right while barely moving a question's embedding:
+# who it is about, which numbers (sections, days, amounts) and whether it is negated.
+PARTY_WORDS = {
+    "party", "parties", "supplier", "customer", "client", "vendor", "buyer", "seller", "purchaser",
+    "licensor", "licensee", "employer", "employee", "contractor", "consultant", "provider",
+    "landlord", "tenant", "lessor", "lessee", "discloser", "recipient", "company", "contractors",
+}
+NUMBER_WORDS = {
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+    "fifteen", "twenty", "thirty", "forty", "forty-five", "sixty", "ninety", "hundred", "thousand", "million",
+    "first", "second", "third", "last",
+}
+NEGATION_WORDS = {"not", "no", "never", "without", "cannot", "nor", "neither"}
+KEY_TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)*|[A-Za-z][\w-]*(?:'t)?")
+
+
+def question_key(question: str) -> FrozenSet[str]:
+    """
+    The terms two questions must share for one's answer to serve the other: party
+    roles, numbers, negations and capitalized names ("Acme"), lowercased. The
+    question's first word is capitalized anyway and not a name.
+    """
+    key = set()
+    for position, token in enumerate(KEY_TOKEN_PATTERN.findall(question)):
+        word = token.lower()
+        if word.endswith("n't"):
+            key.add("not")
+        elif word[0].isdigit() or word in PARTY_WORDS or word in NUMBER_WORDS or word in NEGATION_WORDS:
+            key.add(word)
+        elif position > 0 and token[0].isupper():
+            key.add(word)
+    return frozenset(key)
+
+
+class AnswerCache:
+    """
+    Per-document semantic cache of Q&A answers.
+
+    Each document keeps the embeddings of the questions asked about it as one matrix, so
+    a lookup is a single matrix-vector product. A question gets a cached question's
+    answer if their cosine similarity is at least `threshold` and they have the same
+    `question_key`, so "...terminated by the Supplier?" never gets the answer about the
+    Customer. Entries are tied to the document's content hash and dropped as soon as the
+    text changes; the least recently used documents beyond `max_documents` are dropped.
+    """
+
+    def __init__(self, threshold: float = settings.QA_CACHE_THRESHOLD,
+                 max_entries_per_document: int = settings.QA_CACHE_MAX_ENTRIES,
+                 max_documents: int = settings.QA_CACHE_MAX_DOCUMENTS):
+        self.threshold = threshold
+        self.max_entries_per_document = max_entries_per_document
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _document(self, doc_id: str, text_hash: str) -> Dict[str, Any]:
+        """Returns the document's entries, discarding them if its content has changed."""
+        document = self._documents.get(doc_id)
+        if document is not None and document["content_hash"] != text_hash:
+            self.invalidations += 1
+            document = None
+        if document is None:
+            document = {"content_hash": text_hash, "vectors": None, "entries": []}
+            self._documents[doc_id] = document
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        self._documents.move_to_end(doc_id)
+        return document
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, doc_id: str, text_hash: str, question: str, question_vector) -> Optional[Dict[str, Any]]:
+        """
+        Finds the cached answer to the most similar earlier question with the same key.
+
+        Returns:
+            The cached entry ('question', 'answer', 'citations') plus its 'similarity',
+            or None if no earlier question is similar enough.
+        """
+        key = question_key(question)
+        with self._lock:
+            document = self._document(doc_id, text_hash)
+            if document["vectors"] is not None:
+                similarities = document["vectors"] @ self._normalize(question_vector)
+                similarities[[entry["key"] != key for entry in document["entries"]]] = -1.0
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    return {**document["entries"][best], "similarity": round(float(similarities[best]), 4)}
+            self.misses += 1
+            return None
+
+    def store(self, doc_id: str, text_hash: str, question: str, question_vector,
+              answer: str, citations: List[Dict]) -> None:
+        """Caches an answer, evicting the document's oldest entry when it is full."""
+        with self._lock:
+            document = self._document(doc_id, text_hash)
+            vector = self._normalize(question_vector)[None, :]
+            entry = {"question": question, "key": question_key(question), "answer": answer, "citations": citations}
+            if document["vectors"] is None:
+                document["vectors"], document["entries"] = vector, [entry]
+            else:
+                document["vectors"] = np.vstack([document["vectors"], vector])[-self.max_entries_per_document:]
+                document["entries"] = (document["entries"] + [entry])[-self.max_entries_per_document:]
+
+    def invalidate(self, doc_id: str) -> None:
+        with self._lock:
+            if self._documents.pop(doc_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "documents": len(self._documents),
+                "max_documents": self.max_documents,
+                "entries": sum(len(d["entries"]) for d in self._documents.values()),
+                "threshold": self.threshold
+            }
+
+
+answer_cache = AnswerCache()
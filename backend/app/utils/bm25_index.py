@@ -0,0 +1,115 @@
+import math
+import re
+import threading
+from typing import List, Dict, Optional, Tuple
+
+# Dotted clause numbers ("12.3", "4.2.1") stay one token so "Section 12.3" matches exactly.
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|\w+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "with", "what", "which", "who",
+    "does", "do", "how", "any", "there", "if", "when",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords; dotted clause numbers are kept whole."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring over document chunks.
+
+    Postings map a term to {chunk id: term frequency}, so a query term costs one dict
+    lookup plus a pass over its postings. Chunks can be added and removed one at a time,
+    which keeps the index in step with incremental vector indexing.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.chunks: Dict[str, Tuple[str, Dict]] = {}  # chunk id -> (content, metadata)
+        self.doc_chunks: Dict[str, set] = {}  # doc id -> chunk ids
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, chunk_id: str, content: str, metadata: Dict) -> None:
+        """Adds (or replaces) a chunk."""
+        with self._lock:
+            if chunk_id in self.lengths:
+                self.remove(chunk_id)
+            tokens = tokenize(content)
+            for token in tokens:
+                postings = self.postings.setdefault(token, {})
+                postings[chunk_id] = postings.get(chunk_id, 0) + 1
+            self.lengths[chunk_id] = len(tokens)
+            self.total_length += len(tokens)
+            self.chunks[chunk_id] = (content, metadata)
+            self.doc_chunks.setdefault(metadata.get("doc_id"), set()).add(chunk_id)
+
+    def remove(self, chunk_id: str) -> None:
+        with self._lock:
+            if chunk_id not in self.lengths:
+                return
+            content, metadata = self.chunks.pop(chunk_id)
+            for token in set(tokenize(content)):
+                postings = self.postings.get(token)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[token]
+            self.total_length -= self.lengths.pop(chunk_id)
+            self.doc_chunks.get(metadata.get("doc_id"), set()).discard(chunk_id)
+
+    def update_metadata(self, chunk_id: str, metadata: Dict) -> None:
+        """Refreshes a chunk's metadata (e.g. its position) without re-tokenizing it."""
+        with self._lock:
+            if chunk_id in self.chunks:
+                self.chunks[chunk_id] = (self.chunks[chunk_id][0], metadata)
+
+    def search(self, query: str, k: int = 5, doc_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Scores chunks against the query with BM25.
+
+        Returns:
+            Up to k (chunk id, score) pairs, best first. Restricted to one document if
+            `doc_id` is given.
+        """
+        with self._lock:
+            n = len(self.lengths)
+            if n == 0:
+                return []
+            allowed = self.doc_chunks.get(doc_id, set()) if doc_id is not None else None
+            average_length = self.total_length / n
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                if allowed is None:
+                    matches = postings.items()
+                elif len(allowed) < len(postings):
+                    matches = ((c, postings[c]) for c in allowed if c in postings)
+                else:
+                    matches = ((c, tf) for c, tf in postings.items() if c in allowed)
+                for chunk_id, tf in matches:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuses several ranked id lists: each id scores the sum of 1 / (k + rank) over the lists."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,250 @@
+import hashlib
+import time
+from typing import List, Dict, Any, Callable, Iterator, Optional
+
+import numpy as np
+
+# --- 1. HELPERS ---
+
+def clause_hash(text: str) -> str:
+    """Hash of a clause's text, ignoring case and whitespace differences."""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def normalize_clause_number(number: Optional[str]) -> str:
+    """'1.1.' and '1.1' (or '(a)' and 'a') refer to the same clause number."""
+    return (number or "").strip().strip("().").lower()
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_similarity_matrix(embeddings_a, embeddings_b) -> np.ndarray:
+    """Cosine similarity between every row of A and every row of B."""
+    a = _normalize_rows(np.asarray(embeddings_a, dtype=np.float32))
+    b = _normalize_rows(np.asarray(embeddings_b, dtype=np.float32))
+    return a @ b.T
+
+
+def _solve_assignment(similarity: np.ndarray, threshold: float) -> List[tuple]:
+    """
+    Globally optimal one-to-one assignment (Hungarian algorithm). Like the monotone
+    solver, it maximizes the total of `similarity - threshold` over pairs above the
+    threshold, so weak pairs can't outvote a strong one they would later be dropped for.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    rows, cols = linear_sum_assignment(np.maximum(similarity - threshold, 0), maximize=True)
+    return [(r, c) for r, c in zip(rows, cols) if similarity[r, c] >= threshold]
+
+
+def _solve_monotone(similarity: np.ndarray, threshold: float) -> List[tuple]:
+    """
+    Order-preserving alignment (Needleman-Wunsch with free gaps). Each matched pair
+    scores `similarity - threshold`, so only pairs above the threshold are ever taken.
+    Rows are filled with a vectorized prefix maximum instead of a Python inner loop.
+    """
+    n, m = similarity.shape
+    weights = np.where(similarity >= threshold, similarity - threshold, -np.inf)
+    dp = np.zeros((n + 1, m + 1), dtype=np.float64)
+    for i in range(1, n + 1):
+        candidates = np.maximum(dp[i - 1, 1:], dp[i - 1, :-1] + weights[i - 1])
+        dp[i, 1:] = np.maximum.accumulate(candidates)
+
+    pairs = []
+    i, j = n, m
+    while i > 0 and j > 0:
+        if dp[i, j] == dp[i, j - 1]:
+            j -= 1
+        elif dp[i, j] == dp[i - 1, j]:
+            i -= 1
+        else:
+            pairs.append((i - 1, j - 1))
+            i -= 1
+            j -= 1
+    pairs.reverse()
+    return pairs
+
+
+SOLVERS = {
+    "assignment": _solve_assignment,
+    "monotone": _solve_monotone,
+}
+
+
+# --- 2. THE ALIGNMENT ENGINE ---
+
+def _hash_match(clauses_a: List[Dict], clauses_b: List[Dict]) -> tuple:
+    """Pairs exact duplicates by text hash, pairing repeats in document order."""
+    b_by_hash: Dict[str, List[int]] = {}
+    for j, clause in enumerate(clauses_b):
+        b_by_hash.setdefault(clause_hash(clause["content"]), []).append(j)
+    pairs, remaining_a, matched_b = [], [], set()
+    for i, clause in enumerate(clauses_a):
+        candidates = b_by_hash.get(clause_hash(clause["content"]))
+        if candidates:
+            j = candidates.pop(0)
+            matched_b.add(j)
+            pairs.append({"index_a": i, "index_b": j, "score": 1.0, "status": "identical"})
+        else:
+            remaining_a.append(i)
+    remaining_b = [j for j in range(len(clauses_b)) if j not in matched_b]
+    return pairs, remaining_a, remaining_b
+
+
+def _align_remaining(
+    clauses_a: List[Dict],
+    clauses_b: List[Dict],
+    remaining_a: List[int],
+    remaining_b: List[int],
+    similarity: np.ndarray,
+    pairs: List[Dict[str, Any]],
+    stats: Dict[str, Any],
+    identical_threshold: float,
+    modified_threshold: float,
+    method: str,
+) -> None:
+    """Clause-number blocking, then the global solver, over a precomputed similarity matrix."""
+    def add_pair(row: int, col: int, stage: str):
+        score = float(similarity[row, col])
+        pairs.append({
+            "index_a": remaining_a[row],
+            "index_b": remaining_b[col],
+            "score": score,
+            "status": "identical" if score > identical_threshold else "modified"
+        })
+        stats[stage] += 1
+
+    # 1. Clause-number blocking: same number and mutual best match above the threshold.
+    best_for_row = similarity.argmax(axis=1)
+    best_for_col = similarity.argmax(axis=0)
+    blocked_rows, blocked_cols = set(), set()
+    for row, i in enumerate(remaining_a):
+        col = int(best_for_row[row])
+        same_number = (
+            normalize_clause_number(clauses_a[i].get("clause_number"))
+            == normalize_clause_number(clauses_b[remaining_b[col]].get("clause_number"))
+        )
+        if same_number and best_for_col[col] == row and similarity[row, col] >= modified_threshold:
+            add_pair(row, col, "block_matches")
+            blocked_rows.add(row)
+            blocked_cols.add(col)
+
+    # 2. Solve the rest globally.
+    rows = [r for r in range(len(remaining_a)) if r not in blocked_rows]
+    cols = [c for c in range(len(remaining_b)) if c not in blocked_cols]
+    if rows and cols:
+        sub_matrix = similarity[np.ix_(rows, cols)]
+        for r, c in SOLVERS[method](sub_matrix, modified_threshold):
+            add_pair(rows[r], cols[c], "solver_matches")
+
+
+def _finish(clauses_a: List[Dict], clauses_b: List[Dict], pairs: List[Dict], stats: Dict, start: float) -> Dict[str, Any]:
+    pairs.sort(key=lambda p: p["index_a"])
+    paired_a = {p["index_a"] for p in pairs}
+    paired_b = {p["index_b"] for p in pairs}
+    stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return {
+        "pairs": pairs,
+        "removed": [i for i in range(len(clauses_a)) if i not in paired_a],
+        "added": [j for j in range(len(clauses_b)) if j not in paired_b],
+        "stats": stats
+    }
+
+
+def align_clauses(
+    clauses_a: List[Dict],
+    clauses_b: List[Dict],
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    identical_threshold: float = 0.98,
+    modified_threshold: float = 0.75,
+    method: str = "assignment",
+) -> Dict[str, Any]:
+    """
+    Aligns the clauses of two documents in three stages:
+      1. Exact duplicates (by normalized text hash) are paired without any embedding.
+      2. Clauses sharing a clause number are paired when they are each other's best match.
+      3. The rest is solved globally ('assignment') or as an order-preserving
+         sequence alignment ('monotone') over the similarity matrix.
+
+    Args:
+        clauses_a, clauses_b: Clauses as returned by `extract_clauses`.
+        embed_fn: Embeds a list of texts (e.g. `embedding_model.embed_documents`).
+        method: 'assignment' or 'monotone'.
+
+    Returns:
+        A dict with 'pairs' (dicts with 'index_a', 'index_b', 'score' and a 'status' of
+        'identical' or 'modified'), the unmatched 'removed' (A) and 'added' (B) indexes,
+        and 'stats' for the stages.
+    """
+    start = time.perf_counter()
+    if method not in SOLVERS:
+        raise ValueError(f"Unknown alignment method '{method}'. Use one of {list(SOLVERS)}.")
+
+    pairs, remaining_a, remaining_b = _hash_match(clauses_a, clauses_b)
+    stats = {"hash_matches": len(pairs), "block_matches": 0, "solver_matches": 0, "embedded_clauses": 0}
+
+    # Embed only the clauses that still need a similarity score.
+    if remaining_a and remaining_b:
+        texts = [clauses_a[i]["content"] for i in remaining_a] + [clauses_b[j]["content"] for j in remaining_b]
+        embeddings = np.asarray(embed_fn(texts), dtype=np.float32)
+        stats["embedded_clauses"] = len(texts)
+        similarity = cosine_similarity_matrix(embeddings[:len(remaining_a)], embeddings[len(remaining_a):])
+        _align_remaining(clauses_a, clauses_b, remaining_a, remaining_b, similarity, pairs, stats,
+                         identical_threshold, modified_threshold, method)
+
+    return _finish(clauses_a, clauses_b, pairs, stats, start)
+
+
+def align_clauses_many(
+    base_clauses: List[Dict],
+    versions: List[List[Dict]],
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    identical_threshold: float = 0.98,
+    modified_threshold: float = 0.75,
+    method: str = "assignment",
+) -> Iterator[Dict[str, Any]]:
+    """
+    Aligns one base document against many versions of it.
+
+    Base clauses are embedded once and every version's unmatched clauses are embedded
+    in a single batch, so one matrix product gives the similarities for all versions.
+    Yields one alignment per version (same shape as `align_clauses`), in order.
+    """
+    start = time.perf_counter()
+    if method not in SOLVERS:
+        raise ValueError(f"Unknown alignment method '{method}'. Use one of {list(SOLVERS)}.")
+
+    # 1. Hash-match every version first, so identical clauses are never embedded.
+    matched = [_hash_match(base_clauses, clauses) for clauses in versions]
+
+    # 2. One embedding batch for the base clauses any version still needs, plus all
+    # unmatched version clauses, then one vectorized similarity pass.
+    base_rows = sorted({i for _, remaining_a, _ in matched for i in remaining_a})
+    base_position = {i: n for n, i in enumerate(base_rows)}
+    version_offsets, texts = [], [base_clauses[i]["content"] for i in base_rows]
+    for clauses, (_, _, remaining_b) in zip(versions, matched):
+        version_offsets.append(len(texts) - len(base_rows))
+        texts.extend(clauses[j]["content"] for j in remaining_b)
+
+    similarity = None
+    if base_rows and len(texts) > len(base_rows):
+        embeddings = np.asarray(embed_fn(texts), dtype=np.float32)
+        similarity = cosine_similarity_matrix(embeddings[:len(base_rows)], embeddings[len(base_rows):])
+    shared_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    # 3. Slice each version's block out of the shared matrix and solve it.
+    for clauses, (pairs, remaining_a, remaining_b), offset in zip(versions, matched, version_offsets):
+        version_start = time.perf_counter()
+        stats = {"hash_matches": len(pairs), "block_matches": 0, "solver_matches": 0,
+                 "embedded_clauses": len(remaining_b), "shared_embedding_ms": shared_ms}
+        if remaining_a and remaining_b and similarity is not None:
+            rows = [base_position[i] for i in remaining_a]
+            block = similarity[rows, offset:offset + len(remaining_b)]
+            _align_remaining(base_clauses, clauses, remaining_a, remaining_b, block, pairs, stats,
+                             identical_threshold, modified_threshold, method)
+        yield _finish(base_clauses, clauses, pairs, stats, version_start)
@@ -0,0 +1,57 @@
+import re
+from typing import List, Dict
+
+# --- 1. CLAUSE CATEGORIES ---
+# The same categories the parser agent's LLM classifies into, recognised here from
+# keywords so clauses can be labelled at upload time without an LLM call. The clause
+# heading (e.g. "10.1 Governing Law.") is weighted above the body.
+
+CLAUSE_CATEGORIES = [
+    {'category': 'Payment Terms', 'keywords': ['payment', 'fee', 'invoice', 'price', 'salary', 'compensation', 'refund', 'expense']},
+    {'category': 'Intellectual Property', 'keywords': ['intellectual property', 'copyright', 'patent', 'trademark', 'invention', 'license', 'work made for hire', 'ownership']},
+    {'category': 'Confidentiality', 'keywords': ['confidential', 'non-disclosure', 'nondisclosure', 'trade secret', 'proprietary information']},
+    {'category': 'Termination', 'keywords': ['terminat', 'expiration', 'renewal', 'notice of non-renewal', 'survival']},
+    {'category': 'Liability', 'keywords': ['liab', 'indemn', 'damages', 'warrant', 'hold harmless', 'disclaim']},
+    {'category': 'Dispute Resolution', 'keywords': ['dispute', 'arbitration', 'governing law', 'jurisdiction', 'venue', 'mediation', 'court']},
+    {'category': 'General Provisions', 'keywords': ['entire agreement', 'severab', 'waiver', 'assignment', 'notices', 'counterparts', 'amendment', 'force majeure', 'independent contractor']},
+]
+
+# Contract types recognised from the title, checked in order
+DOCUMENT_TYPES = [
+    {'document_type': 'nda', 'pattern': r'non[- ]?disclosure|confidentiality agreement|\bnda\b'},
+    {'document_type': 'employment', 'pattern': r'employment agreement|offer letter|employment contract'},
+    {'document_type': 'saas', 'pattern': r'software as a service|\bsaas\b|subscription agreement'},
+    {'document_type': 'services', 'pattern': r'(?:master )?services? agreement|statement of work|consulting agreement'},
+    {'document_type': 'license', 'pattern': r'licen[cs]e agreement'},
+    {'document_type': 'lease', 'pattern': r'lease agreement|tenancy'},
+    {'document_type': 'purchase', 'pattern': r'purchase agreement|supply agreement|sale of goods'},
+]
+
+HEADING_PATTERN = re.compile(r'^\s*([A-Z][^.:\n]{2,60})[.:]')
+
+
+def categorize_clause(text: str) -> str:
+    """Returns the clause's category, or 'Other' if no category's keywords appear."""
+    lowered = text.lower()
+    heading_match = HEADING_PATTERN.match(text)
+    heading = heading_match.group(1).lower() if heading_match else ''
+    best, best_score = 'Other', 0
+    for entry in CLAUSE_CATEGORIES:
+        score = sum(3 * (keyword in heading) + lowered.count(keyword) for keyword in entry['keywords'])
+        if score > best_score:
+            best, best_score = entry['category'], score
+    return best
+
+
+def detect_document_type(text: str) -> str:
+    """Guesses the contract type from its opening lines; 'other' if unrecognised."""
+    opening = text[:1000].lower()
+    for entry in DOCUMENT_TYPES:
+        if re.search(entry['pattern'], opening):
+            return entry['document_type']
+    return 'other'
+
+
+def categorize_clauses(clauses: List[Dict]) -> List[Dict]:
+    """Adds a 'category' to each clause returned by `extract_clauses`."""
+    return [{**clause, 'category': categorize_clause(clause['content'])} for clause in clauses]
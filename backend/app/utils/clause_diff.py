@@ -0,0 +1,159 @@
+import logging
+import re
+from difflib import SequenceMatcher
+from typing import Callable, List, Dict
+
+from app.core.registry import registry
+
+logger = logging.getLogger(__name__)
+
+# Dotted clause numbers ("4.2.1") stay a single token; everything else is words or punctuation.
+TOKEN_PATTERN = re.compile(r'\d+(?:\.\d+)+\.?|\w+|[^\w\s]')
+REFERENCE_WORDS = {'section', 'sections', 'clause', 'clauses', 'article', 'articles',
+                   'schedule', 'exhibit', 'annex', 'appendix', 'paragraph', 'paragraphs', '§'}
+CLAUSE_NUMBER_PATTERN = re.compile(r'^(?:\d+(?:\.\d+)+\.?|\d+|[ivxlc]+|[a-z])$', re.IGNORECASE)
+# A number next to one of these is an amount, a rate or a period, never a clause number
+AMOUNT_MARKERS = {'$', '€', '£', '¥', '%', 'usd', 'eur', 'gbp', 'percent', 'per', 'times', 'x',
+                  'hundred', 'thousand', 'million', 'billion', 'hours', 'days', 'weeks', 'months', 'years',
+                  'hour', 'day', 'week', 'month', 'year', 'business', 'calendar', 'working'}
+
+TRIVIAL_KINDS = {'whitespace', 'case', 'punctuation', 'numbering', 'typo'}
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text)
+
+
+def word_diff(text_a: str, text_b: str) -> List[Dict[str, str]]:
+    """
+    Word-level diff of two clause versions.
+
+    Returns:
+        A list of hunks, each a dict with 'op' ('replace', 'delete' or 'insert'),
+        and the affected 'text_a' and 'text_b'.
+    """
+    tokens_a, tokens_b = tokenize(text_a), tokenize(text_b)
+    matcher = SequenceMatcher(None, tokens_a, tokens_b, autojunk=False)
+    return [
+        {'op': op, 'text_a': ' '.join(tokens_a[i1:i2]), 'text_b': ' '.join(tokens_b[j1:j2])}
+        for op, i1, i2, j1, j2 in matcher.get_opcodes()
+        if op != 'equal'
+    ]
+
+
+def _load_english_words() -> Callable[[str], bool]:
+    """
+    Whether a lowercase word is a known English word or inflection, from spaCy's lemma
+    tables (spacy[lookups]). Without them, every word counts as known, so no edit is
+    taken for a typo.
+    """
+    try:
+        from spacy.lookups import load_lookups
+        from spacy.lang.en.stop_words import STOP_WORDS
+
+        lookups = load_lookups("en", ["lemma_lookup", "lemma_index"])
+    except Exception as e:
+        logger.warning(f"No English word list ({type(e).__name__}); typo detection is off.")
+        return lambda word: True
+    inflections = lookups.get_table("lemma_lookup")
+    lemmas = {lemma for group in lookups.get_table("lemma_index").values() for lemma in group}
+    return lambda word: word in lemmas or word in inflections or word in STOP_WORDS or word == "shall"
+
+
+registry.register("english_words", _load_english_words)
+
+
+def _is_single_letter_slip(word_a: str, word_b: str) -> bool:
+    """One inserted, deleted or transposed letter (substitutions can change meaning)."""
+    if min(len(word_a), len(word_b)) < 5 or not (word_a.isalpha() and word_b.isalpha()):
+        return False
+    if abs(len(word_a) - len(word_b)) == 1:
+        shorter, longer = sorted((word_a, word_b), key=len)
+        return any(longer[:k] + longer[k + 1:] == shorter for k in range(len(longer)))
+    if len(word_a) == len(word_b):
+        diffs = [k for k in range(len(word_a)) if word_a[k] != word_b[k]]
+        return (
+            len(diffs) == 2 and diffs[1] == diffs[0] + 1
+            and word_a[diffs[0]] == word_b[diffs[1]] and word_a[diffs[1]] == word_b[diffs[0]]
+        )
+    return False
+
+
+def _is_typo(word_a: str, word_b: str) -> bool:
+    """
+    A single-letter slip that can't change the meaning: not a plural or singular
+    ("Licensor" -> "Licensors" changes who is bound), and one side is not a word at
+    all, so it is a misspelling rather than another word ("trial" -> "trail").
+    """
+    if not _is_single_letter_slip(word_a, word_b):
+        return False
+    shorter, longer = sorted((word_a, word_b), key=len)
+    if longer in (shorter + 's', shorter + 'es'):
+        return False
+    is_word = registry.get("english_words")
+    return not (is_word(word_a) and is_word(word_b))
+
+
+def _is_clause_number(tokens: List[str], k: int) -> bool:
+    """
+    True if tokens[k] numbers the clause ("4.2 The Supplier...", "(b) ...") or is a
+    cross-reference ("Section 4.2", "§ 7"). "$1.50", "1.5%" or "2.0 times" are amounts.
+    """
+    if not CLAUSE_NUMBER_PATTERN.match(tokens[k]):
+        return False
+    before = tokens[k - 1].lower() if k > 0 else ''
+    after = tokens[k + 1].lower() if k + 1 < len(tokens) else ''
+    if before in AMOUNT_MARKERS or after in AMOUNT_MARKERS:
+        return False
+    if before in REFERENCE_WORDS:
+        return True
+    opens_clause = not any(re.match(r'\w', t) for t in tokens[:k])
+    return opens_clause and ('.' in tokens[k] or after in ('.', ')'))
+
+
+def _is_numbering_change(tokens_a: List[str], tokens_b: List[str]) -> bool:
+    """
+    True if every changed word is a clause number or a cross-reference number.
+    Punctuation is ignored, so a renumbering that also moves a comma still counts.
+    """
+    positions_a = [k for k, t in enumerate(tokens_a) if re.match(r'\w', t)]
+    positions_b = [k for k, t in enumerate(tokens_b) if re.match(r'\w', t)]
+    matcher = SequenceMatcher(None, [tokens_a[k] for k in positions_a], [tokens_b[k] for k in positions_b],
+                              autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        if not all(_is_clause_number(tokens_a, k) for k in positions_a[i1:i2]):
+            return False
+        if not all(_is_clause_number(tokens_b, k) for k in positions_b[j1:j2]):
+            return False
+    return True
+
+
+def classify_edit(text_a: str, text_b: str) -> str:
+    """
+    Classifies the edit between two versions of a clause.
+
+    Returns:
+        One of 'whitespace', 'case', 'punctuation', 'numbering', 'typo' (all trivial,
+        see TRIVIAL_KINDS) or 'substantive'.
+    """
+    if text_a.split() == text_b.split():
+        return 'whitespace'
+    if text_a.lower().split() == text_b.lower().split():
+        return 'case'
+
+    tokens_a, tokens_b = tokenize(text_a), tokenize(text_b)
+    words_a = [t for t in tokens_a if re.match(r'\w', t)]
+    words_b = [t for t in tokens_b if re.match(r'\w', t)]
+    if [w.lower() for w in words_a] == [w.lower() for w in words_b]:
+        return 'punctuation'
+    if _is_numbering_change(tokens_a, tokens_b):
+        return 'numbering'
+
+    hunks = word_diff(text_a, text_b)
+    if len(hunks) == 1 and hunks[0]['op'] == 'replace':
+        word_a, word_b = hunks[0]['text_a'].lower(), hunks[0]['text_b'].lower()
+        if ' ' not in word_a and ' ' not in word_b and _is_typo(word_a, word_b):
+            return 'typo'
+    return 'substantive'
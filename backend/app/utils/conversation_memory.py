@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.prompt_budget import count_tokens, truncate_to_tokens
+
+# Folds older turns into the running summary: (summary, turns) -> new summary
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+
+class ConversationMemory:
+    """
+    Server-side Q&A history per (document, session).
+
+    The most recent turns are kept verbatim as long as they fit in `window_tokens`; older
+    turns are folded into a rolling summary capped at `summary_tokens`. The history that
+    goes into a prompt is therefore bounded however long the conversation runs.
+    """
+
+    def __init__(self, window_tokens: int = settings.QA_HISTORY_TOKENS,
+                 summary_tokens: int = settings.QA_SUMMARY_TOKENS,
+                 max_sessions: int = settings.QA_MAX_SESSIONS):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def history(self, doc_id: str, session_id: str) -> Dict[str, Any]:
+        """Returns the session's 'summary' and verbatim 'turns' (oldest first)."""
+        with self._lock:
+            session = self._sessions.get((doc_id, session_id))
+            if session is None:
+                return {"summary": "", "turns": []}
+            self._sessions.move_to_end((doc_id, session_id))
+            return {"summary": session["summary"], "turns": list(session["turns"])}
+
+    def add_turn(self, doc_id: str, session_id: str, question: str, answer: str,
+                 summarize: Optional[Summarizer] = None) -> Dict[str, Any]:
+        """
+        Records a question/answer pair. Turns that no longer fit in the window are
+        folded into the summary with `summarize` (or dropped if none is given).
+        """
+        with self._lock:
+            key = (doc_id, session_id)
+            session = self._sessions.setdefault(key, {"summary": "", "turns": []})
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+            # Each side of an exchange gets at most half the window, so one exchange always fits
+            session["turns"].extend([
+                {"role": "user", "content": truncate_to_tokens(question, self.window_tokens // 2)},
+                {"role": "assistant", "content": truncate_to_tokens(answer, self.window_tokens // 2)},
+            ])
+            overflow = []
+            while len(session["turns"]) > 2 and self._turn_tokens(session["turns"]) > self.window_tokens:
+                overflow.extend(session["turns"][:2])
+                session["turns"] = session["turns"][2:]
+            summary, turns = session["summary"], list(session["turns"])
+
+        if overflow and summarize is not None:
+            # Summarize outside the lock; the LLM call can take a while
+            summary = truncate_to_tokens(summarize(summary, overflow), self.summary_tokens)
+            with self._lock:
+                if key in self._sessions:
+                    self._sessions[key]["summary"] = summary
+        return {"summary": summary, "turns": turns}
+
+    @staticmethod
+    def _turn_tokens(turns: List[Dict[str, str]]) -> int:
+        return sum(count_tokens(t["content"]) for t in turns)
+
+    def clear(self, doc_id: str, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop((doc_id, session_id), None)
+
+
+def format_history(summary: str, turns: List[Dict[str, str]]) -> str:
+    """Renders a session's history for a prompt."""
+    lines = []
+    if summary:
+        lines.append(f"Summary of earlier discussion: {summary}")
+    for turn in turns:
+        lines.append(f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}")
+    return "\n".join(lines)
+
+
+conversation_memory = ConversationMemory()
@@ -2,11 +2,19 @@ import re
 from typing import List, Dict, Any
 import docx
 from PyPDF2 import PdfReader
-import spacy
 
-# Load the spaCy model once when the module is loaded
-# This is more efficient than loading it in the function every time.
-nlp = spacy.load("en_core_web_sm")
+from app.core.registry import registry
+from app.utils.clause_categories import categorize_clauses
+
+# Load the spaCy model once, on first use (it takes seconds, and only entity
+# extraction needs it), rather than every time or at import.
+def _load_spacy_model():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+
+registry.register("nlp", _load_spacy_model)
+
 
 def parse_docx(file_path: str) -> List[Dict[str, str]]:
     """
@@ -75,6 +83,15 @@ def parse_document(file_path: str) -> Any:
         raise ValueError("Unsupported file type. Please use .docx or .pdf")
     
 
+def load_document_text(file_path: str) -> str:
+    """
+    Parses a document and returns its full text, one paragraph per line.
+    """
+    parsed_content = parse_document(file_path)
+    if isinstance(parsed_content, list):  # It's a DOCX
+        return "\n".join(p['text'] for p in parsed_content)
+    return parsed_content
+
 def clean_text(text: str) -> str:
     """
     Cleans raw text by removing excessive whitespace and normalizing line breaks.
@@ -126,12 +143,20 @@ def extract_clauses(full_text: str) -> List[Dict[str, Any]]:
         
     return clauses
 
+def extract_searchable_clauses(full_text: str, min_words: int = 5) -> List[Dict[str, Any]]:
+    """
+    Extracts the clauses worth indexing for search, each with its category. Bare
+    section headings ("DEFINITIONS") are dropped.
+    """
+    clauses = [c for c in extract_clauses(full_text) if len(c["content"].split()) >= min_words]
+    return categorize_clauses(clauses)
+
 def extract_entities(text: str) -> Dict[str, List[str]]:
     """
     Extracts named entities (like organizations, dates, money) from text using spaCy.
     
     """
-    doc = nlp(text)
+    doc = registry.get("nlp")(text)
     entities = {
         "organizations": [],
         "dates": [],
@@ -0,0 +1,134 @@
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from app.core.config import settings
+
+# Paragraphs are joined with plain newlines; app.utils.text_index counts paragraphs the
+# same way, so the paragraph indexes in locations are the add-in's paragraph indexes.
+PARAGRAPH_SEPARATOR = "\n"
+
+
+class VersionConflict(Exception):
+    """An edit was made against a version other than the session's current one."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"The document session is at version {current_version}.")
+        self.current_version = current_version
+
+
+class DocumentSession:
+    """A document's current paragraphs, at a version bumped by every batch of edits."""
+
+    def __init__(self, session_id: str, paragraphs: List[str]):
+        self.id = session_id
+        self.version = 1
+        self.paragraphs = list(paragraphs)
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = PARAGRAPH_SEPARATOR.join(self.paragraphs)
+        return self._text
+
+    def apply(self, operations: List[Dict[str, Any]]) -> None:
+        """
+        Applies paragraph operations in order, each against the paragraphs as the
+        previous ones left them. All or nothing: an invalid operation changes nothing.
+
+            {"op": "insert", "index": i, "paragraphs": [...]}   before paragraph i (i may be the count)
+            {"op": "update", "index": i, "text": "..."}
+            {"op": "delete", "index": i, "count": n}
+        """
+        paragraphs = list(self.paragraphs)
+        for n, operation in enumerate(operations):
+            op, index = operation.get("op"), operation.get("index")
+            if not isinstance(index, int) or index < 0:
+                raise ValueError(f"Operation {n}: 'index' must be a non-negative integer.")
+            if op == "insert":
+                if index > len(paragraphs):
+                    raise ValueError(f"Operation {n}: cannot insert at {index}, the document has {len(paragraphs)} paragraphs.")
+                paragraphs[index:index] = [str(p) for p in operation.get("paragraphs") or []]
+            elif op == "update":
+                if index >= len(paragraphs) or operation.get("text") is None:
+                    raise ValueError(f"Operation {n}: no paragraph {index} to update, or no 'text'.")
+                paragraphs[index] = str(operation["text"])
+            elif op == "delete":
+                count = operation.get("count", 1)
+                if not isinstance(count, int) or count < 1 or index + count > len(paragraphs):
+                    raise ValueError(f"Operation {n}: cannot delete {count} paragraphs at {index}.")
+                del paragraphs[index:index + count]
+            else:
+                raise ValueError(f"Operation {n}: unknown op '{op}'. Use 'insert', 'update' or 'delete'.")
+        self.paragraphs = paragraphs
+        self._text = None
+        self.version += 1
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "version": self.version,
+            "paragraphs": len(self.paragraphs),
+            "characters": len(self.text)
+        }
+
+
+class DocumentSessionStore:
+    """
+    Documents the Word add-in keeps in sync by paragraph edits instead of re-sending
+    their full text with every request. The least recently used sessions beyond
+    `max_sessions` are dropped; clients then start a new one.
+    """
+
+    def __init__(self, max_sessions: int = settings.DOCUMENT_SESSIONS_MAX):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, DocumentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, paragraphs: List[str]) -> Dict[str, Any]:
+        session = DocumentSession(uuid.uuid4().hex, paragraphs)
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session.describe()
+
+    def apply(self, session_id: str, base_version: int, operations: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Applies edits made against `base_version`; None if there is no such session."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            if base_version != session.version:
+                raise VersionConflict(session.version)
+            session.apply(operations)
+            return session.describe()
+
+    def text(self, session_id: str, version: Optional[int] = None) -> Optional[str]:
+        """
+        The session's current text (checked to be at `version`, if given); None if there
+        is no such session.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            if version is not None and version != session.version:
+                raise VersionConflict(session.version)
+            return session.text
+
+    def describe(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.describe() if session else None
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+document_sessions = DocumentSessionStore()
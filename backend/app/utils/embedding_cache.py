@@ -0,0 +1,208 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+from typing import List, Dict, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+
+class EmbeddingCache:
+    """
+    A persistent, content-addressed embedding cache.
+
+    Vectors are appended to one float32 matrix file per model and read back through a
+    memory map; a SQLite index maps (model, sha256(text)) to a row of that matrix.
+    Writers are serialized by SQLite's write lock, so several processes can share it.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"),
+            check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER NOT NULL, file TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, key TEXT NOT NULL, row INTEGER NOT NULL, PRIMARY KEY (model, key))"
+        )
+        self._lock = threading.Lock()
+        self._matrices: Dict[str, np.memmap] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _model_info(self, model: str) -> Optional[tuple]:
+        return self._conn.execute("SELECT dim, file FROM models WHERE model = ?", (model,)).fetchone()
+
+    def _matrix(self, model: str, dim: int, file: str, min_rows: int) -> np.memmap:
+        """Returns the memory-mapped matrix for a model, remapping it if it has grown."""
+        matrix = self._matrices.get(model)
+        if matrix is None or matrix.shape[0] < min_rows:
+            path = os.path.join(self.directory, file)
+            rows = os.path.getsize(path) // (dim * 4)
+            matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+            self._matrices[model] = matrix
+        return matrix
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Looks up texts; returns a vector per text, or None for a cache miss."""
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        with self._lock:
+            info = self._model_info(model)
+            if info is None:
+                self.misses += len(texts)
+                return results
+            dim, file = info
+
+            keys = [self.key(t) for t in texts]
+            rows: Dict[str, int] = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.update(self._conn.execute(
+                    f"SELECT key, row FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall())
+
+            if rows:
+                matrix = self._matrix(model, dim, file, max(rows.values()) + 1)
+                positions = [i for i, key in enumerate(keys) if key in rows]
+                block = np.asarray(matrix[[rows[keys[i]] for i in positions]])
+                for i, vector in zip(positions, block):
+                    results[i] = vector
+            found = sum(1 for r in results if r is not None)
+            self.hits += found
+            self.misses += len(texts) - found
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors) -> None:
+        """Stores vectors for texts, skipping any that are already cached."""
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                info = self._model_info(model)
+                if info is None:
+                    file = re.sub(r"[^A-Za-z0-9_.-]", "_", model) + ".f32"
+                    info = (array.shape[1], file)
+                    self._conn.execute("INSERT INTO models (model, dim, file) VALUES (?, ?, ?)", (model, *info))
+                dim, file = info
+                if array.shape[1] != dim:
+                    raise ValueError(f"Embedding dimension {array.shape[1]} does not match cached dimension {dim} for '{model}'.")
+
+                keys = [self.key(t) for t in texts]
+                existing = set()
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    existing.update(k for (k,) in self._conn.execute(
+                        f"SELECT key FROM embeddings WHERE model = ? AND key IN ({placeholders})", [model, *chunk]
+                    ))
+                new = [(k, i) for i, k in enumerate(keys) if k not in existing]
+                new = list({k: i for k, i in new}.items())  # de-duplicate repeated texts
+                if new:
+                    path = os.path.join(self.directory, file)
+                    first_row = self._conn.execute(
+                        "SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings WHERE model = ?", (model,)
+                    ).fetchone()[0]
+                    # Drop any rows a failed or interrupted write appended without committing
+                    if os.path.exists(path) and os.path.getsize(path) > first_row * dim * 4:
+                        self._matrices.pop(model, None)
+                        os.truncate(path, first_row * dim * 4)
+                    with open(path, "ab") as f:
+                        f.write(array[[i for _, i in new]].tobytes())
+                    self._conn.executemany(
+                        "INSERT INTO embeddings (model, key, row) VALUES (?, ?, ?)",
+                        [(model, k, first_row + n) for n, (k, _) in enumerate(new)]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain embedding model so only cache misses reach the provider,
+    in batches of `batch_size`. Drop-in replacement for the wrapped model.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: Optional[EmbeddingCache] = None,
+                 batch_size: int = settings.EMBEDDING_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, namespace: str, texts: List[str], embed_fn) -> List[List[float]]:
+        unique = list(dict.fromkeys(texts))
+        cached = self.cache.get_many(namespace, unique)
+        vectors = {t: v for t, v in zip(unique, cached) if v is not None}
+        misses = [t for t in unique if t not in vectors]
+
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            computed = embed_fn(batch)
+            self.cache.put_many(namespace, batch, computed)
+            vectors.update(zip(batch, np.asarray(computed, dtype=np.float32)))
+
+        self.hits += len(unique) - len(misses)
+        self.misses += len(misses)
+        return [vectors[t].tolist() for t in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(self.model_name, texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        embed_fn = lambda batch: [self.embeddings.embed_query(t) for t in batch]
+        return self._embed(f"{self.model_name}#query", [text], embed_fn)[0]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(settings.EMBEDDING_CACHE_DIR)
+        return _cache
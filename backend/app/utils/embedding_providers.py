@@ -0,0 +1,75 @@
+from typing import List, Dict, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+# Bumped whenever LocalHashingEmbeddings produces different vectors for the same text, so
+# vectors cached or stored by an older version are never compared with new ones.
+LOCAL_EMBEDDING_VERSION = 2
+
+
+class LocalHashingEmbeddings(Embeddings):
+    """
+    CPU-only embeddings: hashed word uni/bi-grams projected to a dense space with a
+    fixed sparse random projection. Nothing is fitted on a corpus, so vectors are
+    stable across processes and restarts and can safely live in persistent stores.
+    """
+
+    def __init__(self, dimensions: int = settings.LOCAL_EMBEDDING_DIM, n_features: int = 2 ** 18,
+                 seed: int = 42, nonzeros_per_feature: int = 8):
+        from scipy.sparse import csr_matrix
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.dimensions = dimensions
+        self.model_name = f"local-hashing-v{LOCAL_EMBEDDING_VERSION}-{dimensions}"
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm="l2", lowercase=True
+        )
+        # The projection only depends on the input width and the seed, not on any data.
+        # Every hashed feature maps to a fixed number of random +/-1 output dimensions, so
+        # no feature (and hence no short text) projects to zero.
+        rng = np.random.default_rng(seed)
+        columns = rng.integers(0, dimensions, size=n_features * nonzeros_per_feature)
+        signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=n_features * nonzeros_per_feature)
+        row_starts = np.arange(0, n_features * nonzeros_per_feature + 1, nonzeros_per_feature)
+        self.projection = csr_matrix((signs, columns, row_starts), shape=(n_features, dimensions))
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embeds a batch of texts as an L2-normalized float32 matrix."""
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        dense = (self.vectorizer.transform(texts) @ self.projection).toarray().astype(np.float32)
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return dense / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def stats(self) -> Dict:
+        return {"model": self.model_name, "provider": "local"}
+
+
+def get_embedding_model(provider: Optional[str] = None) -> Embeddings:
+    """
+    Builds the embedding model selected by `EMBEDDING_PROVIDER`:
+      - "openai": OpenAI embeddings behind the persistent content-hash cache.
+      - "local":  LocalHashingEmbeddings (no network, no cache needed).
+    """
+    provider = provider or settings.EMBEDDING_PROVIDER
+    if provider == "local":
+        return LocalHashingEmbeddings()
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        from app.utils.embedding_cache import CachedEmbeddings
+        from app.core.llm_pool import get_http_client
+
+        # Shares the chat models' HTTP connection pool
+        openai_embeddings = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY, http_client=get_http_client())
+        return CachedEmbeddings(openai_embeddings, model_name=openai_embeddings.model)
+    raise ValueError(f"Unknown embedding provider '{provider}'. Use 'openai' or 'local'.")
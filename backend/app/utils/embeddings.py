@@ -1,70 +1,341 @@
-from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
-from typing import List, Dict
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 
 from app.core.config import settings
+from app.core.registry import registry
+from app.utils.embedding_providers import get_embedding_model, LOCAL_EMBEDDING_VERSION
+from app.utils.bm25_index import BM25Index, reciprocal_rank_fusion
+from app.utils.flat_vector_store import FlatVectorStore
 
 # --- INITIALIZATION ---
+# The model and stores are built on first use (see app.core.registry), so importing
+# this module doesn't open Chroma or load the embedding model.
 
-# 1. Initialize the OpenAI Embedding Model (this stays the same)
-embedding_function = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY)
+# 1. The embedding model selected by EMBEDDING_PROVIDER. The OpenAI model sits
+# behind the shared content-hash cache, so unchanged text is never re-embedded.
+registry.register("embedding_function", get_embedding_model)
 
-# 2. Initialize the LangChain Chroma vector store
-# This wrapper class handles the communication with ChromaDB for us.
-vector_store = Chroma(
-    collection_name="contracts",
-    embedding_function=embedding_function,
-    persist_directory="../../data/chroma" # The directory to save the database
-)
+
+def get_embedding_function():
+    return registry.get("embedding_function")
+
+
+# 2. The vector stores selected by VECTOR_STORE_BACKEND: the LangChain Chroma wrapper,
+# or the memory-mapped flat index. `vector_store` holds document chunks for Q&A;
+# `clause_store` holds one entry per clause of uploaded documents for corpus-wide search.
+# Each provider has its own vector dimensions, so non-default providers get their own collection,
+# and a new version of the local model starts new collections.
+collection_name = ("contracts" if settings.EMBEDDING_PROVIDER == "openai"
+                   else f"contracts_{settings.EMBEDDING_PROVIDER}_v{LOCAL_EMBEDDING_VERSION}")
+
+
+def _make_vector_store(name: str, cosine: bool = False):
+    if settings.VECTOR_STORE_BACKEND == "flat":
+        return FlatVectorStore(
+            os.path.join(settings.FLAT_VECTOR_STORE_DIR, name),
+            embedding_function=get_embedding_function(),
+            dtype=settings.FLAT_VECTOR_DTYPE
+        )
+    if settings.VECTOR_STORE_BACKEND == "chroma":
+        from langchain_chroma import Chroma
+        return Chroma(
+            collection_name=name,
+            embedding_function=get_embedding_function(),
+            persist_directory=settings.CHROMA_DIR, # The directory to save the database
+            # Cosine distance, like the flat store, so scores mean the same on both backends
+            collection_metadata={"hnsw:space": "cosine"} if cosine else None
+        )
+    raise ValueError(f"Unknown vector store backend '{settings.VECTOR_STORE_BACKEND}'. Use 'chroma' or 'flat'.")
+
+
+def _collection(store):
+    """The flat store takes the same upsert/update/delete calls as a Chroma collection."""
+    return store if isinstance(store, FlatVectorStore) else store._collection
+
+
+registry.register("vector_store", lambda: _make_vector_store(collection_name))
+registry.register("clause_store", lambda: _make_vector_store(f"{collection_name}_clauses", cosine=True))
+
+
+def get_vector_store():
+    return registry.get("vector_store")
+
+
+def get_clause_store():
+    return registry.get("clause_store")
+
+
+def _make_text_splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=100,
+        add_start_index=True,  # Records each chunk's character offset for citations
+    )
+
+
+registry.register("text_splitter", _make_text_splitter)
+
+# 3. The lexical (BM25) index lives in process memory next to the vector store.
+# It is rebuilt from the collection on first use and then kept in step by index_document.
+_lexical_index: Optional[BM25Index] = None
+_lexical_lock = threading.Lock()
+
+
+def get_lexical_index() -> BM25Index:
+    """Returns the BM25 index over all stored chunks, building it on first use."""
+    global _lexical_index
+    with _lexical_lock:
+        if _lexical_index is None:
+            index = BM25Index()
+            stored = get_vector_store().get(include=["documents", "metadatas"])
+            for id_, content, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                index.add(id_, content, metadata or {})
+            _lexical_index = index
+        return _lexical_index
 
 # --- TEXT PROCESSING AND INDEXING ---
 
-def index_document(doc_id: str, text: str, metadata: Dict):
+def chunk_id(doc_id: str, content: str, occurrence: int = 0) -> str:
+    """Deterministic id of a chunk: the document id plus a hash of the chunk's text."""
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+    return f"{doc_id}:{digest}" if occurrence == 0 else f"{doc_id}:{digest}:{occurrence}"
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embeds texts in batches of INDEX_BATCH_SIZE, INDEX_CONCURRENCY batches at a time."""
+    batches = [texts[i:i + settings.INDEX_BATCH_SIZE] for i in range(0, len(texts), settings.INDEX_BATCH_SIZE)]
+    if len(batches) <= 1 or settings.INDEX_CONCURRENCY <= 1:
+        results = [get_embedding_function().embed_documents(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=settings.INDEX_CONCURRENCY) as executor:
+            results = list(executor.map(get_embedding_function().embed_documents, batches))
+    return [vector for batch in results for vector in batch]
+
+
+def index_document(doc_id: str, text: str, metadata: Dict) -> Dict[str, int]:
     """
-    Chunks a document, creates LangChain Document objects, and stores them in Chroma.
+    Chunks a document and brings its chunks in Chroma up to date.
+
+    Chunk ids are derived from the document id and the chunk's text, so re-indexing an
+    edited document only embeds the chunks whose text changed, deletes the chunks that
+    no longer exist, and refreshes the position metadata of the rest.
+
+    Returns:
+        A report with the number of chunks 'embedded', 'skipped' (unchanged), 'deleted'
+        and the 'total' now indexed for the document.
     """
     # 1. Chunk the text
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100,
-    )
-    chunks = text_splitter.split_text(text)
-    
-    # 2. Create LangChain Document objects
-    # The LangChain wrapper expects data in its own `Document` format.
-    documents = []
+    chunks = registry.get("text_splitter").create_documents([text])
+
+    # 2. Give every chunk its id and metadata. Repeated text (e.g. boilerplate) gets an
+    # occurrence suffix so ids stay unique and stable.
+    ids, contents, metadatas = [], [], []
+    occurrences: Dict[str, int] = {}
     for i, chunk in enumerate(chunks):
-        # Create a metadata dictionary for each chunk
-        doc_metadata = {
+        content = chunk.page_content
+        occurrence = occurrences.get(content, 0)
+        occurrences[content] = occurrence + 1
+        ids.append(chunk_id(doc_id, content, occurrence))
+        contents.append(content)
+        metadatas.append({
             "doc_id": doc_id,
             "chunk_id": i,
+            "start_index": chunk.metadata["start_index"],
             **metadata # Add original document metadata
-        }
-        doc = Document(page_content=chunk, metadata=doc_metadata)
-        documents.append(doc)
+        })
+
+    # 3. Diff against what is already indexed for this document
+    vector_store = get_vector_store()
+    existing = vector_store.get(where={"doc_id": doc_id}, include=["metadatas"])
+    existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+    new_positions = [n for n, id_ in enumerate(ids) if id_ not in existing_metadata]
+    stale_ids = list(set(existing_metadata) - set(ids))
+    moved_positions = [
+        n for n, id_ in enumerate(ids)
+        if id_ in existing_metadata and existing_metadata[id_] != metadatas[n]
+    ]
+
+    # 4. Apply the diff to both indexes: delete stale chunks, re-label moved ones,
+    # embed only new ones
+    collection = _collection(vector_store)
+    lexical_index = get_lexical_index()
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        for id_ in stale_ids:
+            lexical_index.remove(id_)
+    if moved_positions:
+        collection.update(ids=[ids[n] for n in moved_positions], metadatas=[metadatas[n] for n in moved_positions])
+        for n in moved_positions:
+            lexical_index.update_metadata(ids[n], metadatas[n])
+    if new_positions:
+        vectors = embed_texts([contents[n] for n in new_positions])
+        collection.upsert(
+            ids=[ids[n] for n in new_positions],
+            embeddings=vectors,
+            documents=[contents[n] for n in new_positions],
+            metadatas=[metadatas[n] for n in new_positions],
+        )
+        for n in new_positions:
+            lexical_index.add(ids[n], contents[n], metadatas[n])
+
+    report = {
+        "embedded": len(new_positions),
+        "skipped": len(ids) - len(new_positions),
+        "deleted": len(stale_ids),
+        "total": len(ids)
+    }
+    print(f"Indexed document {doc_id}: {report}")
+    if hasattr(get_embedding_function(), "stats"):
+        print(f"Embedding cache: {get_embedding_function().stats()}")
+    return report
+
+def delete_document(doc_id: str) -> int:
+    """Removes all of a document's chunks from the vector store. Returns the number removed."""
+    ids = get_vector_store().get(where={"doc_id": doc_id})["ids"]
+    if ids:
+        get_vector_store().delete(ids=ids)
+        lexical_index = get_lexical_index()
+        for id_ in ids:
+            lexical_index.remove(id_)
+    return len(ids)
 
-    # 3. Add the documents to the vector store
-    vector_store.add_documents(documents)
-    print(f"Successfully indexed {len(documents)} chunks for document {doc_id}.")
+def index_clauses(document_id: int, clauses: List[Dict], metadata: Dict,
+                  vectors: Optional[List[List[float]]] = None) -> Dict[str, int]:
+    """
+    Stores one entry per clause of an uploaded document in the clause store, replacing
+    the document's previous clauses.
+
+    Args:
+        clauses: Dicts with 'clause_id' (the Clause row id), 'content', 'clause_number'
+                 and 'category'.
+        metadata: Document-level fields added to every clause (e.g. document_type,
+                  upload_date as a Unix timestamp, filename).
+        vectors: The clauses' embeddings, if already computed.
+    """
+    clause_store = get_clause_store()
+    collection = _collection(clause_store)
+    stale = clause_store.get(where={"document_id": document_id}, include=[])["ids"]
+    if stale:
+        collection.delete(ids=stale)
+    if not clauses:
+        return {"embedded": 0, "deleted": len(stale)}
+
+    if vectors is None:
+        vectors = embed_texts([c["content"] for c in clauses])
+    collection.upsert(
+        ids=[f"clause:{c['clause_id']}" for c in clauses],
+        embeddings=vectors,
+        documents=[c["content"] for c in clauses],
+        metadatas=[
+            {
+                "document_id": document_id,
+                "clause_id": c["clause_id"],
+                "clause_number": c.get("clause_number") or "",
+                "category": c.get("category", "Other"),
+                **metadata
+            }
+            for c in clauses
+        ],
+    )
+    print(f"Indexed {len(clauses)} clauses for document {document_id}.")
+    return {"embedded": len(clauses), "deleted": len(stale)}
 
 # --- SEARCH AND RETRIEVAL ---
 
-def search_documents(query: str, n_results: int = 5) -> List[Dict]:
+def is_indexed(doc_id: str) -> bool:
+    """True if the vector store holds any chunks for the document."""
+    return bool(get_vector_store().get(where={"doc_id": doc_id}, limit=1)["ids"])
+
+
+def dense_search(query: str, n_results: int = 5, doc_id: Optional[str] = None) -> List[Dict]:
     """
     Searches the vector store for documents similar to the query.
+    If `doc_id` is given, only that document's chunks are searched.
     """
     # The `similarity_search_with_score` method returns documents and their similarity scores.
-    results_with_scores = vector_store.similarity_search_with_score(query, k=n_results)
+    results_with_scores = get_vector_store().similarity_search_with_score(
+        query, k=n_results, filter={"doc_id": doc_id} if doc_id else None
+    )
     
     # Format the results for easier use
     formatted_results = []
     for doc, score in results_with_scores:
         formatted_results.append({
+            "id": doc.id,
             "content": doc.page_content,
             "metadata": doc.metadata,
             "score": score # Lower score is better (more similar)
         })
         
-    return formatted_results
\ No newline at end of file
+    return formatted_results
+
+
+def lexical_search(query: str, n_results: int = 5, doc_id: Optional[str] = None) -> List[Dict]:
+    """BM25 keyword search; catches exact terms and clause numbers that embeddings blur."""
+    index = get_lexical_index()
+    results = []
+    for id_, score in index.search(query, k=n_results, doc_id=doc_id):
+        content, metadata = index.chunks[id_]
+        results.append({"id": id_, "content": content, "metadata": metadata, "score": score})
+    return results
+
+
+def search_documents(query: str, n_results: int = 5, doc_id: Optional[str] = None,
+                     mode: str = settings.RETRIEVAL_MODE) -> List[Dict]:
+    """
+    Searches the indexed chunks for the query.
+
+    Args:
+        mode: "hybrid" fuses BM25 and dense rankings with reciprocal rank fusion;
+              "dense" or "lexical" use one ranking only.
+        doc_id: If given, only that document's chunks are searched.
+
+    Returns:
+        Dicts with 'id', 'content', 'metadata' and 'score'. In hybrid mode the score is
+        the fused score (higher is better) and 'dense_rank' / 'lexical_rank' are included.
+    """
+    if mode == "dense":
+        return dense_search(query, n_results, doc_id)
+    if mode == "lexical":
+        return lexical_search(query, n_results, doc_id)
+    if mode != "hybrid":
+        raise ValueError(f"Unknown retrieval mode '{mode}'. Use 'hybrid', 'dense' or 'lexical'.")
+
+    # Each ranking contributes a deeper candidate list than is returned
+    depth = n_results * settings.RETRIEVAL_CANDIDATES
+    dense = dense_search(query, depth, doc_id)
+    lexical = lexical_search(query, depth, doc_id)
+    by_id = {r["id"]: r for r in lexical + dense}
+    dense_ranks = {r["id"]: rank for rank, r in enumerate(dense, start=1)}
+    lexical_ranks = {r["id"]: rank for rank, r in enumerate(lexical, start=1)}
+
+    fused = reciprocal_rank_fusion([[r["id"] for r in dense], [r["id"] for r in lexical]])
+    return [
+        {
+            "id": id_,
+            "content": by_id[id_]["content"],
+            "metadata": by_id[id_]["metadata"],
+            "score": score,
+            "dense_rank": dense_ranks.get(id_),
+            "lexical_rank": lexical_ranks.get(id_)
+        }
+        for id_, score in fused[:n_results]
+    ]
+
+
+def search_clauses(query: str, n_results: int = 20, where: Optional[Dict] = None) -> List[Dict]:
+    """
+    Finds the clauses across all uploaded documents most similar to the query.
+
+    Returns:
+        Dicts with 'content', 'metadata' and 'score' (cosine similarity, higher is better).
+    """
+    results = get_clause_store().similarity_search_with_score(query, k=n_results, filter=where or None)
+    return [
+        {"content": doc.page_content, "metadata": doc.metadata, "score": round(1.0 - distance, 4)}
+        for doc, distance in results
+    ]
@@ -0,0 +1,349 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# Rows dequantized per step when scanning an int8 matrix; small blocks stay in CPU cache
+SCAN_BLOCK_ROWS = 4096
+
+COMPARISON_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def where_to_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Translates a Chroma-style `where` filter into SQL over the metadata sidecar.
+
+    Supports equality ({"field": value}), the operators $eq, $ne, $gt, $gte, $lt, $lte,
+    $in and $nin, and $and / $or over sub-filters.
+    """
+    clauses, params = [], []
+    for field, condition in where.items():
+        if field in ("$and", "$or"):
+            parts = [where_to_sql(sub) for sub in condition]
+            joiner = " AND " if field == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            params.extend(p for _, sub_params in parts for p in sub_params)
+            continue
+
+        column = "doc_id" if field == "doc_id" else "json_extract(metadata, ?)"
+        column_params = [] if field == "doc_id" else [f'$."{field}"']
+        operators = condition if isinstance(condition, dict) else {"$eq": condition}
+        for operator, value in operators.items():
+            if operator in COMPARISON_OPERATORS:
+                clauses.append(f"{column} {COMPARISON_OPERATORS[operator]} ?")
+                params.extend(column_params + [value])
+            elif operator in ("$in", "$nin"):
+                placeholders = ",".join("?" * len(value)) or "NULL"
+                negation = "NOT " if operator == "$nin" else ""
+                clauses.append(f"{column} {negation}IN ({placeholders})")
+                params.extend(column_params + list(value))
+            else:
+                raise ValueError(f"Unsupported filter operator '{operator}'.")
+    return " AND ".join(clauses) or "1", params
+
+
+class FlatVectorStore:
+    """
+    A flat (exact) vector index in a directory:
+      - vectors.f32 (or vectors.i8 + scales.f32): an append-only row-major matrix of
+        L2-normalized vectors, read through a read-only memory map, so every worker
+        process shares the same page-cache pages instead of holding its own copy;
+      - index.sqlite: the metadata sidecar (chunk id, doc id, text, metadata, liveness).
+
+    Search is an exact, vectorized NumPy top-k. A `doc_id` filter is applied from an
+    in-memory code array and only the matching rows are scored; other filters are
+    evaluated in SQL over the sidecar. Deleted and replaced rows stay in the matrix as
+    tombstones. Implements the parts of the Chroma interface `app.utils.embeddings` uses.
+    """
+
+    def __init__(self, directory: str, embedding_function: Optional[Embeddings] = None, dtype: str = "float32"):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported vector dtype '{dtype}'. Use 'float32' or 'int8'.")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.dtype = dtype
+        self.vectors_path = os.path.join(directory, "vectors.f32" if dtype == "float32" else "vectors.i8")
+        self.scales_path = os.path.join(directory, "scales.f32")
+
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT NOT NULL, doc_id TEXT, "
+            "document TEXT, metadata TEXT, alive INTEGER NOT NULL DEFAULT 1)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS rows_id ON rows (id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS rows_doc_id ON rows (doc_id)")
+        self._lock = threading.RLock()
+
+        self._version = None
+        self._dim = None
+        self._matrix = None
+        self._scales = None
+        self._reload()
+
+    # --- 1. IN-MEMORY VIEW ---
+
+    def _info(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _reload(self) -> None:
+        """Loads ids, doc-id codes and liveness for every row (not texts or metadata)."""
+        self._version = self._info("version")
+        dim = self._info("dim")
+        self._dim = int(dim) if dim else None
+        stored_dtype = self._info("dtype")
+        if stored_dtype and stored_dtype != self.dtype:
+            raise ValueError(f"Vector store at {self.directory} holds {stored_dtype} vectors, not {self.dtype}.")
+
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._doc_code_of: Dict[str, int] = {}
+        codes, alive = [], []
+        for row, id_, doc_id, is_alive in self._conn.execute("SELECT row, id, doc_id, alive FROM rows ORDER BY row"):
+            self._ids.append(id_)
+            codes.append(self._doc_code_of.setdefault(doc_id, len(self._doc_code_of)))
+            alive.append(bool(is_alive))
+            if is_alive:
+                self._row_of[id_] = row
+        self._doc_codes = np.asarray(codes, dtype=np.int32)
+        self._alive = np.asarray(alive, dtype=bool)
+        self._matrix = None
+
+    def _refresh(self) -> None:
+        """Picks up writes made by other processes."""
+        if self._info("version") != self._version:
+            self._reload()
+
+    def _vectors(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """The memory-mapped matrix (and int8 scales), remapped when rows were appended."""
+        n = len(self._ids)
+        if self._matrix is None or self._matrix.shape[0] < n:
+            item_type = np.float32 if self.dtype == "float32" else np.int8
+            self._matrix = np.memmap(self.vectors_path, dtype=item_type, mode="r", shape=(n, self._dim))
+            if self.dtype == "int8":
+                self._scales = np.memmap(self.scales_path, dtype=np.float32, mode="r", shape=(n,))
+        return self._matrix, self._scales
+
+    # --- 2. WRITES ---
+
+    def _write(self, apply) -> None:
+        """Runs `apply` in a write transaction and bumps the version other readers watch."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._info("version") != self._version:
+                    self._reload()
+                apply()
+                version = str(int(self._version or 0) + 1)
+                self._conn.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('version', ?)", (version,))
+                self._conn.execute("COMMIT")
+                self._version = version
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._reload()
+                raise
+
+    @staticmethod
+    def _truncate(path: str, size: int) -> None:
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def _tombstone(self, ids: List[str]) -> None:
+        rows = [self._row_of.pop(id_) for id_ in ids if id_ in self._row_of]
+        if rows:
+            self._conn.executemany("UPDATE rows SET alive = 0 WHERE row = ?", [(r,) for r in rows])
+            self._alive[rows] = False
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict]) -> None:
+        """Adds chunks, replacing any existing chunk with the same id."""
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        def apply():
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._conn.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('dim', ?)", (str(self._dim),))
+                self._conn.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('dtype', ?)", (self.dtype,))
+            if vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self._dim}.")
+            self._tombstone(ids)
+
+            first_row = len(self._ids)
+            # Drop any rows a failed or interrupted write appended without committing
+            self._truncate(self.vectors_path, first_row * self._dim * (4 if self.dtype == "float32" else 1))
+            if self.dtype == "int8":
+                self._truncate(self.scales_path, first_row * 4)
+            if self.dtype == "float32":
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.tobytes())
+            else:
+                scales = np.abs(vectors).max(axis=1) / 127.0
+                scales[scales == 0] = 1.0
+                quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+                with open(self.vectors_path, "ab") as f:
+                    f.write(quantized.tobytes())
+                with open(self.scales_path, "ab") as f:
+                    f.write(scales.astype(np.float32).tobytes())
+
+            self._conn.executemany(
+                "INSERT INTO rows (row, id, doc_id, document, metadata, alive) VALUES (?, ?, ?, ?, ?, 1)",
+                [
+                    (first_row + n, id_, (metadata or {}).get("doc_id"), document, json.dumps(metadata or {}))
+                    for n, (id_, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ]
+            )
+            codes = []
+            for n, (id_, metadata) in enumerate(zip(ids, metadatas)):
+                self._ids.append(id_)
+                self._row_of[id_] = first_row + n
+                codes.append(self._doc_code_of.setdefault((metadata or {}).get("doc_id"), len(self._doc_code_of)))
+            self._doc_codes = np.concatenate([self._doc_codes, np.asarray(codes, dtype=np.int32)])
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+
+        self._write(apply)
+
+    def update(self, ids: List[str], metadatas: List[Dict]) -> None:
+        """Replaces the metadata of existing chunks (the vectors are unchanged)."""
+        def apply():
+            for id_, metadata in zip(ids, metadatas):
+                row = self._row_of.get(id_)
+                if row is None:
+                    continue
+                doc_id = metadata.get("doc_id")
+                self._conn.execute(
+                    "UPDATE rows SET doc_id = ?, metadata = ? WHERE row = ?", (doc_id, json.dumps(metadata), row)
+                )
+                self._doc_codes[row] = self._doc_code_of.setdefault(doc_id, len(self._doc_code_of))
+
+        self._write(apply)
+
+    def delete(self, ids: Optional[List[str]] = None) -> None:
+        if ids:
+            self._write(lambda: self._tombstone(list(ids)))
+
+    # --- 3. READS ---
+
+    def _candidate_mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Boolean mask of the live rows matching the filter."""
+        if not where:
+            return self._alive
+        if list(where) == ["doc_id"] and not isinstance(where["doc_id"], dict):
+            code = self._doc_code_of.get(where["doc_id"])
+            if code is None:
+                return np.zeros(len(self._ids), dtype=bool)
+            return self._alive & (self._doc_codes == code)
+        sql, params = where_to_sql(where)
+        mask = np.zeros(len(self._ids), dtype=bool)
+        rows = [r for (r,) in self._conn.execute(f"SELECT row FROM rows WHERE alive = 1 AND {sql}", params)]
+        mask[rows] = True
+        return mask
+
+    def _scores(self, rows: np.ndarray, query: np.ndarray, all_rows: bool) -> np.ndarray:
+        matrix, scales = self._vectors()
+        if self.dtype == "float32":
+            return matrix[:len(self._ids)] @ query if all_rows else matrix[rows] @ query
+        if not all_rows:
+            return (matrix[rows].astype(np.float32) @ query) * scales[rows]
+        scores = np.empty(len(self._ids), dtype=np.float32)
+        for start in range(0, len(self._ids), SCAN_BLOCK_ROWS):
+            block = slice(start, start + SCAN_BLOCK_ROWS)
+            scores[block] = (matrix[block].astype(np.float32) @ query) * scales[block]
+        return scores
+
+    def _fetch(self, rows: List[int]) -> Dict[int, tuple]:
+        """Loads id, text and metadata for the given rows from the sidecar."""
+        fetched = {}
+        for start in range(0, len(rows), 500):
+            chunk = rows[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row, id_, document, metadata in self._conn.execute(
+                f"SELECT row, id, document, metadata FROM rows WHERE row IN ({placeholders})", chunk
+            ):
+                fetched[row] = (id_, document, json.loads(metadata))
+        return fetched
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Exact top-k by cosine similarity. Scores are cosine distances (lower is better),
+        like Chroma's.
+        """
+        with self._lock:
+            self._refresh()
+            if not self._ids or self._dim is None:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+
+            mask = self._candidate_mask(filter)
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                return []
+            # Gather the matching rows when they are a small part of the matrix; scan it all otherwise
+            all_rows = len(rows) > len(self._ids) // 2
+            scores = self._scores(rows, query, all_rows)
+            if all_rows:
+                scores = np.where(mask, scores, -np.inf)
+                candidates = np.arange(len(scores))
+            else:
+                candidates = rows
+
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            top_rows = [int(candidates[t]) for t in top]
+            fetched = self._fetch(top_rows)
+        return [
+            (Document(page_content=fetched[row][1], metadata=fetched[row][2], id=fetched[row][0]),
+             float(1.0 - scores[t]))
+            for row, t in zip(top_rows, top)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k, filter)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, List]:
+        """Chroma-style `get`: ids, plus 'documents' and/or 'metadatas' if included."""
+        include = include if include is not None else ["documents", "metadatas"]
+        sql, params = where_to_sql(where) if where else ("1", [])
+        if ids is not None:
+            id_list = list(ids)
+            sql += f" AND id IN ({','.join('?' * len(id_list)) or 'NULL'})"
+            params = params + id_list
+        query = f"SELECT id, document, metadata FROM rows WHERE alive = 1 AND {sql} ORDER BY row"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            results = self._conn.execute(query, params).fetchall()
+        output = {"ids": [r[0] for r in results]}
+        output["documents"] = [r[1] for r in results] if "documents" in include else None
+        output["metadatas"] = [json.loads(r[2]) for r in results] if "metadatas" in include else None
+        return output
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            item_size = 4 if self.dtype == "float32" else 1
+            return {
+                "rows": len(self._ids),
+                "live_rows": int(self._alive.sum()),
+                "dimensions": self._dim,
+                "dtype": self.dtype,
+                "matrix_bytes": len(self._ids) * (self._dim or 0) * item_size
+            }
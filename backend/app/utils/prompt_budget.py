@@ -0,0 +1,186 @@
+"""
+Token counting and budget-aware prompt assembly for the agents.
+
+Each agent describes the variable content of its prompt as sections, most important
+first, each a list of items ordered most relevant first (risks by severity, retrieved
+chunks by rank, ...). `fit_prompt` counts the prompt with the model's tokenizer and,
+if it is over the agent's budget (Settings.PROMPT_BUDGETS), first compresses items
+(sections with `compress_to`, least important section and least relevant items first),
+then drops items in the same order until it fits. Sections marked `required` keep at
+least their first item. The final token count of every prompt is recorded per agent
+(`prompt_stats`, served at GET /api/llm/prompts).
+"""
+import logging
+import threading
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.risk_patterns import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Below this many tokens a compressed item is no longer worth keeping
+MIN_COMPRESSED_TOKENS = 16
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """The model's tiktoken encoding, or None (then tokens are estimated) if unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken missing, or its encoding files can't be downloaded (offline)
+        logger.warning(f"No tokenizer for '{model}' ({type(e).__name__}); estimating tokens from characters.")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4-turbo") -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4-turbo") -> str:
+    """Cuts text to at most `max_tokens` (the marker included), at a word boundary."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is None:
+        cut = text[:max(0, max_tokens - 1) * 4]
+    else:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max(0, max_tokens - 1)])
+    return cut.rsplit(" ", 1)[0] + " ..."
+
+
+def _fit(sections: List[Dict[str, Any]], available: int, model: str) -> Dict[str, Dict[str, int]]:
+    """Compresses, then drops, items of `sections` (in place) until they fit in `available` tokens."""
+    counts = {s["name"]: [count_tokens(item, model) + 1 for item in s["items"]] for s in sections}
+    over = sum(sum(c) for c in counts.values()) - available
+    changes = {"compressed": defaultdict(int), "dropped": defaultdict(int)}
+
+    # 1. Compress the least important sections' least relevant items first
+    for section in reversed(sections):
+        limit = section.get("compress_to")
+        if over <= 0 or not limit:
+            continue
+        section_counts = counts[section["name"]]
+        for i in reversed(range(len(section["items"]))):
+            if over <= 0:
+                break
+            if section_counts[i] > limit + 1:
+                compress = section.get("compress", truncate_to_tokens)
+                section["items"][i] = compress(section["items"][i], limit, model)
+                new_count = count_tokens(section["items"][i], model) + 1
+                over -= section_counts[i] - new_count
+                section_counts[i] = new_count
+                changes["compressed"][section["name"]] += 1
+
+    # 2. Then drop them, in the same order. Required sections keep their first item
+    for section in reversed(sections):
+        keep = 1 if section.get("required") else 0
+        section_counts = counts[section["name"]]
+        while over > 0 and len(section["items"]) > keep:
+            section["items"].pop()
+            if "positions" in section:
+                section["positions"].pop()
+            over -= section_counts.pop()
+            changes["dropped"][section["name"]] += 1
+
+    # 3. Still over: required content alone exceeds the budget, so cut it down
+    for section in reversed(sections):
+        if over > 0 and section["items"]:
+            before = counts[section["name"]][0]
+            section["items"][0] = truncate_to_tokens(section["items"][0], max(MIN_COMPRESSED_TOKENS, before - 1 - over), model)
+            over -= before - count_tokens(section["items"][0], model) - 1
+            changes["compressed"][section["name"]] += 1
+    return {name: dict(values) for name, values in changes.items()}
+
+
+class _PromptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: deque(maxlen=1000))
+        self._reduced = defaultdict(int)
+
+    def record(self, agent: str, total: int, reduced: bool) -> None:
+        with self._lock:
+            self._totals[agent].append(total)
+            self._reduced[agent] += int(reduced)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for agent, totals in self._totals.items():
+                ordered = sorted(totals)
+                result[agent] = {
+                    "budget": settings.PROMPT_BUDGETS.get(agent),
+                    "prompts": len(ordered),
+                    "reduced": self._reduced[agent],
+                    "p50_tokens": ordered[len(ordered) // 2],
+                    "max_tokens": ordered[-1],
+                }
+            return result
+
+
+_stats = _PromptStats()
+
+
+def prompt_stats() -> Dict[str, Any]:
+    """Per agent, over its last 1000 prompts: token counts and how many had to be reduced."""
+    return _stats.stats()
+
+
+def fit_prompt(agent: str, model: str, prompt, sections: List[Dict[str, Any]],
+               budget: Optional[int] = None, **fixed: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Fits `sections` into the agent's budget for `prompt` (a ChatPromptTemplate).
+
+    Args:
+        sections: most important first; each {"name": prompt variable, "items": [str],
+                  "separator": joins the items (default "\\n"), "compress_to": max tokens
+                  per item when compressing (optional), "compress": (item, max_tokens,
+                  model) -> shorter item (default `truncate_to_tokens`), "required": keeps its first item,
+                  "empty": text when no item is left (default ""), "positions": the
+                  items' places in the source, to restore that order once fitted (optional)}.
+        fixed: the prompt's other variables, sent as they are.
+
+    Returns:
+        (the prompt's input variables, a report of the token counts and reductions;
+        its "kept" counts the items left in each section, always the first ones given)
+    """
+    budget = budget or settings.PROMPT_BUDGETS[agent]
+    sections = [dict(s, items=[str(item) for item in s["items"]]) for s in sections]
+    for s in sections:
+        if "positions" in s:
+            s["positions"] = list(s["positions"])
+    reserved = count_tokens(prompt.format(**fixed, **{s["name"]: "" for s in sections}), model)
+    changes = _fit(sections, budget - reserved, model)
+
+    inputs = dict(fixed)
+    for s in sections:
+        items = s["items"]
+        if "positions" in s:
+            items = [item for _, item in sorted(zip(s["positions"], items), key=lambda pair: pair[0])]
+        inputs[s["name"]] = s.get("separator", "\n").join(items) if items else s.get("empty", "")
+    total = count_tokens(prompt.format(**inputs), model)
+    report = {
+        "agent": agent,
+        "model": model,
+        "budget": budget,
+        "total": total,
+        "sections": {s["name"]: count_tokens(inputs[s["name"]], model) for s in sections},
+        "kept": {s["name"]: len(s["items"]) for s in sections},
+        **changes
+    }
+    reduced = bool(changes["compressed"] or changes["dropped"])
+    _stats.record(agent, total, reduced)
+    if reduced:
+        logger.info(f"Prompt for '{agent}' reduced to {total}/{budget} tokens: {report}")
+    return inputs, report
@@ -0,0 +1,245 @@
+import re
+import time
+from typing import List, Dict, Any, Optional
+
+# --- 1. DEFINE THE RISK ARCHETYPES ---
+# These mirror the archetypes the risk prompt asks the LLM to look for. Each one is
+# compiled into a single alternation regex so a clause is scanned once per archetype,
+# and only when one of its cheap substring 'keywords' is present.
+
+RISK_PATTERNS = [
+    {
+        'risk_type': 'unlimited_liability',
+        'severity': 'critical',
+        'keywords': ['liab', 'responsible'],
+        'patterns': [
+            r'unlimited liability',
+            r'liab\w* (?:shall|will) (?:not|in no event) be (?:limited|capped)',
+            # "without limitation" alone is usually "including, without limitation"; it only
+            # counts with a liability word as its object or a few words before it
+            r'without (?:any )?(?:limit|limitation|cap) (?:of|on|to) (?:its |their |the )?liability',
+            r'liab\w* (?:(?!including\b|such\b)\w+ ){0,3}without (?:any )?(?:limit|limitation|cap)\b',
+            r'(?:fully|solely|entirely) (?:liable|responsible) for (?:any|all)',
+            r'no (?:limit|limitation|cap) (?:of|on) (?:its |their |the )?liability',
+        ],
+        'description': 'The clause appears to expose a party to liability without any cap.',
+        'mitigation': 'Cap liability (e.g., fees paid in the prior 12 months) and exclude indirect damages.'
+    },
+    {
+        'risk_type': 'one_sided_termination',
+        'severity': 'high',
+        'keywords': ['terminat'],
+        'patterns': [
+            r'(?:may|can|shall be entitled to) terminate[^.]{0,120}(?:at any time|for any reason|for convenience|without (?:prior )?(?:notice|cause))',
+            r'terminate[^.]{0,80}(?:at|in) (?:its|their) (?:sole|absolute) discretion',
+            r'(?:immediately|forthwith) terminate[^.]{0,80}without (?:prior )?notice',
+        ],
+        'description': 'The clause appears to grant termination rights without notice, cause or reciprocity.',
+        'mitigation': 'Make termination rights mutual and require a reasonable written notice period.'
+    },
+    {
+        'risk_type': 'broad_indemnification',
+        'severity': 'high',
+        'keywords': ['indemn', 'harmless'],
+        'patterns': [
+            r'indemnif\w*[^.]{0,160}(?:any and all|all claims|whatsoever|howsoever|regardless of (?:fault|cause|negligence))',
+            r'(?:defend, )?indemnify,? (?:defend,? )?and hold harmless',
+            r'indemnif\w*[^.]{0,120}(?:own|sole) negligence',
+        ],
+        'description': 'The clause appears to impose a broad, uncapped indemnification obligation.',
+        'mitigation': 'Limit indemnities to third-party claims caused by the indemnifying party and cap them.'
+    },
+    {
+        'risk_type': 'vague_obligations',
+        'severity': 'medium',
+        'keywords': ['efforts', 'as soon as', 'time to time', 'discretion', 'limit', 'promptly'],
+        'patterns': [
+            r'(?:best|reasonable|commercially reasonable) efforts',
+            r'as soon as (?:reasonably )?(?:practicable|possible)',
+            r'from time to time',
+            r'(?:sole|absolute) discretion',
+            r'(?:including|such as),? (?:but|without) (?:not )?limit(?:ed|ation)',
+            r'\bpromptly\b',
+        ],
+        'description': 'The clause uses vague language that leaves the scope of an obligation open to interpretation.',
+        'mitigation': 'Replace vague standards with concrete deadlines, metrics or defined procedures.'
+    },
+]
+
+# Boilerplate that carries no meaningful legal risk on its own. A clause is only
+# treated as benign when it matches one of these AND none of the guard terms below.
+BENIGN_PATTERNS = [
+    {
+        'reason': 'notices',
+        'patterns': [
+            r'notices?[^.]{0,120}(?:shall|must|will) be (?:given|sent|delivered|made) (?:in writing|by)',
+            r'(?:all )?notices? (?:under|pursuant to) this agreement',
+        ],
+    },
+    {
+        'reason': 'headings',
+        'patterns': [r'headings?[^.]{0,80}(?:for convenience|not affect|no legal effect)'],
+    },
+    {
+        'reason': 'counterparts',
+        'patterns': [r'(?:executed|signed) in (?:any number of )?counterparts'],
+    },
+    {
+        'reason': 'signature_block',
+        'patterns': [r'in witness whereof', r'intentionally left blank'],
+    },
+]
+
+# Terms that make a clause substantive even if it also looks like boilerplate.
+BENIGN_GUARD_PATTERN = re.compile(
+    r'liab|indemn|terminat|penalt|damages|exclusiv|warrant|non-compete|assign|confidential|payment|fee',
+    re.IGNORECASE
+)
+
+# Modal verbs that mark a short line as an operative sentence rather than a heading.
+OPERATIVE_PATTERN = re.compile(r'\b(?:shall|must|will|may|agrees?|undertakes?)\b', re.IGNORECASE)
+
+SEVERITY_ORDER = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+_COMPILED_RISKS = [
+    (rule, re.compile('|'.join(f'(?:{p})' for p in rule['patterns']), re.IGNORECASE))
+    for rule in RISK_PATTERNS
+]
+_COMPILED_BENIGN = [
+    (rule['reason'], re.compile('|'.join(f'(?:{p})' for p in rule['patterns']), re.IGNORECASE))
+    for rule in BENIGN_PATTERNS
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return max(1, len(text) // 4)
+
+
+def _is_heading(text: str) -> bool:
+    """A short, capitalized line that is not a sentence and has no operative verb."""
+    words = text.split()
+    if not 0 < len(words) <= 8 or text.rstrip().endswith(('.', ';')):
+        return False
+    if OPERATIVE_PATTERN.search(text):
+        return False
+    capitalized = sum(1 for w in words if w[0].isupper() or w[0].isdigit())
+    return text.isupper() or capitalized / len(words) >= 0.75
+
+
+# --- 2. PRE-SCREENING LOGIC ---
+
+def prescreen_clause(text: str) -> Dict[str, Any]:
+    """
+    Tags a single clause with the risk archetypes it matches.
+
+    Returns:
+        A dict with the matched 'flags', the highest 'provisional_severity' (or None),
+        and whether the clause is confidently 'benign' (with a 'benign_reason').
+    """
+    flags = []
+    lowered = text.lower()
+    for rule, pattern in _COMPILED_RISKS:
+        if not any(keyword in lowered for keyword in rule['keywords']):
+            continue
+        match = pattern.search(text)
+        if match:
+            flags.append({
+                'risk_type': rule['risk_type'],
+                'severity': rule['severity'],
+                'match': match.group(0)
+            })
+
+    provisional_severity: Optional[str] = None
+    if flags:
+        provisional_severity = max((f['severity'] for f in flags), key=SEVERITY_ORDER.get)
+
+    benign_reason = None
+    if not flags and not BENIGN_GUARD_PATTERN.search(text):
+        if not text.strip():
+            benign_reason = 'empty'
+        elif _is_heading(text):
+            benign_reason = 'heading'
+        else:
+            for reason, pattern in _COMPILED_BENIGN:
+                if pattern.search(text):
+                    benign_reason = reason
+                    break
+
+    return {
+        'flags': flags,
+        'provisional_severity': provisional_severity,
+        'benign': benign_reason is not None,
+        'benign_reason': benign_reason
+    }
+
+
+def prescreen_clauses(parsed_clauses: List[Dict]) -> Dict[str, Any]:
+    """
+    Runs the pattern library over parsed clauses and splits them into the clauses that
+    still need the LLM and the ones that can be skipped.
+
+    Args:
+        parsed_clauses: Clauses as produced by the parser agent ('clause_number', 'text').
+
+    Returns:
+        A dict with 'to_llm' (clauses annotated with 'pattern_flags' and
+        'provisional_severity'), 'benign' (skipped clauses) and a 'report'.
+    """
+    start = time.perf_counter()
+    to_llm, benign = [], []
+    total_tokens = diverted_tokens = 0
+    flag_counts: Dict[str, int] = {}
+
+    for clause in parsed_clauses:
+        text = clause.get('text', '')
+        tokens = estimate_tokens(text)
+        total_tokens += tokens
+        result = prescreen_clause(text)
+
+        if result['benign']:
+            benign.append({**clause, 'benign_reason': result['benign_reason']})
+            diverted_tokens += tokens
+            continue
+
+        for flag in result['flags']:
+            flag_counts[flag['risk_type']] = flag_counts.get(flag['risk_type'], 0) + 1
+        to_llm.append({
+            **clause,
+            'pattern_flags': result['flags'],
+            'provisional_severity': result['provisional_severity']
+        })
+
+    elapsed = time.perf_counter() - start
+    total = len(parsed_clauses)
+    report = {
+        'total_clauses': total,
+        'diverted_clauses': len(benign),
+        'diverted_clause_fraction': round(len(benign) / total, 4) if total else 0.0,
+        'total_tokens': total_tokens,
+        'diverted_tokens': diverted_tokens,
+        'diverted_token_fraction': round(diverted_tokens / total_tokens, 4) if total_tokens else 0.0,
+        'flagged_clauses': sum(1 for c in to_llm if c['pattern_flags']),
+        'flags_by_type': flag_counts,
+        'microseconds_per_clause': round(elapsed * 1e6 / total, 2) if total else 0.0
+    }
+    return {'to_llm': to_llm, 'benign': benign, 'report': report}
+
+
+def provisional_risks(clauses: List[Dict]) -> List[Dict[str, str]]:
+    """
+    Turns pattern-flagged clauses into risk dicts shaped like the risk agent's `Risk`
+    model. Used as a fallback when the LLM is unavailable.
+    """
+    risks = []
+    rules_by_type = {rule['risk_type']: rule for rule in RISK_PATTERNS}
+    for clause in clauses:
+        for flag in clause.get('pattern_flags', []):
+            rule = rules_by_type[flag['risk_type']]
+            risks.append({
+                'clause_text': clause.get('text', ''),
+                'risk_level': flag['severity'],
+                'description': f"{rule['description']} (matched: \"{flag['match']}\")",
+                'mitigation': rule['mitigation']
+            })
+    return risks
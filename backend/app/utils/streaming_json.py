@@ -0,0 +1,211 @@
+"""
+Incremental parsing of the agents' structured (JSON) LLM output.
+
+`JsonStreamParser` scans the completion as it streams and hands back each element of
+the output's list field (e.g. "risks") as soon as its JSON closes, and each top-level
+field once its value is complete. `stream_json` drives a chain's stream through it and
+validates each element against its pydantic model, so callers can use items before the
+completion ends, and a completion cut off or broken near the end still yields every item
+that closed before the damage (callers then ask again for the missing ones only).
+
+Per agent, calls, truncated outputs, salvaged items, tokens lost to truncation and the
+time to the first item are recorded (`structured_output_stats`, GET /api/llm/structured).
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.utils.prompt_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "key", "expect")
+
+    def __init__(self, kind: str, start: int):
+        self.kind = kind
+        self.start = start
+        self.key = None
+        self.expect = "key" if kind == "{" else "value"
+
+
+class JsonStreamParser:
+    """
+    Scans a JSON object as text arrives. Text before the object (e.g. a ``` fence) and
+    after it is ignored. `feed` returns the raw JSON of each element of `list_field`
+    (a top-level array) completed by the new text; `fields` holds the raw JSON of every
+    completed top-level field.
+    """
+
+    def __init__(self, list_field: Optional[str] = None):
+        self.list_field = list_field
+        self.text = ""
+        self.fields: Dict[str, str] = {}
+        self.complete = False
+        self.last_item_end = 0
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._token_start: Optional[int] = None  # of the string or literal being read
+
+    def feed(self, chunk: str) -> List[str]:
+        self.text += chunk
+        text, ready = self.text, []
+        i = self._pos
+        while i < len(text) and not self.complete:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._string_done(self._token_start, i + 1, ready)
+                    self._token_start = None
+            elif not self._stack:
+                if ch == "{":
+                    self._stack.append(_Frame("{", i))
+            else:
+                if self._token_start is not None and (ch in ",]}" or ch.isspace()):
+                    # A number, true, false or null ends at its delimiter
+                    self._value_done(self._token_start, i, ready)
+                    self._token_start = None
+                if ch == '"':
+                    self._in_string = True
+                    self._token_start = i
+                elif ch in "{[":
+                    self._stack.append(_Frame(ch, i))
+                elif ch in "}]":
+                    frame = self._stack.pop()
+                    if self._stack:
+                        self._value_done(frame.start, i + 1, ready)
+                    else:
+                        self.complete = True
+                elif ch == ":":
+                    self._stack[-1].expect = "value"
+                elif ch == ",":
+                    if self._stack[-1].kind == "{":
+                        self._stack[-1].expect = "key"
+                elif not ch.isspace() and self._token_start is None:
+                    self._token_start = i
+            i += 1
+        self._pos = i
+        return ready
+
+    def _string_done(self, start: int, end: int, ready: List[str]) -> None:
+        frame = self._stack[-1]
+        if frame.kind == "{" and frame.expect == "key":
+            frame.key = json.loads(self.text[start:end])
+        else:
+            self._value_done(start, end, ready)
+
+    def _value_done(self, start: int, end: int, ready: List[str]) -> None:
+        parent = self._stack[-1]
+        if len(self._stack) == 1:
+            self.fields[parent.key] = self.text[start:end]
+        elif len(self._stack) == 2 and parent.kind == "[" and self._stack[0].key == self.list_field:
+            ready.append(self.text[start:end])
+            self.last_item_end = end
+
+    def field(self, name: str, default: Any = None) -> Any:
+        """A completed top-level field's value, or `default`."""
+        if name not in self.fields:
+            return default
+        try:
+            return json.loads(self.fields[name])
+        except json.JSONDecodeError:
+            return default
+
+
+class _StructuredStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: defaultdict(int))
+        self._first_item = defaultdict(lambda: deque(maxlen=1000))
+
+    def record(self, agent: str, first_item: Optional[float], **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[agent][name] += value
+            if first_item is not None:
+                self._first_item[agent].append(first_item)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for agent, counts in self._counts.items():
+                result[agent] = dict(counts)
+                seconds = sorted(self._first_item[agent])
+                if seconds:
+                    result[agent]["first_item_ms"] = {
+                        "p50": round(seconds[len(seconds) // 2] * 1000, 1),
+                        "p95": round(seconds[int(len(seconds) * 0.95)] * 1000, 1),
+                    }
+            return result
+
+
+_stats = _StructuredStats()
+
+
+def structured_output_stats() -> Dict[str, Any]:
+    """
+    Per agent: structured calls, outputs cut off or malformed ("truncated"), items
+    salvaged from those, items failing validation, retries for missing items, tokens lost
+    after the last complete item, and time to the first item.
+    """
+    return _stats.stats()
+
+
+def record_retry(agent: str) -> None:
+    _stats.record(agent, None, retries=1)
+
+
+def stream_json(agent: str, chain, inputs: Dict[str, Any], item_model: Optional[Type[BaseModel]] = None,
+                list_field: Optional[str] = None, on_item: Optional[Callable[[BaseModel], None]] = None,
+                model: str = "gpt-4-turbo") -> Dict[str, Any]:
+    """
+    Streams `chain` (a prompt | model | StrOutputParser) and parses its JSON as it arrives.
+
+    Returns:
+        {"items": the validated elements of `list_field`, in order, "parser": the
+         JsonStreamParser (its completed fields and full text), "complete": whether the
+         JSON object closed, "invalid": elements that failed validation}
+    """
+    parser = JsonStreamParser(list_field)
+    items, invalid, first_item = [], 0, None
+    start = time.perf_counter()
+    try:
+        for chunk in chain.stream(inputs):
+            for raw in parser.feed(chunk):
+                try:
+                    item = item_model.model_validate_json(raw)
+                except ValidationError as e:
+                    invalid += 1
+                    logger.warning(f"Skipping an invalid '{agent}' item: {e.errors()[0]['msg']}")
+                    continue
+                if first_item is None:
+                    first_item = time.perf_counter() - start
+                items.append(item)
+                if on_item:
+                    on_item(item)
+    except Exception as e:
+        if not parser.text:
+            raise
+        # The stream broke off; what closed before it is kept like a cut-off completion
+        logger.warning(f"The '{agent}' output stream failed after {len(parser.text)} characters ({type(e).__name__}).")
+
+    truncated = not parser.complete
+    wasted = count_tokens(parser.text[parser.last_item_end:], model) if truncated else 0
+    _stats.record(agent, first_item, calls=1, truncated=int(truncated), invalid=invalid,
+                  salvaged=len(items) if truncated else 0, wasted_tokens=wasted)
+    if truncated:
+        logger.warning(f"The '{agent}' output was cut off or malformed; salvaged {len(items)} complete items.")
+    return {"items": items, "parser": parser, "complete": parser.complete, "invalid": invalid}
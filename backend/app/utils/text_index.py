@@ -0,0 +1,177 @@
+import re
+import bisect
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+
+# Paragraph breaks as Word reports them in `body.text` ("\r"), plus plain newlines.
+PARAGRAPH_BREAK = re.compile(r'\r\n|\r|\n')
+WORD_PATTERN = re.compile(r'\w+')
+QUOTE_TRANSLATION = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+# Quoted passages in an LLM answer that are long enough to be worth resolving.
+QUOTED_PASSAGE = re.compile(r'"([^"]{15,})"')
+
+
+class DocumentTextIndex:
+    """
+    An index over one document's text that maps snippets (e.g. an LLM's `clause_text`)
+    back to character offsets and paragraph indexes in the original text.
+
+    Build it once per document (see `get_text_index`) and reuse it for every lookup.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+        # 1. Paragraph start offsets, so any offset maps to a paragraph by bisection.
+        self.paragraph_starts = [0] + [m.end() for m in PARAGRAPH_BREAK.finditer(text)]
+
+        # 2. A normalized copy (lowercase, unified quotes, collapsed whitespace) with a
+        # map from every normalized character back to its original offset.
+        normalized, norm_to_orig = [], []
+        previous_space = True
+        for i, char in enumerate(text.translate(QUOTE_TRANSLATION).lower()):
+            if char.isspace():
+                if previous_space:
+                    continue
+                char = ' '
+                previous_space = True
+            else:
+                previous_space = False
+            normalized.append(char)
+            norm_to_orig.append(i)
+        self.normalized = ''.join(normalized)
+        self.norm_to_orig = norm_to_orig
+
+        # 3. A word-level inverted index used to find candidate regions for fuzzy lookups.
+        self.tokens: List[str] = []
+        self.token_spans: List[tuple] = []
+        self.postings: Dict[str, List[int]] = {}
+        for position, match in enumerate(WORD_PATTERN.finditer(text.lower())):
+            token = match.group(0)
+            self.tokens.append(token)
+            self.token_spans.append(match.span())
+            self.postings.setdefault(token, []).append(position)
+
+    @staticmethod
+    def _normalize(snippet: str) -> str:
+        return ' '.join(snippet.translate(QUOTE_TRANSLATION).lower().split())
+
+    def paragraph_index(self, offset: int) -> int:
+        """Returns the index of the paragraph containing the character offset."""
+        return bisect.bisect_right(self.paragraph_starts, offset) - 1
+
+    def _span(self, start: int, end: int, match: str, score: float) -> Dict[str, Any]:
+        paragraph_index = self.paragraph_index(start)
+        return {
+            "start": start,
+            "end": end,
+            "paragraph_index": paragraph_index,
+            "paragraph_end_index": self.paragraph_index(max(start, end - 1)),
+            "paragraph_offset": start - self.paragraph_starts[paragraph_index],
+            "text": self.text[start:end],
+            "match": match,
+            "score": round(score, 3)
+        }
+
+    def find_exact(self, snippet: str) -> Optional[Dict[str, Any]]:
+        """Finds the snippet ignoring case, quote style and whitespace differences."""
+        needle = self._normalize(snippet)
+        if not needle:
+            return None
+        position = self.normalized.find(needle)
+        if position == -1:
+            return None
+        start = self.norm_to_orig[position]
+        end = self.norm_to_orig[position + len(needle) - 1] + 1
+        return self._span(start, end, "exact", 1.0)
+
+    def find_fuzzy(self, snippet: str, min_score: float = 0.6) -> Optional[Dict[str, Any]]:
+        """
+        Finds the region that best matches a paraphrased or truncated snippet.
+
+        The rarest query words vote for where the snippet would start in the document,
+        then each top candidate window is aligned word-by-word with difflib. The score
+        is the fraction of the snippet's words found in order.
+        """
+        query = WORD_PATTERN.findall(snippet.lower())
+        if not query:
+            return None
+
+        # 1. Vote for candidate start positions using the rarest query tokens.
+        anchors = sorted(
+            ((len(self.postings[t]), qi, t) for qi, t in enumerate(query) if t in self.postings)
+        )[:8]
+        if not anchors:
+            return None
+        bucket = max(4, len(query) // 4)
+        votes: Dict[int, int] = {}
+        for _, qi, token in anchors:
+            for position in self.postings[token][:200]:
+                key = max(0, position - qi) // bucket
+                votes[key] = votes.get(key, 0) + 1
+
+        # 2. Align the query against a window around each of the best candidates.
+        best = None
+        slack = len(query) // 4 + bucket
+        for key, _ in sorted(votes.items(), key=lambda kv: -kv[1])[:3]:
+            window_start = max(0, key * bucket - slack)
+            window_end = min(len(self.tokens), key * bucket + len(query) + slack)
+            window = self.tokens[window_start:window_end]
+            blocks = [b for b in SequenceMatcher(None, window, query, autojunk=False).get_matching_blocks() if b.size]
+            if not blocks:
+                continue
+            score = sum(b.size for b in blocks) / len(query)
+            if best is None or score > best[0]:
+                first = window_start + blocks[0].a
+                last = window_start + blocks[-1].a + blocks[-1].size - 1
+                best = (score, first, last)
+
+        if best is None or best[0] < min_score:
+            return None
+        score, first, last = best
+        return self._span(self.token_spans[first][0], self.token_spans[last][1], "fuzzy", score)
+
+    def locate(self, snippet: Optional[str], min_score: float = 0.6,
+               start_hint: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Exact lookup first, falling back to fuzzy lookup. A `start_hint` (e.g. a chunk's
+        recorded offset) is used directly when the snippet is still at that offset.
+        """
+        if not snippet:
+            return None
+        if start_hint is not None and self.text[start_hint:start_hint + len(snippet)] == snippet:
+            return self._span(start_hint, start_hint + len(snippet), "exact", 1.0)
+        return self.find_exact(snippet) or self.find_fuzzy(snippet, min_score=min_score)
+
+
+@lru_cache(maxsize=16)
+def get_text_index(text: str) -> DocumentTextIndex:
+    """Returns the (cached) index for a document text, building it on first use."""
+    return DocumentTextIndex(text)
+
+
+def attach_locations(items: List[Any], index: DocumentTextIndex, text_field: str = "clause_text") -> List[Dict]:
+    """
+    Converts findings (Pydantic models or dicts) to dicts with a `location` entry
+    resolved from their `text_field`. Unresolvable findings get `location: None`.
+    """
+    located = []
+    for item in items:
+        data = item.model_dump() if hasattr(item, "model_dump") else dict(item)
+        data["location"] = index.locate(data.get(text_field))
+        located.append(data)
+    return located
+
+
+def extract_citations(answer: str, index: DocumentTextIndex) -> List[Dict[str, Any]]:
+    """Resolves the passages quoted in an answer to locations in the source document."""
+    citations = []
+    seen = set()
+    for match in QUOTED_PASSAGE.finditer(answer.translate(QUOTE_TRANSLATION)):
+        location = index.locate(match.group(1))
+        if location and (location["start"], location["end"]) not in seen:
+            seen.add((location["start"], location["end"]))
+            citations.append(location)
+    return citations
@@ -0,0 +1,103 @@
+"""
+Calibrates the Q&A answer cache (app.utils.answer_cache): for labeled pairs of questions
+that do and don't have the same answer, how many an earlier question's cached answer
+would serve at each similarity threshold, with and without the question-key check
+(same parties, numbers and negations). A wrong hit serves a confidently wrong answer,
+so a threshold is only usable if it has none. Also checks the cache's document bound.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_answer_cache
+    python -m benchmarks.bench_answer_cache --provider openai   # needs OPENAI_API_KEY
+"""
+import argparse
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.answer_cache import AnswerCache, question_key
+from app.utils.embedding_providers import get_embedding_model
+
+THRESHOLDS = (0.7, 0.75, 0.8, 0.85, 0.9, 0.95)
+
+PARAPHRASES = [
+    ("What is the notice period for termination by the Supplier?", "How much notice does the Supplier need to give to terminate?"),
+    ("What is the notice period for termination by the Supplier?", "What notice period applies when the Supplier terminates?"),
+    ("Who owns the intellectual property created under the agreement?", "Who owns intellectual property created under this agreement?"),
+    ("What is the governing law of this contract?", "Which law governs this contract?"),
+    ("What is the governing law?", "what is the governing law"),
+    ("How long do the confidentiality obligations last?", "How long do confidentiality obligations last after termination?"),
+    ("Is there a cap on the Supplier's liability?", "Is the Supplier's liability capped?"),
+    ("When are invoices due for payment?", "When is payment of invoices due?"),
+    ("Can the Customer assign this agreement?", "Is the Customer allowed to assign the agreement?"),
+    ("What happens if the Supplier breaches the contract?", "What happens when the Supplier breaches the contract?"),
+    ("What are the payment terms?", "What are the terms of payment?"),
+    ("Does the agreement renew automatically?", "Does this agreement automatically renew?"),
+    ("What does Section 4.2 say about fees?", "What does Section 4.2 say regarding fees?"),
+    ("Where are disputes resolved?", "Where will disputes be resolved?"),
+    ("What warranties does the Licensor give?", "Which warranties are given by the Licensor?"),
+]
+# Same topic and wording, but a different party, number or subject: a cached answer would be wrong
+DIFFERENT_QUESTIONS = [
+    ("What is the notice period for termination by the Supplier?", "What is the notice period for termination by the Customer?"),
+    ("Is there a cap on the Supplier's liability?", "Is there a cap on the Customer's liability?"),
+    ("Can the Customer assign this agreement?", "Can the Supplier assign this agreement?"),
+    ("What does Section 4.2 say about fees?", "What does Section 5.2 say about fees?"),
+    ("What warranties does the Licensor give?", "What warranties does the Licensee give?"),
+    ("What happens if payment is 30 days late?", "What happens if payment is 60 days late?"),
+    ("What obligations does the Employer have?", "What obligations does the Employee have?"),
+    ("What is the governing law of this contract?", "What is the term of this contract?"),
+    ("When are invoices due for payment?", "When are invoices issued?"),
+    ("Who owns the intellectual property created under the agreement?", "Who owns the data created under the agreement?"),
+    ("Does the agreement renew automatically?", "Can the agreement be terminated automatically?"),
+    ("What are the Tenant's repair obligations?", "What are the Landlord's repair obligations?"),
+]
+
+
+def similarities(model, pairs):
+    vectors = np.asarray(model.embed_documents([q for pair in pairs for q in pair]), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [float(vectors[2 * i] @ vectors[2 * i + 1]) for i in range(len(pairs))]
+
+
+def cache_hit(model, earlier: str, question: str, threshold: float) -> bool:
+    cache = AnswerCache(threshold=threshold)
+    cache.store("doc", "hash", earlier, model.embed_query(earlier), "answer", [])
+    return cache.lookup("doc", "hash", question, model.embed_query(question)) is not None
+
+
+def check_cache(model, threshold: float):
+    for earlier, question in DIFFERENT_QUESTIONS:
+        if cache_hit(model, earlier, question, threshold):
+            raise AssertionError(f"The cache would answer {question!r} with the answer to {earlier!r}")
+    cache = AnswerCache(max_documents=2)
+    for doc_id in ("a", "b", "c"):
+        cache.store(doc_id, "hash", "What is the term?", model.embed_query("What is the term?"), "answer", [])
+    if cache.stats()["documents"] != 2:
+        raise AssertionError(f"The cache holds {cache.stats()['documents']} documents, more than max_documents=2")
+    print(f"--- No wrong hits at threshold {threshold}; the document bound holds ---")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--provider", default="local", choices=["local", "openai"])
+    args = parser.parse_args()
+
+    model = get_embedding_model(args.provider)
+    same, different = similarities(model, PARAPHRASES), similarities(model, DIFFERENT_QUESTIONS)
+    same_key = [question_key(a) == question_key(b) for a, b in PARAPHRASES]
+    different_key = [question_key(a) == question_key(b) for a, b in DIFFERENT_QUESTIONS]
+
+    print(f"{args.provider} embeddings: {len(PARAPHRASES)} paraphrase pairs, "
+          f"{len(DIFFERENT_QUESTIONS)} pairs of different questions")
+    print(f"   {'threshold':<11}{'paraphrases served':>20}{'wrong hits':>12}{'wrong hits with key':>21}")
+    for threshold in THRESHOLDS:
+        served = sum(s >= threshold and k for s, k in zip(same, same_key))
+        wrong = sum(s >= threshold for s in different)
+        wrong_keyed = sum(s >= threshold and k for s, k in zip(different, different_key))
+        print(f"   {threshold:<11}{served:>14}/{len(same):<5}{wrong:>12}{wrong_keyed:>21}")
+
+    check_cache(model, settings.QA_CACHE_THRESHOLDS[args.provider])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Clause classification and risk analysis with and without the model cascade (see
+app.core.cascade), on the sample contracts, fully offline. The fake provider (see
+app.core.fake_llm) answers as a fast model on the cheap tier and a slow one on the
+strong tier, so the timings show what escalation costs; the fake's confidences put
+about a quarter of answers below CASCADE_MIN_CONFIDENCE. It answers alike on every
+tier, so agreement is always 100% here; real agreement comes from GET /api/llm/cascade.
+
+    single     every clause on the strong model, in one call (CASCADE_ENABLED=false)
+    cascade    the cheap model first, escalated clauses on the strong model
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_cascade
+    python -m benchmarks.bench_cascade --runs 3 --min-confidence 0.5 --audit-rate 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+from app.core.config import settings
+from app.utils.document_parser import load_document_text
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "contracts")
+
+
+def measure(fn, texts, runs: int) -> float:
+    """Median seconds of `fn` over the samples; the agents' progress output is discarded."""
+    seconds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(runs * len(texts)):
+            start = time.perf_counter()
+            fn(texts[i % len(texts)])
+            seconds.append(time.perf_counter() - start)
+    seconds.sort()
+    return seconds[len(seconds) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1, help="timed runs per sample and setup")
+    parser.add_argument("--cheap", default="gpt-3.5-turbo:150:2", help="model:latency_ms:ms_per_token")
+    parser.add_argument("--strong", default="gpt-4-turbo:600:10", help="model:latency_ms:ms_per_token")
+    parser.add_argument("--min-confidence", type=float, default=settings.CASCADE_MIN_CONFIDENCE)
+    parser.add_argument("--audit-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    tiers = []
+    for spec in (args.cheap, args.strong):
+        model, latency_ms, ms_per_token = spec.split(":")
+        tiers.append(model)
+        settings.FAKE_LLM_MODEL_LATENCY[model] = {"latency_ms": float(latency_ms), "ms_per_token": float(ms_per_token)}
+        settings.LLM_MODEL_LIMITS[model] = {"concurrency": 64, "rpm": 10 ** 9, "tpm": 10 ** 12}
+    settings.LLM_PROVIDER = "fake"
+    settings.CASCADE_TIERS = {"classification": tiers, "risk": tiers}
+    settings.CASCADE_MIN_CONFIDENCE = args.min_confidence
+    settings.CASCADE_AUDIT_RATE = args.audit_rate
+
+    from app.agents.parser_agent import DocumentParserAgent
+    from app.agents.risk_agent import RiskAssessmentAgent
+    from app.core.cascade import cascade_stats
+
+    paths = sorted(os.path.join(SAMPLES_DIR, name) for name in os.listdir(SAMPLES_DIR) if name.endswith(".docx"))
+    texts = [load_document_text(path) for path in paths]
+    with contextlib.redirect_stdout(io.StringIO()):
+        parsed = {text: DocumentParserAgent().run(text)["parsed_clauses"] for text in texts}
+    cases = {
+        "classification": lambda text: DocumentParserAgent().run(text),
+        "risk": lambda text: RiskAssessmentAgent().run(parsed[text]),
+    }
+
+    print(f"{len(texts)} sample contracts, {args.runs} runs each; tiers {' -> '.join(tiers)}, "
+          f"min confidence {args.min_confidence}, audit rate {args.audit_rate:.0%}")
+    print(f"   {'agent':<16}{'single p50':>12}{'cascade p50':>13}")
+    for name, fn in cases.items():
+        settings.CASCADE_ENABLED = False
+        single = measure(fn, texts, args.runs)
+        settings.CASCADE_ENABLED = True
+        cascade = measure(fn, texts, args.runs)
+        print(f"   {name:<16}{single * 1000:>10.0f}ms{cascade * 1000:>11.0f}ms")
+    settings.CASCADE_ENABLED = False
+
+    print("Per tier (GET /api/llm/cascade):")
+    print(json.dumps(cascade_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
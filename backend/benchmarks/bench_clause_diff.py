@@ -0,0 +1,60 @@
+"""
+Benchmarks the local edit classifier that decides which modified clauses the comparison
+agent sends to the LLM for an explanation, after checking it on the known regression
+cases below. Runs entirely offline.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_clause_diff
+"""
+import random
+import time
+
+from app.utils.clause_diff import classify_edit, TRIVIAL_KINDS
+
+# (version A, version B, expected kind)
+EDIT_CASES = [
+    # Amounts, rates and multiples are not clause numbers, however they are written
+    ("The fee is $1.50 per unit.", "The fee is $9.75 per unit.", "substantive"),
+    ("Interest accrues at 1.5% per month.", "Interest accrues at 15.5% per month.", "substantive"),
+    ("Liability is capped at 2.0 times the annual fees.", "Liability is capped at 10.0 times the annual fees.", "substantive"),
+    ("The initial term is 1.5 years.", "The initial term is 2.5 years.", "substantive"),
+    ("Payment is due within 30 days.", "Payment is due within 60 days.", "substantive"),
+    ("4.2 The Supplier shall deliver the Services.", "5.2 The Supplier shall deliver the Services.", "numbering"),
+    ("(a) The Supplier shall deliver the Services.", "(b) The Supplier shall deliver the Services.", "numbering"),
+    ("As set out in Section 4.2, fees are payable.", "As set out in Section 5.3, fees are payable.", "numbering"),
+    ("Subject to § 7.1, fees are payable.", "Subject to § 8.1 fees are payable.", "numbering"),
+    ("The Supplier shall deliver the Services.", "The Supplier shall  deliver the Services.", "whitespace"),
+    ("The Supplier shall deliver the Services.", "The Supplier shall delvier the Services.", "typo"),
+    ("The Customer shall recieve the Services.", "The Customer shall receive the Services.", "typo"),
+    # One letter, but another word: these change who is bound or what is meant
+    ("The Licensor grants a license.", "The Licensors grant a license.", "substantive"),
+    ("The Licensor grants a license.", "The Licensors grants a license.", "substantive"),
+    ("The Customer may use a free trial period.", "The Customer may use a free trail period.", "substantive"),
+    ("The Supplier must show a causal link to the loss.", "The Supplier must show a casual link to the loss.", "substantive"),
+]
+
+
+def check_edit_kinds():
+    for text_a, text_b, expected in EDIT_CASES:
+        kind = classify_edit(text_a, text_b)
+        if kind != expected:
+            raise AssertionError(f"classify_edit returned '{kind}', expected '{expected}': {text_a!r} -> {text_b!r}")
+    print(f"--- {len(EDIT_CASES)} edit classification regression cases pass ---")
+
+
+def main(n_edits: int = 20_000):
+    check_edit_kinds()
+
+    rng = random.Random(42)
+    pairs = [rng.choice(EDIT_CASES)[:2] for _ in range(n_edits)]
+    start = time.perf_counter()
+    kinds = [classify_edit(a, b) for a, b in pairs]
+    elapsed = time.perf_counter() - start
+
+    print(f"--- Classified {n_edits} clause edits in {elapsed:.3f}s ---")
+    print(f"   Microseconds per edit: {elapsed * 1e6 / n_edits:.2f}")
+    print(f"   Trivial edits (no LLM explanation): {sum(k in TRIVIAL_KINDS for k in kinds) / n_edits:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Write throughput of concurrent document uploads against a throwaway SQLite database.
+Each upload inserts a Document row and its Clause rows, the database work of
+POST /documents/upload. Three setups are compared:
+
+    before       the old handler: sync session on the event loop, SQLite defaults
+                 (rollback journal, synchronous=FULL), clauses added one ORM object each
+    sync-wal     sync sessions in a thread pool (as FastAPI runs sync handlers), WAL
+                 pragmas, clauses added one ORM object each
+    async-bulk   async sessions (aiosqlite), WAL pragmas, clauses in one bulk INSERT,
+                 write transactions queued on the process's write lock
+
+"loop lag" is the longest the event loop was blocked while the uploads ran, i.e. how
+long any other request would have waited to be served.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_db_concurrency
+    python -m benchmarks.bench_db_concurrency --uploads 400 --concurrency 50 --clauses 80
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import Base, make_engine, make_async_engine, write_transaction
+from app.core.bulk import replace_clauses
+from app.models.document import Document, Clause
+
+
+def clause_rows(n: int):
+    return [{"clause_type": "Termination", "content": f"Clause {i}. Either party may terminate this Agreement " * 4, "position": i}
+            for i in range(n)]
+
+
+def sync_upload(Session, n_clauses: int) -> float:
+    start = time.perf_counter()
+    with Session() as db:
+        document = Document(filename="contract.docx", file_path="data/uploads/contract.docx",
+                            document_type="application/pdf", upload_date=datetime.now())
+        db.add(document)
+        db.commit()
+        db.add_all([Clause(document_id=document.id, **row) for row in clause_rows(n_clauses)])
+        db.commit()
+    return time.perf_counter() - start
+
+
+async def async_upload(Session, n_clauses: int) -> float:
+    start = time.perf_counter()
+    async with Session() as db:
+        document = Document(filename="contract.docx", file_path="data/uploads/contract.docx",
+                            document_type="application/pdf", upload_date=datetime.now())
+        async with write_transaction(db):
+            db.add(document)
+        async with write_transaction(db):
+            await replace_clauses(db, document.id, clause_rows(n_clauses))
+    return time.perf_counter() - start
+
+
+async def run(setup: str, url: str, uploads: int, concurrency: int, n_clauses: int) -> dict:
+    lag = {"max": 0.0}
+    stop = asyncio.Event()
+
+    async def monitor():
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag["max"] = max(lag["max"], time.perf_counter() - t - 0.001)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    sync_engine = async_engine = None
+    if setup == "async-bulk":
+        async_engine = make_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+        Session = async_sessionmaker(async_engine, expire_on_commit=False)
+    else:
+        sync_engine = make_engine(url, tuned=(setup == "sync-wal"))
+        Session = sessionmaker(bind=sync_engine)
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def one_upload():
+        async with semaphore:
+            if setup == "before":
+                return sync_upload(Session, n_clauses)
+            if setup == "sync-wal":
+                return await loop.run_in_executor(pool, sync_upload, Session, n_clauses)
+            return await async_upload(Session, n_clauses)
+
+    monitor_task = asyncio.create_task(monitor())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(one_upload() for _ in range(uploads))))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor_task
+
+    pool.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+    else:
+        sync_engine.dispose()
+    return {
+        "uploads_per_s": uploads / elapsed,
+        "rows_per_s": uploads * (n_clauses + 1) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "lag_ms": lag["max"] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--clauses", type=int, default=60)
+    args = parser.parse_args()
+
+    print(f"{args.uploads} uploads of {args.clauses} clauses, {args.concurrency} concurrent")
+    print(f"   {'setup':<12}{'uploads/s':>11}{'rows/s':>10}{'p50':>11}{'p99':>11}{'loop lag':>11}")
+    for setup in ("before", "sync-wal", "async-bulk"):
+        directory = tempfile.mkdtemp()
+        try:
+            url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            Base.metadata.create_all(bind=make_engine(url, tuned=False))
+            r = asyncio.run(run(setup, url, args.uploads, args.concurrency, args.clauses))
+            print(f"   {setup:<12}{r['uploads_per_s']:>11.1f}{r['rows_per_s']:>10.0f}"
+                  f"{r['p50_ms']:>9.1f}ms{r['p99_ms']:>9.1f}ms{r['lag_ms']:>9.1f}ms")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
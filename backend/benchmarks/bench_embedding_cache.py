@@ -0,0 +1,90 @@
+"""
+Shows the embedding cache hit rate when comparing successive versions of a contract.
+Runs offline: a counting hashing-vectorizer stands in for the embedding provider.
+First checks that rows left in the vector file by an uncommitted write are not served.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_embedding_cache
+"""
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from app.utils.clause_alignment import align_clauses
+from app.utils.embedding_cache import EmbeddingCache, CachedEmbeddings
+from benchmarks.bench_alignment import make_document_pair
+
+# Roughly the dimensionality of a real embedding model
+vectorizer = HashingVectorizer(n_features=1536, ngram_range=(1, 2), alternate_sign=False)
+
+
+class CountingEmbeddings(Embeddings):
+    """Stands in for the remote provider and counts the texts sent to it."""
+
+    def __init__(self):
+        self.texts_embedded = 0
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        return vectorizer.transform(texts).toarray().tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def check_orphan_rows():
+    """A write that appended vectors but never committed them must not shift later rows."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = EmbeddingCache(directory)
+        cache.put_many("check", ["a"], [[1.0, 0.0]])
+        # An interrupted write: a row and a half appended, never indexed
+        with open(os.path.join(directory, "check.f32"), "ab") as f:
+            f.write(np.array([9.0, 9.0, 9.0], dtype=np.float32).tobytes())
+        cache.put_many("check", ["b"], [[0.0, 1.0]])
+        vectors = cache.get_many("check", ["a", "b"])
+        if vectors[0].tolist() != [1.0, 0.0] or vectors[1].tolist() != [0.0, 1.0]:
+            raise AssertionError(f"Cache returned {[v.tolist() for v in vectors]} after an uncommitted write")
+    print("--- Uncommitted rows are dropped before the next write ---")
+
+
+def main(n_clauses: int = 1000, n_versions: int = 5):
+    check_orphan_rows()
+
+    rng = random.Random(11)
+    provider = CountingEmbeddings()
+    with tempfile.TemporaryDirectory() as directory:
+        cached = CachedEmbeddings(provider, model_name="bench-hashing", cache=EmbeddingCache(directory))
+        base, version, _ = make_document_pair(n_clauses, rng)
+
+        print(f"--- Comparing a {n_clauses}-clause template against {n_versions} successive versions ---")
+        for v in range(n_versions):
+            hits_before, misses_before = cached.hits, cached.misses
+            sent_before = provider.texts_embedded
+            start = time.perf_counter()
+            align_clauses(base, version, embed_fn=cached.embed_documents)
+            elapsed = time.perf_counter() - start
+
+            hits, misses = cached.hits - hits_before, cached.misses - misses_before
+            rate = hits / (hits + misses) if hits + misses else 0.0
+            print(f"   Version {v + 1}: hit rate {rate:.1%}, "
+                  f"{provider.texts_embedded - sent_before} texts sent to the provider, {elapsed * 1000:.1f}ms")
+
+            # The next version is a light edit of this one
+            edited = [dict(c) for c in version]
+            for clause in rng.sample(edited, k=max(1, len(edited) // 50)):
+                clause["content"] += " as amended"
+            version = edited
+
+        print(f"\nTotal provider calls: {provider.calls}, texts embedded: {provider.texts_embedded}")
+
+
+if __name__ == "__main__":
+    main()
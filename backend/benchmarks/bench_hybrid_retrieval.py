@@ -0,0 +1,112 @@
+"""
+Retrieval quality and latency of dense, BM25 and hybrid (RRF) chunk search on the sample
+contracts, plus BM25 lookup cost on a larger synthetic corpus.
+
+Runs offline with the local hashing embeddings and a throwaway Chroma collection; the
+dense numbers are therefore a lower bound for the OpenAI provider.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_hybrid_retrieval
+"""
+import os
+import tempfile
+import time
+
+import docx
+from langchain_chroma import Chroma
+
+from app.core.registry import registry
+from app.utils import embeddings
+from app.utils.bm25_index import BM25Index, tokenize
+from app.utils.embedding_providers import LocalHashingEmbeddings
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "contracts")
+
+# (document, question, text that the relevant chunk contains)
+QUERIES = [
+    ("sample1", "What does Section 9.1 say?", "9.1 LIABILITY CAP"),
+    ("sample1", "Force Majeure", "11.6 Force Majeure"),
+    ("sample1", "How much is the monthly subscription?", "Monthly Subscription: $5,000"),
+    ("sample1", "Which law governs the agreement?", "Cayman Islands, without regard"),
+    ("sample1", "When must security breaches be notified?", "within 90 days of discovery"),
+    ("sample1", "Can the provider terminate at any time?", "10.3 Termination by Provider"),
+    ("sample1", "Section 12.3", "12.3 Compliance"),
+    ("sample1", "interest on late payments", "2% per month"),
+    ("sample2", "How long do confidentiality obligations survive termination?", "8.2 Survival"),
+    ("sample2", "What is excluded from Confidential Information?", "2.1 Confidential Information does not include"),
+    ("sample2", "Section 4.1 permitted disclosures", "4.1 The Receiving Party may disclose"),
+    ("sample2", "return of materials on termination", "a) Return all Confidential Information"),
+    ("sample2", "Governing Law", "State of Delaware"),
+    ("sample3", "What is the base salary?", "$145,000"),
+    ("sample3", "non-compete radius", "50-mile radius"),
+    ("sample3", "Section 7.4", "7.4 Severance"),
+    ("sample3", "notice period for the employee to resign", "four weeks' written notice"),
+    ("sample3", "Works Made for Hire", "4.3 Works Made for Hire"),
+    ("sample3", "Exhibit A prior inventions", "4.6 Prior Inventions"),
+]
+
+
+def load_sample(name: str) -> str:
+    document = docx.Document(os.path.join(SAMPLES_DIR, f"{name}.docx"))
+    return "\n".join(p.text for p in document.paragraphs if p.text.strip())
+
+
+def evaluate(mode: str, k: int = 3):
+    hits_1, hits_k, reciprocal_ranks, latencies = 0, 0, [], []
+    for doc_id, question, expected in QUERIES:
+        start = time.perf_counter()
+        results = embeddings.search_documents(question, n_results=k, doc_id=doc_id, mode=mode)
+        latencies.append(time.perf_counter() - start)
+        ranks = [n for n, r in enumerate(results, start=1) if expected in r["content"]]
+        if ranks:
+            hits_1 += ranks[0] == 1
+            hits_k += 1
+            reciprocal_ranks.append(1 / ranks[0])
+        else:
+            reciprocal_ranks.append(0.0)
+    n = len(QUERIES)
+    latencies.sort()
+    print(f"   {mode:<8} hit@1 {hits_1 / n:.2f}   hit@{k} {hits_k / n:.2f}   MRR {sum(reciprocal_ranks) / n:.2f}   "
+          f"p50 {latencies[n // 2] * 1000:.2f}ms")
+
+
+def bench_lexical_lookups(copies: int = 300):
+    index = BM25Index()
+    chunks = [content for content, _ in embeddings.get_lexical_index().chunks.values()]
+    for c in range(copies):
+        for n, content in enumerate(chunks):
+            index.add(f"copy{c}:{n}", content, {"doc_id": f"copy{c}"})
+    terms = sum(len(set(tokenize(q))) for _, q, _ in QUERIES)
+
+    start = time.perf_counter()
+    for _, question, _ in QUERIES:
+        index.search(question, k=5, doc_id="copy7")
+    filtered = time.perf_counter() - start
+    start = time.perf_counter()
+    for _, question, _ in QUERIES:
+        index.search(question, k=5)
+    unfiltered = time.perf_counter() - start
+    print(f"\n--- BM25 lookups over {len(index):,} chunks ({len(index.postings):,} terms) ---")
+    print(f"   Filtered to one document: {filtered / terms * 1e6:.1f}µs per query term")
+    print(f"   Whole corpus:             {unfiltered / terms * 1e6:.1f}µs per query term")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        provider = LocalHashingEmbeddings()
+        registry.override("embedding_function", provider)
+        registry.override("vector_store", Chroma(
+            collection_name="bench", embedding_function=provider, persist_directory=directory
+        ))
+        embeddings._lexical_index = None
+        for name in ("sample1", "sample2", "sample3"):
+            embeddings.index_document(doc_id=name, text=load_sample(name), metadata={})
+
+        print(f"\n--- Retrieval on the sample contracts ({len(QUERIES)} questions) ---")
+        for mode in ("dense", "lexical", "hybrid"):
+            evaluate(mode)
+        bench_lexical_lookups()
+
+
+if __name__ == "__main__":
+    main()
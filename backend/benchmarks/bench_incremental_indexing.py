@@ -0,0 +1,72 @@
+"""
+Measures re-indexing cost for an edited contract: only edited chunks should be embedded.
+Runs offline: the local hashing embeddings stand in for the provider, and a throwaway
+Chroma collection stands in for the shared one.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_incremental_indexing
+"""
+import random
+import tempfile
+import time
+
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+from app.core.registry import registry
+from app.utils import embeddings
+from app.utils.embedding_providers import LocalHashingEmbeddings
+from benchmarks.bench_alignment import make_document_pair
+
+
+class CountingEmbeddings(Embeddings):
+    """Counts the texts sent for embedding."""
+
+    def __init__(self):
+        self.model = LocalHashingEmbeddings()
+        self.texts_embedded = 0
+
+    def embed_documents(self, texts):
+        self.texts_embedded += len(texts)
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
+def run(doc_id: str, text: str, provider: CountingEmbeddings, label: str):
+    sent_before = provider.texts_embedded
+    start = time.perf_counter()
+    report = embeddings.index_document(doc_id=doc_id, text=text, metadata={})
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<22} {report}  sent={provider.texts_embedded - sent_before}  {elapsed * 1000:.0f}ms")
+    return report
+
+
+def main(n_clauses: int = 400, n_edits: int = 3):
+    rng = random.Random(5)
+    base, _, _ = make_document_pair(n_clauses, rng)
+    paragraphs = [c["content"] for c in base]
+    provider = CountingEmbeddings()
+
+    with tempfile.TemporaryDirectory() as directory:
+        registry.override("embedding_function", provider)
+        registry.override("vector_store", Chroma(
+            collection_name="bench", embedding_function=provider, persist_directory=directory
+        ))
+        print(f"--- Indexing a {n_clauses}-clause contract ({len(' '.join(paragraphs)):,} characters) ---")
+        first = run("bench", "\n\n".join(paragraphs), provider, "Initial index")
+        run("bench", "\n\n".join(paragraphs), provider, "Unchanged re-index")
+
+        for k in rng.sample(range(len(paragraphs)), k=n_edits):
+            paragraphs[k] = paragraphs[k].replace("shall", "must", 1) + " as amended"
+        edited = run("bench", "\n\n".join(paragraphs), provider, f"{n_edits} clauses edited")
+
+        stored = len(embeddings.get_vector_store().get(where={"doc_id": "bench"})["ids"])
+        print(f"\nChunks stored: {stored} (expected {edited['total']}, no duplicates)")
+        print(f"Edited re-index embedded {edited['embedded']} of {first['total']} chunks "
+              f"({edited['embedded'] / first['total']:.1%} of a full re-index)")
+
+
+if __name__ == "__main__":
+    main()
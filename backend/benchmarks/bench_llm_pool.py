@@ -0,0 +1,150 @@
+"""
+Behaviour of many concurrent LLM calls against a provider quota. The provider is
+simulated (no network): it serves a call in `--latency` seconds, allows at most
+`--provider-concurrency` calls at once and `--rpm` requests per minute (replenished
+continuously, like OpenAI's limits), and answers anything beyond that with a 429.
+First checks that a streamed call's reported usage is counted like an invoked one's.
+
+    direct     calls sent straight to the provider, as the agents did before (the
+               OpenAI client's own 2 retries with short backoff)
+    pooled     calls through PooledChatModel with the same limits configured: they
+               queue for the budget and a free slot, and 429s are retried with jitter
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_llm_pool
+    python -m benchmarks.bench_llm_pool --calls 200 --threads 48 --rpm 120
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import openai
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable
+
+from app.core.config import settings
+from app.core.llm_pool import PooledChatModel, ModelLimiter, TokenBucket, build_chat_model
+
+
+def rate_limit_error() -> openai.RateLimitError:
+    response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+USAGE = {"input_tokens": 400, "output_tokens": 100, "total_tokens": 500}
+
+
+class SimulatedProvider(Runnable):
+    def __init__(self, rpm: int, concurrency: int, latency: float):
+        self.requests = TokenBucket(rpm)
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.latency = latency
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, input, config=None, **kwargs):
+        if not self.slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise rate_limit_error()
+        try:
+            if self.requests.acquire(1) > 0:
+                self.requests.adjust(-1)
+                with self._lock:
+                    self.rejected += 1
+                raise rate_limit_error()
+            time.sleep(self.latency)
+            return AIMessage(content="ok", usage_metadata=USAGE)
+        finally:
+            self.slots.release()
+
+    def stream(self, input, config=None, **kwargs):
+        # Like an OpenAI stream with stream_usage: the usage comes with the last chunk
+        yield AIMessageChunk(content="o")
+        yield AIMessageChunk(content="k", usage_metadata=USAGE)
+
+
+def check_stream_usage():
+    limiter = ModelLimiter("simulated", 1, 60, tpm=1_000_000)
+    text = "".join(chunk.content for chunk in PooledChatModel(SimulatedProvider(60, 1, 0.0), limiter).stream("clause"))
+    if text != "ok" or limiter.stats()["tokens_used"] != USAGE["total_tokens"]:
+        raise AssertionError(f"A streamed call counted {limiter.stats()['tokens_used']} tokens, expected {USAGE['total_tokens']}")
+    # OpenAI only reports a stream's usage when asked to (the client is built, never called)
+    saved = settings.LLM_PROVIDER, settings.OPENAI_API_KEY
+    settings.LLM_PROVIDER, settings.OPENAI_API_KEY = "openai", settings.OPENAI_API_KEY or "sk-unused"
+    try:
+        if not build_chat_model("gpt-4-turbo").model.stream_usage:
+            raise AssertionError("The OpenAI client is built without stream_usage, so streamed calls report no tokens")
+    finally:
+        settings.LLM_PROVIDER, settings.OPENAI_API_KEY = saved
+    print("--- Streamed calls count their reported token usage ---")
+
+
+def client_retries(call, retries: int = 2):
+    """The OpenAI client's default: 2 retries, exponential backoff from 0.5s with jitter."""
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except openai.RateLimitError:
+            if attempt == retries:
+                raise
+            time.sleep(min(8.0, 0.5 * 2 ** attempt) * (1 - 0.25 * random.random()))
+
+
+def run(setup: str, args) -> dict:
+    provider = SimulatedProvider(args.rpm, args.provider_concurrency, args.latency)
+    limiter = ModelLimiter("simulated", args.provider_concurrency, args.rpm, tpm=1_000_000)
+    model = PooledChatModel(provider, limiter)
+    prompt = "Assess the risk of this clause. " * 50
+
+    def call(_):
+        start = time.perf_counter()
+        try:
+            if setup == "direct":
+                client_retries(lambda: provider.invoke(prompt))
+            else:
+                model.invoke(prompt)
+            return True, time.perf_counter() - start
+        except openai.RateLimitError:
+            return False, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        results = list(pool.map(call, range(args.calls)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(seconds for ok, seconds in results if ok)
+    stats = limiter.stats()
+    return {
+        "ok": len(latencies),
+        "failed": sum(1 for ok, _ in results if not ok),
+        "rejected": provider.rejected,
+        "elapsed": elapsed,
+        "p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        "wait_p95": stats.get("queue_wait_ms", {}).get("p95", 0.0) if setup == "pooled" else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=120)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rpm", type=int, default=60)
+    parser.add_argument("--provider-concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    check_stream_usage()
+    print(f"{args.calls} calls from {args.threads} threads; provider allows {args.rpm} requests/min, "
+          f"{args.provider_concurrency} concurrent, {args.latency * 1000:.0f}ms per call")
+    print(f"   {'setup':<10}{'ok':>6}{'failed':>8}{'429s':>7}{'elapsed':>10}{'p95':>10}{'queue p95':>11}")
+    for setup in ("direct", "pooled"):
+        r = run(setup, args)
+        wait = f"{r['wait_p95'] / 1000:>10.1f}s" if r["wait_p95"] is not None else f"{'-':>11}"
+        print(f"   {setup:<10}{r['ok']:>6}{r['failed']:>8}{r['rejected']:>7}{r['elapsed']:>9.1f}s{r['p95']:>9.1f}s{wait}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+End-to-end performance suite on the sample contracts, fully offline: chat models are
+the fake provider (LLM_PROVIDER=fake, see app.core.fake_llm), embeddings the local
+hashing model and the vector store a throwaway flat index. With the default zero
+latency the numbers are the pipeline's own overhead; pass --latency-ms and
+--ms-per-token to approximate the provider as well.
+
+Cases:
+    parse            load_document_text on each sample .docx
+    extract          extract_clauses on each sample's text
+    prescreen        compliance keyword check and risk pattern pre-screen
+    align            clause alignment of each pair of samples
+    graph:analyze    a full analysis run of graph_app (parser, risk, compliance, report)
+    graph:compare    a comparison run of graph_app
+    graph:qa         a Q&A run of graph_app (answer cache off, so every run retrieves)
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --runs 50 --latency-ms 400 --ms-per-token 15
+    python -m benchmarks.bench_pipeline --only graph:analyze --failure-rate 0.1
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
+from app.core.config import settings
+from app.core.registry import registry, get_graph_app
+from app.utils.document_parser import load_document_text, extract_clauses
+from app.utils.embedding_providers import LocalHashingEmbeddings
+from app.utils.flat_vector_store import FlatVectorStore
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "contracts")
+QUESTIONS = [
+    "What is the liability cap?",
+    "How can the agreement be terminated?",
+    "Which law governs the agreement?",
+    "When are invoices due?",
+]
+
+
+def base_state(task_type: str, **fields):
+    state = {
+        "task_type": task_type, "document_id": "bench", "document_text": "", "document_text_2": "",
+        "parsed_clauses": [], "clause_categories": {}, "identified_risks": [], "missing_clauses": [],
+        "comparison_result": {}, "compliance_results": [], "qa_messages": [], "final_report": "",
+        "current_step": "start", "error": ""
+    }
+    state.update(fields)
+    return state
+
+
+def run_graph(state):
+    final = None
+    for step in get_graph_app().stream(state):
+        final = list(step.values())[0]
+    if final and final.get("error"):
+        raise RuntimeError(final["error"])
+    return final
+
+
+def build_cases(paths, texts):
+    from app.agents.compliance_agent import ComplianceAgent, GDPR_RULES
+    from app.utils.clause_alignment import align_clauses
+    from app.utils.risk_patterns import prescreen_clauses
+
+    embed = LocalHashingEmbeddings().embed_documents
+    clauses = [extract_clauses(text) for text in texts]
+    parsed = [[{"clause_number": c["clause_number"], "text": c["content"]} for c in doc] for doc in clauses]
+    pairs = list(itertools.permutations(range(len(texts)), 2))
+    questions = itertools.cycle(QUESTIONS)
+
+    def prescreen(i):
+        ComplianceAgent()._keyword_check(texts[i], GDPR_RULES)
+        prescreen_clauses(parsed[i])
+
+    def qa(i):
+        run_graph(base_state("qa", document_id=f"bench-{i}", document_text=texts[i],
+                             qa_messages=[{"role": "user", "content": next(questions)}]))
+
+    return {
+        "parse": (len(paths), lambda i: load_document_text(paths[i])),
+        "extract": (len(texts), lambda i: extract_clauses(texts[i])),
+        "prescreen": (len(texts), prescreen),
+        "align": (len(pairs), lambda i: align_clauses(clauses[pairs[i][0]], clauses[pairs[i][1]], embed_fn=embed,
+                                                      method=settings.COMPARISON_ALIGNMENT)),
+        "graph:analyze": (len(texts), lambda i: run_graph(base_state("analyze", document_text=texts[i]))),
+        "graph:compare": (len(pairs), lambda i: run_graph(base_state("compare", document_text=texts[pairs[i][0]],
+                                                                      document_text_2=texts[pairs[i][1]]))),
+        "graph:qa": (len(texts), qa),
+    }
+
+
+def measure(inputs: int, fn, runs: int, warmup: int = 1) -> dict:
+    """Calls `fn` on inputs in turn; the agents' progress output is discarded."""
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        for i in range(warmup):
+            fn(i % inputs)
+        seconds = []
+        for i in range(runs):
+            start = time.perf_counter()
+            fn(i % inputs)
+            seconds.append(time.perf_counter() - start)
+            sink.seek(0)
+            sink.truncate()
+    seconds.sort()
+    return {
+        "per_s": runs / sum(seconds),
+        "p50": seconds[len(seconds) // 2],
+        "p99": seconds[min(len(seconds) - 1, int(len(seconds) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per case")
+    parser.add_argument("--only", nargs="*", help="cases to run (default: all)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--ms-per-token", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    # Fake provider with no rate limits, so queueing doesn't mask pipeline cost
+    settings.LLM_PROVIDER = "fake"
+    settings.FAKE_LLM_LATENCY_MS = args.latency_ms
+    settings.FAKE_LLM_MS_PER_TOKEN = args.ms_per_token
+    settings.FAKE_LLM_FAILURE_RATE = args.failure_rate
+    settings.LLM_RETRY_BASE_DELAY = 0.01
+    settings.QA_CACHE_ENABLED = False
+    for model in ("gpt-4", "gpt-4-turbo", "gpt-3.5-turbo"):
+        settings.LLM_MODEL_LIMITS[model] = {"concurrency": 64, "rpm": 10 ** 9, "tpm": 10 ** 12}
+
+    directory = tempfile.mkdtemp()
+    try:
+        embeddings = LocalHashingEmbeddings()
+        registry.override("embedding_function", embeddings)
+        registry.override("vector_store", FlatVectorStore(os.path.join(directory, "chunks"), embedding_function=embeddings))
+        registry.override("clause_store", FlatVectorStore(os.path.join(directory, "clauses"), embedding_function=embeddings))
+
+        paths = sorted(os.path.join(SAMPLES_DIR, name) for name in os.listdir(SAMPLES_DIR) if name.endswith(".docx"))
+        texts = [load_document_text(path) for path in paths]
+        cases = build_cases(paths, texts)
+        selected = args.only or list(cases)
+
+        print(f"{len(paths)} sample contracts, {args.runs} runs per case; fake LLM latency "
+              f"{args.latency_ms:.0f}ms + {args.ms_per_token:.0f}ms/token, failure rate {args.failure_rate:.0%}")
+        print(f"   {'case':<16}{'runs/s':>10}{'p50':>11}{'p99':>11}")
+        for name in selected:
+            inputs, fn = cases[name]
+            r = measure(inputs, fn, args.runs)
+            print(f"   {name:<16}{r['per_s']:>10.1f}{r['p50'] * 1000:>9.1f}ms{r['p99'] * 1000:>9.1f}ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
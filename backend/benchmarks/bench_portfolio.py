@@ -0,0 +1,144 @@
+"""
+Portfolio analytics on a synthetic portfolio in a throwaway SQLite database: the cost of
+recording each analysis (findings plus incremental summary updates), aggregate queries
+answered from the summary tables versus reloading every stored analysis, and a full
+summary rebuild. Finally checks that the incrementally maintained summaries equal the
+rebuilt ones after a share of the documents has been re-analyzed.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_portfolio
+    python -m benchmarks.bench_portfolio --documents 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import Base, make_engine, make_async_engine, write_transaction
+from app.core.portfolio import (
+    record_analysis, rebuild_summaries, risk_distribution, top_risk_documents, compliance_overview
+)
+from app.models.document import Document
+from app.models.analysis import AnalysisResult
+
+CLAUSES = [
+    "Limitation of Liability. In no event shall Provider's liability exceed the fees paid.",
+    "Indemnification. Client shall indemnify and hold harmless Provider from all claims.",
+    "Termination. Either party may terminate this Agreement for convenience on 10 days notice.",
+    "Confidentiality. The Receiving Party shall keep all Confidential Information secret.",
+    "Payment. Invoices are payable within 15 days; late payments accrue interest.",
+    "Intellectual Property. All inventions conceived by Employee are owned by the Company.",
+    "Governing Law. This Agreement is governed by the laws of Delaware; disputes go to arbitration.",
+    "Assignment. Provider may assign this Agreement without consent.",
+]
+LEVELS = ["critical", "high", "medium", "low"]
+REQUIREMENTS = ["Data Processing Agreement (DPA)", "Right to Erasure (Right to be Forgotten)"]
+
+
+def make_analysis(rng: random.Random) -> dict:
+    return {
+        "report": "Synthetic report.",
+        "risks": [
+            {"clause_text": rng.choice(CLAUSES), "risk_level": rng.choices(LEVELS, weights=[1, 3, 4, 2])[0],
+             "description": "Synthetic risk.", "mitigation": "Negotiate.", "location": None}
+            for _ in range(rng.randint(3, 12))
+        ],
+        "compliance": [
+            {"requirement": r, "is_compliant": rng.random() < 0.6, "clause_text": None,
+             "assessment": "Synthetic.", "severity": "high", "location": None}
+            for r in REQUIREMENTS
+        ],
+        "risk_prescreen": {}
+    }
+
+
+async def naive_distribution(db) -> dict:
+    """What the dashboard would do without summaries: reload every analysis."""
+    from app.utils.clause_categories import categorize_clause
+    latest = {}
+    for document_id, analysis_id, results in (await db.execute(
+            select(AnalysisResult.document_id, AnalysisResult.id, AnalysisResult.results))).all():
+        if analysis_id > latest.get(document_id, (0, None))[0]:
+            latest[document_id] = (analysis_id, results)
+    categories = defaultdict(lambda: defaultdict(int))
+    for _, results in latest.values():
+        for risk in results["risks"]:
+            categories[categorize_clause(risk["clause_text"])][risk["risk_level"]] += 1
+    return categories
+
+
+async def snapshot(db) -> tuple:
+    distribution = await risk_distribution(db)
+    top = [(d["document_id"], d["critical"], d["high"], d["total"], d["compliance_failures"])
+           for d in await top_risk_documents(db, 100)]
+    return distribution, sorted(top), await compliance_overview(db)
+
+
+async def run(url: str, documents: int, reanalyzed: float):
+    engine = make_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    rng = random.Random(0)
+
+    async with Session() as db:
+        async with write_transaction(db):
+            await db.execute(insert(Document), [
+                {"filename": f"contract{n}.docx", "document_type": "application/pdf", "upload_date": datetime.now()}
+                for n in range(documents)
+            ])
+        ids = list(await db.scalars(select(Document.id)))
+
+        start = time.perf_counter()
+        for document_id in ids:
+            async with write_transaction(db):
+                await record_analysis(db, document_id, make_analysis(rng))
+        elapsed = time.perf_counter() - start
+        print(f"   record analysis         {elapsed / documents * 1000:8.2f}ms per document ({documents:,} documents)")
+
+        start = time.perf_counter()
+        for document_id in rng.sample(ids, int(documents * reanalyzed)):
+            async with write_transaction(db):
+                await record_analysis(db, document_id, make_analysis(rng))
+        print(f"   re-analyze {reanalyzed:.0%} of them   {(time.perf_counter() - start) * 1000:8.0f}ms")
+
+        for name, query in [("risk distribution", risk_distribution(db)),
+                            ("top 10 risky contracts", top_risk_documents(db, 10)),
+                            ("compliance overview", compliance_overview(db)),
+                            ("naive: reload analyses", naive_distribution(db))]:
+            start = time.perf_counter()
+            await query
+            print(f"   {name:<24}{(time.perf_counter() - start) * 1000:8.2f}ms")
+
+        incremental = await snapshot(db)
+        start = time.perf_counter()
+        async with write_transaction(db):
+            await rebuild_summaries(db)
+        print(f"   rebuild summaries       {(time.perf_counter() - start) * 1000:8.0f}ms")
+        print(f"   incremental == rebuilt: {incremental == await snapshot(db)}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--reanalyzed", type=float, default=0.1)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        Base.metadata.create_all(bind=make_engine(url))
+        asyncio.run(run(url, args.documents, args.reanalyzed))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
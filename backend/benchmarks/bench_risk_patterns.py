@@ -0,0 +1,68 @@
+"""
+Benchmarks the deterministic risk-pattern pre-screen, after checking its flags on the
+known regression cases below. Runs entirely offline.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_risk_patterns
+"""
+import random
+import time
+
+from app.utils.risk_patterns import prescreen_clause, prescreen_clauses
+
+SAMPLE_CLAUSES = [
+    "The Receiving Party agrees to UNLIMITED LIABILITY for any breach.",
+    "Either party may terminate at any time without notice.",
+    "The Supplier shall indemnify, defend and hold harmless the Customer from any and all claims whatsoever.",
+    "The Vendor shall use commercially reasonable efforts to deliver the Services.",
+    "All notices under this Agreement shall be given in writing to the addresses set out above.",
+    "The headings in this Agreement are for convenience only and shall not affect its interpretation.",
+    "This Agreement may be executed in counterparts, each of which is an original.",
+    "GOVERNING LAW",
+    "Payment is due within thirty (30) days of the invoice date.",
+    "All IP becomes property of Disclosing Party.",
+]
+
+# (clause, whether it must be flagged as unlimited liability)
+UNLIMITED_LIABILITY_CASES = [
+    ("The Supplier is responsible for delivering the Services, including without limitation hosting, "
+     "support and maintenance.", False),
+    ("The Supplier shall be liable for all losses including without limitation lost profits.", False),
+    ("The Receiving Party agrees to UNLIMITED LIABILITY for any breach.", True),
+    ("The Supplier shall be liable without limitation for any breach of this Agreement.", True),
+    ("The Customer accepts the Services without any limit on its liability.", True),
+    ("There is no cap on the liability of either party for fraud.", True),
+]
+
+
+def check_unlimited_liability():
+    for text, expected in UNLIMITED_LIABILITY_CASES:
+        flagged = any(f["risk_type"] == "unlimited_liability" for f in prescreen_clause(text)["flags"])
+        if flagged != expected:
+            raise AssertionError(f"unlimited_liability {'missed' if expected else 'wrongly flagged'}: {text!r}")
+    print(f"--- {len(UNLIMITED_LIABILITY_CASES)} unlimited-liability regression cases pass ---")
+
+
+def main(n_clauses: int = 100_000):
+    check_unlimited_liability()
+
+    rng = random.Random(42)
+    clauses = [
+        {"clause_number": str(i + 1), "text": rng.choice(SAMPLE_CLAUSES)}
+        for i in range(n_clauses)
+    ]
+
+    start = time.perf_counter()
+    result = prescreen_clauses(clauses)
+    elapsed = time.perf_counter() - start
+
+    report = result["report"]
+    print(f"--- Pre-screened {n_clauses} clauses in {elapsed:.3f}s ---")
+    print(f"   Microseconds per clause: {elapsed * 1e6 / n_clauses:.2f}")
+    print(f"   Clauses diverted from the LLM: {report['diverted_clause_fraction']:.1%}")
+    print(f"   Tokens diverted from the LLM:  {report['diverted_token_fraction']:.1%}")
+    print(f"   Flags by type: {report['flags_by_type']}")
+
+
+if __name__ == "__main__":
+    main()
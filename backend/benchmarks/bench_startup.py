@@ -0,0 +1,63 @@
+"""
+Application startup time. Each run starts a fresh Python process (so nothing is already
+imported or cached) and measures:
+
+    import        `import app.main`: what uvicorn waits for before accepting connections
+    first GET /   the first request through the app, i.e. when the server first answers
+    warm-up       building every lazy resource (LLM clients, chains, embedding model,
+                  vector stores, spaCy, the agent graph), which WARM_UP=background runs
+                  in a thread after startup and lazy mode spreads over the first requests
+
+No network calls are made: building the OpenAI clients only constructs them.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    client.get("/")
+    served = time.perf_counter()
+from app.core.registry import registry
+registry.warm_up()
+warmed = time.perf_counter()
+errors = {name: r["error"] for name, r in registry.status().items() if r["error"]}
+print(json.dumps({"import": imported - start, "first_request": served - start,
+                  "warm_up": warmed - served, "errors": errors}))
+"""
+
+
+def measure() -> dict:
+    env = dict(os.environ, WARM_UP="lazy")
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [measure() for _ in range(args.runs)]
+    print(f"{args.runs} cold starts (median, min)")
+    for key, label in (("import", "import"), ("first_request", "first GET /"), ("warm_up", "warm-up")):
+        values = [r[key] for r in results]
+        print(f"   {label:<14}{statistics.median(values) * 1000:>9.0f}ms{min(values) * 1000:>9.0f}ms")
+    if results[-1]["errors"]:
+        print(f"Resources that failed to build: {results[-1]['errors']}")
+
+
+if __name__ == "__main__":
+    main()
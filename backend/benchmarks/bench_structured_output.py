@@ -0,0 +1,107 @@
+"""
+Risk analysis output parsed after the completion versus as it streams (see
+app.utils.streaming_json), on the sample contracts, fully offline with the fake provider
+(see app.core.fake_llm). FAKE_LLM_MALFORMED_RATE of the completions are cut off halfway.
+
+    batch       invoke, then PydanticOutputParser on the whole completion, as the agents
+                did before: the first risk is usable when the completion ends, and a
+                malformed completion loses every risk in it
+    streaming   RiskAssessmentAgent._analyze: each risk as soon as its JSON closes; a
+                malformed completion keeps the complete risks and only the clauses not
+                reached are asked again
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_structured_output
+    python -m benchmarks.bench_structured_output --runs 10 --malformed-rate 0.5 --ms-per-token 10
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from app.core.config import settings
+from app.utils.document_parser import load_document_text, extract_clauses
+from app.utils.risk_patterns import prescreen_clauses
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "contracts")
+MODEL = "gpt-4-turbo"
+
+
+def run_batch(clauses):
+    from langchain_core.exceptions import OutputParserException
+    from app.agents.risk_agent import RiskAssessmentAgent, risk_prompt, parser
+    from app.core.registry import get_chat_model
+    from app.utils.prompt_budget import fit_prompt, count_tokens
+
+    agent = RiskAssessmentAgent()
+    inputs, _ = fit_prompt("risk", MODEL, risk_prompt, [{
+        "name": "clauses_text", "items": [agent._format_clause(c) for c in clauses], "separator": "\n\n"
+    }])
+    start = time.perf_counter()
+    text = (risk_prompt | get_chat_model(MODEL)).invoke(inputs).content
+    try:
+        risks = len(parser.parse(text).risks)
+        wasted = 0
+    except OutputParserException:
+        risks, wasted = 0, count_tokens(text, MODEL)
+    seconds = time.perf_counter() - start
+    return {"first": seconds if risks else None, "total": seconds, "risks": risks, "wasted": wasted}
+
+
+def run_streaming(clauses):
+    from app.agents.risk_agent import RiskAssessmentAgent
+    from app.utils.streaming_json import structured_output_stats
+
+    wasted_before = structured_output_stats().get("risk", {}).get("wasted_tokens", 0)
+    start, first = time.perf_counter(), []
+    analysis, _ = RiskAssessmentAgent()._analyze(
+        clauses, MODEL, on_item=lambda risk: first or first.append(time.perf_counter() - start)
+    )
+    return {
+        "first": first[0] if first else None,
+        "total": time.perf_counter() - start,
+        "risks": len(analysis.risks),
+        "wasted": structured_output_stats()["risk"]["wasted_tokens"] - wasted_before,
+    }
+
+
+def median(values):
+    values = sorted(v for v in values if v is not None)
+    return values[len(values) // 2] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=4, help="timed runs per sample and setup")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--ms-per-token", type=float, default=5.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    settings.LLM_PROVIDER = "fake"
+    settings.FAKE_LLM_LATENCY_MS = args.latency_ms
+    settings.FAKE_LLM_MS_PER_TOKEN = args.ms_per_token
+    settings.FAKE_LLM_MALFORMED_RATE = args.malformed_rate
+    settings.LLM_MODEL_LIMITS[MODEL] = {"concurrency": 64, "rpm": 10 ** 9, "tpm": 10 ** 12}
+
+    paths = sorted(os.path.join(SAMPLES_DIR, name) for name in os.listdir(SAMPLES_DIR) if name.endswith(".docx"))
+    samples = []
+    for path in paths:
+        clauses = [{"clause_number": c["clause_number"], "text": c["content"]} for c in extract_clauses(load_document_text(path))]
+        samples.append(prescreen_clauses(clauses)["to_llm"])
+
+    print(f"{len(samples)} sample contracts, {args.runs} runs each; fake LLM latency {args.latency_ms:.0f}ms + "
+          f"{args.ms_per_token:.0f}ms/token, {args.malformed_rate:.0%} of completions malformed")
+    print(f"   {'setup':<12}{'first risk':>12}{'total':>10}{'risks/run':>11}{'wasted tok/run':>16}")
+    for name, run in (("batch", run_batch), ("streaming", run_streaming)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [run(samples[i % len(samples)]) for i in range(args.runs * len(samples))]
+        print(f"   {name:<12}{median(r['first'] for r in results) * 1000:>10.0f}ms"
+              f"{median(r['total'] for r in results):>9.1f}s"
+              f"{sum(r['risks'] for r in results) / len(results):>11.1f}"
+              f"{sum(r['wasted'] for r in results) / len(results):>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
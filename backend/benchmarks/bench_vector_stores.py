@@ -0,0 +1,162 @@
+"""
+Compares the flat memory-mapped vector store (float32 and int8) with Chroma: build time,
+load time and resident memory of a freshly started process, and query latency with and
+without a doc_id filter, at several corpus sizes. Vectors are random unit vectors; each
+document has 100 chunks.
+
+Chroma's build time grows quickly with size, so it is only run up to --chroma-max chunks.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_vector_stores
+    python -m benchmarks.bench_vector_stores --sizes 10000,100000,1000000 --chroma-max 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+CHUNKS_PER_DOCUMENT = 100
+BATCH = 5000
+
+
+def memory_mb() -> tuple:
+    """
+    (resident, anonymous) memory in MB. Memory-mapped vectors count as resident but not
+    anonymous: they are page cache that every process mapping the file shares.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {line.split(":")[0]: line.split()[1] for line in f if ":" in line}
+        return int(fields["Rss"]) / 1024, int(fields["Anonymous"]) / 1024
+    except (OSError, KeyError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+def make_batch(start: int, size: int, dim: int, rng: np.random.Generator):
+    vectors = rng.standard_normal((size, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"chunk{start + n}" for n in range(size)]
+    metadatas = [{"doc_id": f"doc{(start + n) // CHUNKS_PER_DOCUMENT}", "chunk_id": (start + n) % CHUNKS_PER_DOCUMENT}
+                 for n in range(size)]
+    documents = [f"chunk text {start + n}" for n in range(size)]
+    return ids, vectors, documents, metadatas
+
+
+def open_store(backend: str, directory: str):
+    if backend == "chroma":
+        import chromadb
+        return chromadb.PersistentClient(path=directory).get_or_create_collection("bench")
+    from app.utils.flat_vector_store import FlatVectorStore
+    return FlatVectorStore(directory, dtype=backend.split("-")[1])
+
+
+def build(backend: str, directory: str, n: int, dim: int) -> float:
+    rng = np.random.default_rng(0)
+    store = open_store(backend, directory)
+    start = time.perf_counter()
+    for offset in range(0, n, BATCH):
+        ids, vectors, documents, metadatas = make_batch(offset, min(BATCH, n - offset), dim, rng)
+        if backend == "chroma":
+            store.add(ids=ids, embeddings=vectors, documents=documents, metadatas=metadatas)
+        else:
+            store.upsert(ids, vectors, documents, metadatas)
+    return time.perf_counter() - start
+
+
+def probe(backend: str, directory: str, n: int, dim: int, queries: int = 200) -> dict:
+    """Runs in a fresh process: load, first query, then timed queries."""
+    # Import the libraries first so only opening the store is measured
+    import chromadb  # noqa: F401
+    import app.utils.flat_vector_store  # noqa: F401
+    baseline_rss, baseline_anon = memory_mb()
+    start = time.perf_counter()
+    store = open_store(backend, directory)
+    rng = np.random.default_rng(1)
+    query_vectors = rng.standard_normal((queries, dim), dtype=np.float32)
+
+    def search(vector, doc_id=None):
+        where = {"doc_id": doc_id} if doc_id else None
+        if backend == "chroma":
+            return store.query(query_embeddings=[vector.tolist()], n_results=10, where=where)
+        return store.similarity_search_by_vector_with_score(vector, k=10, filter=where)
+
+    search(query_vectors[0])  # Chroma loads its index lazily
+    load = time.perf_counter() - start
+
+    def timed(doc_ids):
+        latencies = []
+        for vector, doc_id in zip(query_vectors, doc_ids):
+            t = time.perf_counter()
+            search(vector, doc_id)
+            latencies.append((time.perf_counter() - t) * 1000)
+        latencies.sort()
+        return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+    documents = max(1, n // CHUNKS_PER_DOCUMENT)
+    p50, p99 = timed([None] * queries)
+    p50_doc, p99_doc = timed([f"doc{rng.integers(documents)}" for _ in range(queries)])
+    rss, anonymous = memory_mb()
+    return {"load_s": load, "rss_mb": rss - baseline_rss, "anon_mb": anonymous - baseline_anon, "p50_ms": p50, "p99_ms": p99, "p50_doc_ms": p50_doc, "p99_doc_ms": p99_doc}
+
+
+def int8_recall(directory_f32: str, directory_i8: str, dim: int, queries: int = 50) -> float:
+    """Overlap of the int8 top-10 with the exact float32 top-10."""
+    from app.utils.flat_vector_store import FlatVectorStore
+    exact, quantized = FlatVectorStore(directory_f32), FlatVectorStore(directory_i8, dtype="int8")
+    rng = np.random.default_rng(2)
+    overlap = 0
+    for vector in rng.standard_normal((queries, dim), dtype=np.float32):
+        a = {d.id for d, _ in exact.similarity_search_by_vector_with_score(vector, k=10)}
+        b = {d.id for d, _ in quantized.similarity_search_by_vector_with_score(vector, k=10)}
+        overlap += len(a & b)
+    return overlap / (queries * 10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--chroma-max", type=int, default=100000)
+    parser.add_argument("--probe", nargs=3, metavar=("BACKEND", "DIRECTORY", "N"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        backend, directory, n = args.probe
+        print(json.dumps(probe(backend, directory, int(n), args.dim)))
+        return
+
+    for n in (int(s) for s in args.sizes.split(",")):
+        print(f"\n--- {n:,} chunks, {args.dim} dimensions ---")
+        print(f"   {'backend':<13}{'build':>9}{'load':>9}{'RSS':>10}{'private':>10}{'p50':>9}{'p99':>9}{'p50 doc':>10}{'p99 doc':>10}")
+        root = tempfile.mkdtemp()
+        try:
+            backends = ["flat-float32", "flat-int8"] + (["chroma"] if n <= args.chroma_max else [])
+            for backend in backends:
+                directory = os.path.join(root, backend)
+                build_s = build(backend, directory, n, args.dim)
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_vector_stores", "--dim", str(args.dim),
+                     "--probe", backend, directory, str(n)],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                r = json.loads(output.strip().splitlines()[-1])
+                print(f"   {backend:<13}{build_s:>8.1f}s{r['load_s']:>8.2f}s{r['rss_mb']:>8.0f}MB{r['anon_mb']:>8.0f}MB"
+                      f"{r['p50_ms']:>7.2f}ms{r['p99_ms']:>7.2f}ms{r['p50_doc_ms']:>8.2f}ms{r['p99_doc_ms']:>8.2f}ms")
+            if n > args.chroma_max:
+                print(f"   chroma       skipped (above --chroma-max {args.chroma_max:,})")
+            recall = int8_recall(os.path.join(root, "flat-float32"), os.path.join(root, "flat-int8"), args.dim)
+            print(f"   int8 top-10 recall vs float32: {recall:.3f}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
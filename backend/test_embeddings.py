@@ -1,3 +1,4 @@
+# Calls OpenAI; run with LLM_PROVIDER=fake (or EMBEDDING_PROVIDER=local) to embed offline
 from app.utils.document_parser import parse_document
 from app.utils.embeddings import index_document, search_documents
 
@@ -1,4 +1,5 @@
-from app.agents.supervisor import graph_app
+# Calls OpenAI; run with LLM_PROVIDER=fake to use the offline fake models instead
+from app.core.registry import get_graph_app
 from app.agents.state import AgentState
 from app.utils.embeddings import index_document
 from app.utils.document_parser import parse_document
@@ -15,7 +16,7 @@ print("--- Indexing complete. ---")
 def run_conversation_turn(state: AgentState):
     """Helper function to run one turn of the conversation."""
     final_state = None
-    for step in graph_app.stream(state):
+    for step in get_graph_app().stream(state):
         node_name = list(step.keys())[0]
         state_after_step = list(step.values())[0]
         print(f"\n--- After Node: {node_name} ---")
@@ -39,7 +40,7 @@ def main_analyze():
     
     final_state = None
     # The stream method will now show the aggregator node in action
-    for step in graph_app.stream(initial_state):
+    for step in get_graph_app().stream(initial_state):
         node_name = list(step.keys())[0]
         state_after_step = list(step.values())[0]
         print(f"\n--- After Node: {node_name} ---")
@@ -1,7 +1,7 @@
 from app.utils.document_parser import parse_document, extract_clauses, extract_entities
 
 # Make sure you have a file at this path!
-TEST_DOC_PATH = "../data/contracts/sample.docx" 
+TEST_DOC_PATH = "../data/contracts/sample1.docx" 
 
 def main():
     print(f"--- Parsing Document: {TEST_DOC_PATH} ---")
@@ -2,26 +2,89 @@
  * API Service for communicating with FastAPI backend
  */
 
+import { diffParagraphs } from './document-sync.js';
+
 const API_BASE_URL = 'http://localhost:8000/api';
 
 class ApiService {
   constructor() {
     this.baseUrl = API_BASE_URL;
     this.currentDocumentId = null;
+    // The backend's copy of the document: { id, version, paragraphs }
+    this.session = null;
+  }
+
+  /**
+   * Bring the backend's document session up to date with the document's paragraphs.
+   * Only the changed paragraphs are sent; the full document is uploaded the first time,
+   * after heavy edits, or when the session was lost or changed elsewhere.
+   */
+  async syncDocument(paragraphs) {
+    if (this.session) {
+      const operations = diffParagraphs(this.session.paragraphs, paragraphs);
+      if (operations !== null && operations.length === 0) {
+        return this.session;
+      }
+      if (operations !== null) {
+        const response = await fetch(`${this.baseUrl}/sessions/${this.session.id}`, {
+          method: 'PATCH',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            base_version: this.session.version,
+            operations: operations
+          })
+        });
+
+        if (response.ok) {
+          const data = await response.json();
+          this.session = { id: data.session_id, version: data.version, paragraphs: paragraphs };
+          return this.session;
+        }
+        if (response.status !== 404 && response.status !== 409) {
+          const errorData = await response.json().catch(() => ({}));
+          throw new Error(errorData.detail || `API error: ${response.status}`);
+        }
+        console.log(`Document session out of date (${response.status}), uploading the document again`);
+      }
+    }
+
+    const response = await fetch(`${this.baseUrl}/sessions/`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        paragraphs: paragraphs
+      })
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.detail || `API error: ${response.status}`);
+    }
+
+    const data = await response.json();
+    this.session = { id: data.session_id, version: data.version, paragraphs: paragraphs };
+    return this.session;
   }
 
   /**
-   * Analyze a contract document
+   * Analyze a contract document, given as its list of paragraphs
    */
-  async analyzeContract(documentText) {
+  async analyzeContract(paragraphs) {
     try {
+      const session = await this.syncDocument(paragraphs);
+
       const response = await fetch(`${this.baseUrl}/analysis/`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          document_text: documentText
+          document_session_id: session.id,
+          document_version: session.version
         })
       });
 
@@ -45,12 +108,13 @@ class ApiService {
   }
 
   /**
-   * Ask a question about the document
+   * Ask a question about the document, given as its current list of paragraphs
    */
-  async askQuestion(question, documentText) {
+  async askQuestion(question, paragraphs) {
     try {
       const documentId = this.currentDocumentId || 'doc_from_word_' + Date.now();
-      
+      const session = await this.syncDocument(paragraphs);
+
       const response = await fetch(`${this.baseUrl}/qa/ask`, {
         method: 'POST',
         headers: {
@@ -59,7 +123,8 @@ class ApiService {
         body: JSON.stringify({
           document_id: documentId,
           question: question,
-          document_text: documentText
+          document_session_id: session.id,
+          document_version: session.version
         })
       });
 
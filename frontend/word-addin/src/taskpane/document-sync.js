@@ -0,0 +1,136 @@
+/**
+ * Paragraph-level diff for document sessions (POST/PATCH /api/sessions).
+ *
+ * Turns the paragraphs last sent to the backend and the document's current paragraphs
+ * into the insert/update/delete operations that transform one into the other, so each
+ * sync sends only the edited paragraphs instead of the whole document.
+ */
+
+// Beyond this many inserted plus deleted paragraphs, uploading the document again is cheaper
+const MAX_EDIT_DISTANCE = 500;
+
+/**
+ * Myers' O(ND) diff of two arrays of strings.
+ * Returns the edit script as 'equal', 'delete' and 'insert' steps (inserts carry the
+ * new paragraph), or null if the arrays differ by more than maxEdits paragraphs.
+ */
+function diffSteps(a, b, maxEdits) {
+  const n = a.length;
+  const m = b.length;
+  const limit = Math.min(n + m, maxEdits);
+  const offset = limit + 1;
+  const v = new Array(2 * offset + 1).fill(0);
+  const trace = [];
+
+  for (let d = 0; d <= limit; d++) {
+    trace.push(v.slice());
+    for (let k = -d; k <= d; k += 2) {
+      let x = (k === -d || (k !== d && v[offset + k - 1] < v[offset + k + 1]))
+        ? v[offset + k + 1]
+        : v[offset + k - 1] + 1;
+      let y = x - k;
+      while (x < n && y < m && a[x] === b[y]) {
+        x++;
+        y++;
+      }
+      v[offset + k] = x;
+      if (x >= n && y >= m) {
+        return backtrack(trace, b, n, m, offset);
+      }
+    }
+  }
+  return null;
+}
+
+function backtrack(trace, b, n, m, offset) {
+  const steps = [];
+  let x = n;
+  let y = m;
+  for (let d = trace.length - 1; d >= 0; d--) {
+    const v = trace[d];
+    const k = x - y;
+    const previousK = (k === -d || (k !== d && v[offset + k - 1] < v[offset + k + 1])) ? k + 1 : k - 1;
+    const previousX = d > 0 ? v[offset + previousK] : 0;
+    const previousY = d > 0 ? previousX - previousK : 0;
+    while (x > previousX && y > previousY) {
+      steps.push({ type: 'equal' });
+      x--;
+      y--;
+    }
+    if (d > 0) {
+      steps.push(x === previousX ? { type: 'insert', text: b[previousY] } : { type: 'delete' });
+    }
+    x = previousX;
+    y = previousY;
+  }
+  return steps.reverse();
+}
+
+/**
+ * Computes the operations that turn oldParagraphs into newParagraphs, in the form the
+ * backend applies them: in order, each against the list as the previous ones left it.
+ *
+ *   { op: 'update', index, text }
+ *   { op: 'insert', index, paragraphs: [...] }
+ *   { op: 'delete', index, count }
+ *
+ * Returns [] if nothing changed, or null if so much changed that the document should be
+ * sent again in full.
+ */
+export function diffParagraphs(oldParagraphs, newParagraphs) {
+  // Most edits touch a few paragraphs in one place: skip the unchanged head and tail
+  let start = 0;
+  while (start < oldParagraphs.length && start < newParagraphs.length
+    && oldParagraphs[start] === newParagraphs[start]) {
+    start++;
+  }
+  let oldEnd = oldParagraphs.length;
+  let newEnd = newParagraphs.length;
+  while (oldEnd > start && newEnd > start && oldParagraphs[oldEnd - 1] === newParagraphs[newEnd - 1]) {
+    oldEnd--;
+    newEnd--;
+  }
+  if (start === oldEnd && start === newEnd) {
+    return [];
+  }
+
+  const steps = diffSteps(oldParagraphs.slice(start, oldEnd), newParagraphs.slice(start, newEnd), MAX_EDIT_DISTANCE);
+  if (steps === null) {
+    return null;
+  }
+
+  // Each run of deletions and insertions becomes updates of the paragraphs it replaces,
+  // then a delete of the extra old paragraphs or an insert of the extra new ones
+  const operations = [];
+  let index = start;
+  let deleted = 0;
+  let inserted = [];
+  const flush = () => {
+    const updates = Math.min(deleted, inserted.length);
+    for (let i = 0; i < updates; i++) {
+      operations.push({ op: 'update', index: index + i, text: inserted[i] });
+    }
+    if (deleted > updates) {
+      operations.push({ op: 'delete', index: index + updates, count: deleted - updates });
+    }
+    if (inserted.length > updates) {
+      operations.push({ op: 'insert', index: index + updates, paragraphs: inserted.slice(updates) });
+    }
+    index += inserted.length;
+    deleted = 0;
+    inserted = [];
+  };
+
+  for (const step of steps) {
+    if (step.type === 'delete') {
+      deleted++;
+    } else if (step.type === 'insert') {
+      inserted.push(step.text);
+    } else {
+      flush();
+      index++;
+    }
+  }
+  flush();
+  return operations;
+}
@@ -0,0 +1,49 @@
+/* global Word */
+
+/**
+ * Highlighting helpers that use the character-offset locations resolved by the backend
+ */
+
+// Word's search API rejects strings longer than 255 characters
+const MAX_SEARCH_LENGTH = 255;
+
+/**
+ * Highlight a backend-resolved location ({paragraph_index, paragraph_end_index, text}).
+ * Returns false if the location could not be applied, so callers can fall back to search.
+ */
+export async function highlightLocation(location, color) {
+  if (!location || location.paragraph_index === undefined || location.paragraph_index === null) {
+    return false;
+  }
+
+  return await Word.run(async (context) => {
+    const paragraphs = context.document.body.paragraphs;
+    paragraphs.load("items");
+    await context.sync();
+
+    const first = paragraphs.items[location.paragraph_index];
+    const last = paragraphs.items[location.paragraph_end_index];
+    if (!first || !last) {
+      return false;
+    }
+
+    let range;
+    if (location.paragraph_index === location.paragraph_end_index) {
+      // Narrow the range to the matched text within its paragraph
+      const matches = first.search(location.text.substring(0, MAX_SEARCH_LENGTH), {
+        matchCase: true,
+        matchWholeWord: false
+      });
+      matches.load("items");
+      await context.sync();
+      range = matches.items.length > 0 ? matches.items[0] : first.getRange("Whole");
+    } else {
+      range = first.getRange("Start").expandTo(last.getRange("End"));
+    }
+
+    range.font.highlightColor = color;
+    range.select();
+    await context.sync();
+    return true;
+  });
+}
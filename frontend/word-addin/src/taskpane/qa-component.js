@@ -1,20 +1,22 @@
 /* global Word */
 
 import apiService from './api-service.js';
+import { highlightLocation } from './highlight.js';
 
 export class QAComponent {
   constructor(containerElement) {
     this.container = containerElement;
     this.conversationHistory = [];
     this.isProcessing = false;
-    this.documentText = null;
+    this.getParagraphs = null;
   }
 
   /**
    * Initialize the Q&A interface
+   * @param {Function} getParagraphs - returns the document's current paragraphs
    */
-  async initialize(documentText) {
-    this.documentText = documentText;
+  async initialize(getParagraphs) {
+    this.getParagraphs = getParagraphs;
     this.render();
     this.attachEventListeners();
   }
@@ -163,7 +165,7 @@ export class QAComponent {
       this.updateConversation();
 
       // Get answer from backend
-      const response = await apiService.askQuestion(question, this.documentText);
+      const response = await apiService.askQuestion(question, await this.getParagraphs());
 
       // Update with actual answer
       this.conversationHistory[this.conversationHistory.length - 1] = {
@@ -215,7 +217,7 @@ export class QAComponent {
         const citation = this.conversationHistory[msgIndex].citations[citeIndex];
         
         if (citation && citation.text) {
-          await this.highlightCitation(citation.text);
+          await this.highlightCitation(citation.text, citation);
         }
       };
     });
@@ -224,8 +226,12 @@ export class QAComponent {
   /**
    * Highlight citation text in document
    */
-  async highlightCitation(text) {
+  async highlightCitation(text, location = null) {
     try {
+      if (await highlightLocation(location, '#FFEB3B')) {
+        return;
+      }
+
       await Word.run(async (context) => {
         const searchResults = context.document.body.search(text, {
           matchCase: false,
@@ -3,6 +3,7 @@
 import apiService from './api-service.js';
 import { UIComponents } from './components.js';
 import { QAComponent } from './qa-component.js';
+import { highlightLocation } from './highlight.js';
 
 // State management
 let currentAnalysis = null;
@@ -66,7 +67,7 @@ async function initializeQA() {
   
   const qaContent = document.getElementById('qa-content');
   qaComponent = new QAComponent(qaContent);
-  await qaComponent.initialize(currentDocumentText);
+  await qaComponent.initialize(getDocumentParagraphs);
 }
 
 /**
@@ -140,10 +141,11 @@ async function analyzeDocument() {
       "Analyzing your document... This may take a minute."
     );
 
-    // Get document text
-    const documentText = await getDocumentText();
+    // Get document paragraphs
+    const paragraphs = await getDocumentParagraphs();
+    const documentText = paragraphs.join('\n');
     
-    if (!documentText || documentText.trim().length === 0) {
+    if (documentText.trim().length === 0) {
       resultDiv.innerHTML = UIComponents.createEmptyState();
       return;
     }
@@ -154,7 +156,7 @@ async function analyzeDocument() {
     console.log(`Analyzing document (${documentText.length} characters)...`);
 
     // Call backend API
-    const apiResponse = await apiService.analyzeContract(documentText);
+    const apiResponse = await apiService.analyzeContract(paragraphs);
     
     console.log('Received analysis:', apiResponse);
     
@@ -185,14 +187,14 @@ async function analyzeDocument() {
 }
 
 /**
- * Get the full text from the Word document
+ * Get the text of each paragraph in the Word document
  */
-async function getDocumentText() {
+async function getDocumentParagraphs() {
   return await Word.run(async (context) => {
-    const body = context.document.body;
-    body.load("text");
+    const paragraphs = context.document.body.paragraphs;
+    paragraphs.load("items/text");
     await context.sync();
-    return body.text;
+    return paragraphs.items.map((paragraph) => paragraph.text);
   });
 }
 
@@ -277,19 +279,31 @@ function attachHighlightListeners(risks) {
   highlightButtons.forEach((button, index) => {
     button.onclick = async () => {
       const risk = risks[index];
-      if (risk && risk.clause_text) {
-        await highlightTextInDocument(risk.clause_text, risk.risk_level);
+      if (risk && (risk.location || risk.clause_text)) {
+        await highlightTextInDocument(risk.clause_text, risk.risk_level, risk.location);
         showMessage(`Highlighted ${risk.risk_level} risk in document`, "success");
       }
     };
   });
 }
 
+const highlightColors = {
+  'critical': '#ff0000',
+  'high': '#ffa500',
+  'medium': '#ffff00',
+  'low': '#90ee90'
+};
+
 /**
- * Highlight text in the Word document
+ * Highlight text in the Word document.
+ * Uses the backend-resolved location when available and falls back to searching the body.
  */
-async function highlightTextInDocument(searchText, riskLevel) {
+async function highlightTextInDocument(searchText, riskLevel, location = null) {
   try {
+    if (await highlightLocation(location, highlightColors[riskLevel] || '#ffff00')) {
+      return;
+    }
+
     await Word.run(async (context) => {
       let searchResults = context.document.body.search(searchText, {
         matchCase: false,
@@ -317,13 +331,6 @@ async function highlightTextInDocument(searchText, riskLevel) {
 
       const range = searchResults.items[0];
       
-      const highlightColors = {
-        'critical': '#ff0000',
-        'high': '#ffa500',
-        'medium': '#ffff00',
-        'low': '#90ee90'
-      };
-      
       range.font.highlightColor = highlightColors[riskLevel] || '#ffff00';
       range.select();
       await context.sync();